@@ -0,0 +1,22 @@
+-- Indexes and view behind the filtered /jds/{jd_id}/results queries
+-- (order_by=score, min_score, match_level, status, latest).
+
+-- Top-K by score for a JD, optionally above a minimum score
+CREATE INDEX IF NOT EXISTS analysis_results_jd_score_idx
+  ON analysis_results (job_description_id, score DESC, id DESC);
+-- Top-K by score within one match level or one status (stored in details->>'status')
+CREATE INDEX IF NOT EXISTS analysis_results_jd_level_score_idx
+  ON analysis_results (job_description_id, match_level, score DESC, id DESC);
+CREATE INDEX IF NOT EXISTS analysis_results_jd_status_score_idx
+  ON analysis_results (job_description_id, (details->>'status'), score DESC, id DESC);
+-- Latest result per candidate and JD
+CREATE INDEX IF NOT EXISTS analysis_results_jd_candidate_latest_idx
+  ON analysis_results (job_description_id, candidate_id, created_at DESC, id DESC);
+
+-- The newest analysis result of each candidate for each JD; re-running a match
+-- for the same candidate and JD then no longer lists the candidate twice.
+-- security_invoker keeps the row level security policies of analysis_results.
+CREATE OR REPLACE VIEW latest_analysis_results WITH (security_invoker = true) AS
+SELECT DISTINCT ON (job_description_id, candidate_id) *
+FROM analysis_results
+ORDER BY job_description_id, candidate_id, created_at DESC, id DESC;
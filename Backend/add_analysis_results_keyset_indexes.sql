@@ -0,0 +1,7 @@
+-- Composite indexes backing the keyset pagination of /jds/{jd_id}/results and /analyses:
+-- each page is an index range scan on (filter column, created_at DESC, id DESC), so
+-- deep pages cost the same as the first one however many results accumulate.
+CREATE INDEX IF NOT EXISTS analysis_results_jd_created_idx
+  ON analysis_results (job_description_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS analysis_results_user_created_idx
+  ON analysis_results (user_id, created_at DESC, id DESC);
@@ -0,0 +1,16 @@
+-- Write rescored results back in one round trip (see app/crud.py update_analysis_results).
+-- p_rows is a JSON array of {"id", "score", "match_level", "details"} objects. Only rows
+-- that still exist are updated: a result deleted while a rescore runs is skipped, never
+-- re-created. Returns the number of rows updated.
+CREATE OR REPLACE FUNCTION update_analysis_results(p_rows jsonb)
+RETURNS integer
+LANGUAGE sql AS $$
+  WITH updated AS (
+    UPDATE analysis_results ar
+    SET score = r.score, match_level = r.match_level, details = r.details
+    FROM jsonb_to_recordset(p_rows) AS r(id bigint, score real, match_level text, details jsonb)
+    WHERE ar.id = r.id
+    RETURNING ar.id
+  )
+  SELECT count(*)::integer FROM updated;
+$$;
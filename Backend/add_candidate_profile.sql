@@ -0,0 +1,4 @@
+-- Store the precompiled CV profile (see app/matching.py CVProfile) with each candidate.
+-- The profile holds the CV-side embeddings as base64 blobs plus derived scalars, so a
+-- stored candidate can be matched against a new job description without re-embedding.
+ALTER TABLE candidates ADD COLUMN IF NOT EXISTS profile jsonb;
@@ -0,0 +1,34 @@
+-- Resolve a job description by jobId or content hash, creating it when neither matches,
+-- in one round trip (see app/crud.py get_or_create_job_description).
+-- A row with the same jobId is returned as is. Otherwise the row with the same content
+-- hash is returned (its jobId filled in if it had none) or a new row is inserted; the
+-- ON CONFLICT upsert on the unique content_hash makes concurrent creations safe.
+CREATE OR REPLACE FUNCTION get_or_create_job_description(
+  p_job_id_str text,
+  p_content_hash text,
+  p_job_title text,
+  p_company_name text,
+  p_location text,
+  p_ctc text,
+  p_details jsonb
+) RETURNS SETOF job_descriptions
+LANGUAGE plpgsql AS $$
+BEGIN
+  IF COALESCE(p_job_id_str, '') <> '' THEN
+    RETURN QUERY SELECT * FROM job_descriptions WHERE job_id_str = p_job_id_str ORDER BY id LIMIT 1;
+    IF FOUND THEN
+      RETURN;
+    END IF;
+  END IF;
+
+  RETURN QUERY
+  INSERT INTO job_descriptions AS jd (job_id_str, content_hash, job_title, company_name, location, ctc, details)
+  VALUES (p_job_id_str, p_content_hash, p_job_title, p_company_name, p_location, p_ctc, p_details)
+  ON CONFLICT (content_hash) DO UPDATE
+    SET job_id_str = CASE
+      WHEN COALESCE(jd.job_id_str, '') = '' AND COALESCE(EXCLUDED.job_id_str, '') <> '' THEN EXCLUDED.job_id_str
+      ELSE jd.job_id_str
+    END
+  RETURNING jd.*;
+END;
+$$;
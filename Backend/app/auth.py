@@ -4,13 +4,89 @@ from app.database import get_supabase
 from supabase import Client
 from app import schemas
 import os
+import time
+import hashlib
+import logging
+import threading
+import httpx
 from datetime import datetime, timedelta
-from jose import jwt
+from jose import jwt, JWTError
 from typing import Optional
+from app.cache import TTLCache
+
+logger = logging.getLogger(__name__)
 
 # Security scheme for token authentication
 security = HTTPBearer()
 
+# Supabase access tokens are verified locally: HS256 tokens with the project JWT
+# secret, RS256/ES256 tokens with the project's published signing keys (JWKS).
+# Tokens that cannot be verified locally fall back to a Supabase Auth call.
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+SUPABASE_JWKS_URL = os.getenv("SUPABASE_JWKS_URL") or (
+    f"{os.getenv('SUPABASE_URL').rstrip('/')}/auth/v1/.well-known/jwks.json" if os.getenv("SUPABASE_URL") else None
+)
+SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+# Seconds the JWKS is reused before being fetched again; an unknown key id
+# triggers an early refresh, at most once per JWKS_MIN_REFRESH_INTERVAL
+JWKS_CACHE_TTL = float(os.getenv("JWKS_CACHE_TTL", 600))
+JWKS_MIN_REFRESH_INTERVAL = float(os.getenv("JWKS_MIN_REFRESH_INTERVAL", 30))
+# Verified tokens reused without verifying them again
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", 4096))
+AUTH_TOKEN_CACHE_TTL = float(os.getenv("AUTH_TOKEN_CACHE_TTL", 60))
+# Also confirm locally verified tokens with Supabase Auth (once per cache TTL),
+# so signed-out sessions and deleted users are rejected before the token expires
+AUTH_REVOCATION_CHECK = os.getenv("AUTH_REVOCATION_CHECK", "false").lower() == "true"
+
+_ASYMMETRIC_ALGORITHMS = ("RS256", "ES256")
+
+# sha256(token) -> (User, token expiry as a unix timestamp)
+token_cache = TTLCache(maxsize=AUTH_TOKEN_CACHE_SIZE, ttl=AUTH_TOKEN_CACHE_TTL)
+
+class JWKSCache:
+    """The project's signing keys, fetched lazily and refreshed periodically."""
+
+    def __init__(self, url: Optional[str], ttl: float = JWKS_CACHE_TTL, min_refresh_interval: float = JWKS_MIN_REFRESH_INTERVAL,
+                 timer=time.monotonic):
+        self.url = url
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self._timer = timer
+        self._keys: dict = {}
+        self._fetched_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _fetch(self) -> None:
+        response = httpx.get(self.url, timeout=5.0)
+        response.raise_for_status()
+        self._keys = {key.get("kid"): key for key in response.json().get("keys", [])}
+        self._fetched_at = self._timer()
+
+    def get_key(self, kid: Optional[str]) -> Optional[dict]:
+        """
+        Signing key `kid`, refreshing the JWKS when it is stale or the key is
+        unknown (rotation). Returns None when the JWKS is unavailable and
+        raises JWTError when it does not contain the key.
+        """
+        if not self.url:
+            return None
+        with self._lock:
+            now = self._timer()
+            stale = self._fetched_at is None or now - self._fetched_at >= self.ttl
+            unknown = kid not in self._keys and (self._fetched_at is None or now - self._fetched_at >= self.min_refresh_interval)
+            if stale or unknown:
+                try:
+                    self._fetch()
+                except Exception as e:
+                    logger.warning(f"Could not fetch JWKS from {self.url}: {e}")
+            if self._fetched_at is None:
+                return None
+            if kid not in self._keys:
+                raise JWTError(f"Unknown signing key {kid}")
+            return self._keys[kid]
+
+jwks = JWKSCache(SUPABASE_JWKS_URL)
+
 # JWT configuration for internal token generation (if needed)
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
@@ -55,15 +131,82 @@ def get_current_user_from_token(credentials: HTTPAuthorizationCredentials = Depe
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+def _credentials_error(detail: str = "Could not validate credentials") -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+def _user_from_claims(claims: dict) -> schemas.User:
+    """Build the user from Supabase access token claims, mirroring the Supabase Auth user fields."""
+    user_data = claims.get("user_metadata") or {}
+    return schemas.User(
+        id=claims["sub"],
+        username=user_data.get("username", user_data.get("user_name", "")) or claims.get("email"),
+        email=claims.get("email"),
+        # The top-level `role` claim is the Postgres role ("authenticated"); the app role lives in user_metadata
+        role=user_data.get("role", "recruiter"),
+        is_active=True
+    )
+
+def _verification_key(token: str):
+    """Key and algorithm to verify `token` locally, or (None, None) when only Supabase Auth can verify it."""
+    header = jwt.get_unverified_header(token)
+    algorithm = header.get("alg")
+    if algorithm == "HS256":
+        return SUPABASE_JWT_SECRET, algorithm
+    if algorithm in _ASYMMETRIC_ALGORITHMS:
+        return jwks.get_key(header.get("kid")), algorithm
+    raise JWTError(f"Unsupported token algorithm {algorithm}")
+
+def _verify_remotely(token: str, supabase: Client) -> schemas.User:
+    user_response = supabase.auth.get_user(token)
+    user_data = user_response.user.user_metadata or {}
+    # Supabase stores user data in a different structure.
+    # We need to adapt it to our Pydantic schema.
+    return schemas.User(
+        id=user_response.user.id, # Supabase uses UUIDs for user IDs
+        username=user_data.get("username", user_data.get("user_name", "")) or user_response.user.email,
+        email=user_response.user.email,
+        role=user_data.get("role", "recruiter"), # Assumes you have a 'role' in user_metadata
+        is_active=True # Supabase users are active by default
+    )
+
+def verify_token(token: str, supabase: Client) -> schemas.User:
+    """
+    Resolve a Supabase access token to its user.
+
+    The signature, expiry and audience are checked locally; the user is built
+    from the claims and cached until the token expires or AUTH_TOKEN_CACHE_TTL
+    passes, whichever is first. Supabase Auth is only called when the token
+    cannot be verified locally (no secret configured, JWKS unavailable) or when
+    AUTH_REVOCATION_CHECK is enabled. Raises JWTError for invalid tokens.
+    """
+    cache_key = hashlib.sha256(token.encode()).hexdigest()
+    cached = token_cache.get(cache_key)
+    if cached is not None and cached[1] > time.time():
+        return cached[0]
+
+    key, algorithm = _verification_key(token)
+    if key is None:
+        user = _verify_remotely(token, supabase)
+        expires_at = jwt.get_unverified_claims(token).get("exp") or 0
+    else:
+        claims = jwt.decode(token, key, algorithms=[algorithm], audience=SUPABASE_JWT_AUDIENCE)
+        if AUTH_REVOCATION_CHECK:
+            user = _verify_remotely(token, supabase)
+        else:
+            user = _user_from_claims(claims)
+        expires_at = claims.get("exp") or 0
+    token_cache.set(cache_key, (user, expires_at))
+    return user
+
 def get_current_user(request: Request, supabase: Client = Depends(get_supabase)) -> schemas.User:
     """Get current user from Supabase Auth token"""
     auth_header = request.headers.get("Authorization")
     if not auth_header:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Authorization header missing",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise _credentials_error("Authorization header missing")
 
     # Handle both "Bearer token" and "token" formats
     if auth_header.startswith("Bearer "):
@@ -72,31 +215,12 @@ def get_current_user(request: Request, supabase: Client = Depends(get_supabase))
         token = auth_header
 
     if not token:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Bearer token missing",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise _credentials_error("Bearer token missing")
 
     try:
-        user_response = supabase.auth.get_user(token)
-        user_data = user_response.user.user_metadata or {}
-        # Supabase stores user data in a different structure.
-        # We need to adapt it to our Pydantic schema.
-        user = schemas.User(
-            id=user_response.user.id, # Supabase uses UUIDs for user IDs
-            username=user_data.get("username", user_data.get("user_name", "")) or user_response.user.email,
-            email=user_response.user.email,
-            role=user_data.get("role", "recruiter"), # Assumes you have a 'role' in user_metadata
-            is_active=True # Supabase users are active by default
-        )
-        return user
+        return verify_token(token, supabase)
     except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail=f"Could not validate credentials: {e}",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise _credentials_error(f"Could not validate credentials: {e}")
 
 def get_current_admin_user(current_user: schemas.User = Depends(get_current_user)):
     if current_user.role != "admin":
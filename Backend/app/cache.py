@@ -0,0 +1,174 @@
+import os
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+class CacheStats:
+    """Hit/miss/eviction counters shared by the cache tiers."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+class TTLCache:
+    """
+    Thread-safe in-process LRU cache with optional time-to-live.
+
+    Args:
+        maxsize: Maximum number of entries kept; the least recently used entry is evicted first
+        ttl: Seconds an entry stays valid, or None to keep entries until evicted
+        timer: Clock used for expiry (overridable in tests)
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None, timer: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = CacheStats()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= self._timer():
+                del self._data[key]
+                self.stats.evictions += 1
+                self.stats.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.stats.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        expires_at = self._timer() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.stats.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[0] if entry is not None else default
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and (entry[1] is None or entry[1] > self._timer())
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+class SQLiteCache:
+    """
+    Persistent key -> bytes store backed by a local SQLite file.
+
+    Entries survive process restarts. When `max_entries` is exceeded the least
+    recently accessed rows are deleted; rows older than `ttl` seconds are treated
+    as missing and purged lazily.
+    """
+
+    def __init__(self, path: str, ttl: Optional[float] = None, max_entries: Optional[int] = None, table: str = "cache"):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed_at_idx ON {table} (accessed_at)")
+        self._conn.commit()
+        self.stats = CacheStats()
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats.misses += 1
+                return None
+            value, created_at = row
+            if self.ttl and created_at + self.ttl <= now:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._conn.commit()
+                self.stats.evictions += 1
+                self.stats.misses += 1
+                return None
+            self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.stats.hits += 1
+            return value
+
+    def set(self, key: str, value: bytes) -> None:
+        self.set_many({key: value})
+
+    def set_many(self, items: Dict[str, bytes]) -> None:
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                [(k, sqlite3.Binary(v), now, now) for k, v in items.items()]
+            )
+            if self.max_entries:
+                (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+                overflow = count - self.max_entries
+                if overflow > 0:
+                    self._conn.execute(
+                        f"DELETE FROM {self.table} WHERE key IN "
+                        f"(SELECT key FROM {self.table} ORDER BY accessed_at ASC LIMIT ?)",
+                        (overflow,)
+                    )
+                    self.stats.evictions += overflow
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        return count
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,12 +1,17 @@
 import json
+import base64
 import hashlib
 import logging
 import os
+import time
+import threading
 import httpx
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator, Tuple
+from postgrest.exceptions import APIError
 from supabase import Client
 from supabase import create_client
 from . import schemas
+from .cache import TTLCache
 from .database import get_supabase
 from .parsing import to_bool
 
@@ -14,6 +19,23 @@ from .parsing import to_bool
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# JD rows resolved by get_or_create_job_description, keyed by content hash, so repeated
+# matches against the same JD skip the database; TTL bounds staleness across servers
+JD_ROW_CACHE_SIZE = int(os.getenv("JD_ROW_CACHE_SIZE", 512))
+JD_ROW_CACHE_TTL = float(os.getenv("JD_ROW_CACHE_TTL", 300))
+jd_row_cache = TTLCache(maxsize=JD_ROW_CACHE_SIZE, ttl=JD_ROW_CACHE_TTL or None)
+# Content hashes cached per JD id, to drop a JD's entries when it is updated
+_jd_row_hashes: Dict[int, set] = {}
+_jd_row_lock = threading.Lock()
+
+# Admin user directory: the auth user list is loaded page by page and kept in memory,
+# reloaded after USER_DIRECTORY_TTL seconds and updated in place on create/delete
+USER_DIRECTORY_TTL = float(os.getenv("USER_DIRECTORY_TTL", 300))
+USER_DIRECTORY_PAGE_SIZE = int(os.getenv("USER_DIRECTORY_PAGE_SIZE", 1000))
+
+_admin_client: Optional[Client] = None
+_admin_client_lock = threading.Lock()
+
 def _create_jd_content_hash(jd: schemas.JDModel) -> str:
     """
     Creates a SHA256 hash of the core, identifying content of the JD.
@@ -47,10 +69,126 @@ def ensure_complete_skill_presence(skill_presence: dict, skill_categories: dict)
     return skill_presence
 
 # User CRUD operations
+def get_admin_client(supabase: Client) -> Client:
+    """
+    Shared client for Supabase Auth admin calls, created once with the service role key
+    (falls back to `supabase` when the credentials are not in the environment).
+    """
+    global _admin_client
+    if _admin_client is None:
+        url = os.environ.get("SUPABASE_URL")
+        key = os.environ.get("SUPABASE_KEY")
+        if not url or not key:
+            return supabase
+        with _admin_client_lock:
+            if _admin_client is None:
+                _admin_client = create_client(url, key)
+    return _admin_client
+
+def _user_from_auth(user_data) -> schemas.User:
+    """Convert a Supabase Auth user (SDK object) to the User schema."""
+    user_metadata = user_data.user_metadata or {}
+    return schemas.User(
+        id=user_data.id,
+        username=user_metadata.get("username", user_data.email.split('@')[0]),
+        email=user_data.email,
+        role=user_metadata.get("role", "recruiter"),
+        is_active=True, # Supabase users are active by default
+        created_at=user_data.created_at
+    )
+
+class UserDirectory:
+    """
+    In-memory index of Supabase Auth users by id and username.
+
+    The full list is loaded with paginated `admin.list_users` calls on first use
+    and again once `ttl` seconds have passed; user creation and deletion through
+    the API update the index in place so admins see their changes immediately.
+    """
+
+    def __init__(self, ttl: float = USER_DIRECTORY_TTL, page_size: int = USER_DIRECTORY_PAGE_SIZE, timer=time.monotonic):
+        self.ttl = ttl
+        self.page_size = page_size
+        self._timer = timer
+        self._by_id: Dict[str, schemas.User] = {}
+        self._by_username: Dict[str, List[str]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _index(self, users: List[schemas.User]) -> None:
+        self._by_id = {user.id: user for user in users}
+        self._by_username = {}
+        for user in users:
+            self._by_username.setdefault(user.username, []).append(user.id)
+
+    def _load(self, supabase: Client) -> None:
+        client = get_admin_client(supabase)
+        users = []
+        page = 1
+        while True:
+            batch = client.auth.admin.list_users(page=page, per_page=self.page_size)
+            users.extend(_user_from_auth(u) for u in batch)
+            if len(batch) < self.page_size:
+                break
+            page += 1
+        self._index(users)
+        self._loaded_at = self._timer()
+        logger.info(f"Loaded {len(users)} users into the user directory")
+
+    def _ensure_loaded(self, supabase: Client) -> None:
+        with self._lock:
+            if self._loaded_at is None or self._timer() - self._loaded_at >= self.ttl:
+                self._load(supabase)
+
+    def list(self, supabase: Client, skip: int = 0, limit: int = 100, username: str = None) -> List[schemas.User]:
+        self._ensure_loaded(supabase)
+        with self._lock:
+            if username:
+                users = [self._by_id[user_id] for user_id in self._by_username.get(username, [])]
+            else:
+                users = list(self._by_id.values())
+        return users[skip : skip + limit]
+
+    def get(self, user_id: str) -> Optional[schemas.User]:
+        with self._lock:
+            return self._by_id.get(user_id)
+
+    def add(self, user: schemas.User) -> None:
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            self._discard(user.id)
+            self._by_id[user.id] = user
+            self._by_username.setdefault(user.username, []).append(user.id)
+
+    def discard(self, user_id: str) -> None:
+        with self._lock:
+            self._discard(user_id)
+
+    def _discard(self, user_id: str) -> None:
+        user = self._by_id.pop(user_id, None)
+        if user is not None:
+            ids = self._by_username.get(user.username, [])
+            if user_id in ids:
+                ids.remove(user_id)
+            if not ids:
+                self._by_username.pop(user.username, None)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._by_id = {}
+            self._by_username = {}
+            self._loaded_at = None
+
+user_directory = UserDirectory()
+
 def get_user(supabase: Client, user_id: str):
-    """Get user by ID from Supabase Auth"""
+    """Get user by ID from the user directory, falling back to Supabase Auth"""
+    user = user_directory.get(user_id)
+    if user is not None:
+        return user
     try:
-        response = supabase.auth.admin.get_user_by_id(user_id)
+        response = get_admin_client(supabase).auth.admin.get_user_by_id(user_id)
         # Handle different response formats
         user_data = None
         if hasattr(response, 'user'):
@@ -63,14 +201,9 @@ def get_user(supabase: Client, user_id: str):
             user_data = response['data']
         
         if user_data:
-            return schemas.User(
-                id=user_data.id,
-                username=user_data.user_metadata.get("username", user_data.email.split('@')[0]),
-                email=user_data.email,
-                role=user_data.user_metadata.get("role", "recruiter"),
-                is_active=True,
-                created_at=user_data.created_at
-            )
+            user = _user_from_auth(user_data)
+            user_directory.add(user)
+            return user
     except Exception as e:
         logger.error(f"Error getting user by ID via SDK: {e}")
         # Fallback: try direct HTTP admin API using service role key
@@ -121,58 +254,9 @@ def get_user_by_email(supabase: Client, email: str):
     return None
 
 def get_users(supabase: Client, skip: int = 0, limit: int = 100, username: str = None):
-    """Get users from Supabase Auth"""
+    """Get users from the cached Supabase Auth user directory"""
     try:
-        # For admin operations, create a fresh client to ensure proper auth context
-        # This can help avoid initialization timing issues
-        url: str = os.environ.get("SUPABASE_URL")
-        key: str = os.environ.get("SUPABASE_KEY")
-        
-        if url and key:
-            # Create a fresh client for admin operations
-            admin_supabase: Client = create_client(url, key)
-            response = admin_supabase.auth.admin.list_users()
-        else:
-            # Fallback to the provided client
-            response = supabase.auth.admin.list_users()
-        
-        # Handle different response formats from Supabase client
-        users = []
-        if hasattr(response, 'users'):
-            users = response.users
-        elif isinstance(response, dict) and 'users' in response:
-            users = response['users']
-        elif isinstance(response, list):
-            users = response
-        elif hasattr(response, 'data'):
-            data = response.data
-            if isinstance(data, list):
-                users = data
-            elif isinstance(data, dict) and 'users' in data:
-                users = data['users']
-        elif isinstance(response, dict) and 'data' in response:
-            data = response['data']
-            if isinstance(data, list):
-                users = data
-            elif isinstance(data, dict) and 'users' in data:
-                users = data['users']
-        
-        # Convert Supabase User objects to your User schema
-        schema_users = [
-            schemas.User(
-                id=u.id,
-                username=u.user_metadata.get("username", u.email.split('@')[0]),
-                email=u.email,
-                role=u.user_metadata.get("role", "recruiter"),
-                is_active=True, # Supabase users are active by default
-                created_at=u.created_at
-            ) for u in users
-        ]
-        
-        if username:
-            schema_users = [u for u in schema_users if u.username == username]
-            
-        return schema_users[skip : skip + limit]
+        return user_directory.list(supabase, skip=skip, limit=limit, username=username)
     except Exception as e:
         logger.error(f"Error getting users: {e}", exc_info=True)
         return []
@@ -196,7 +280,7 @@ def create_user(supabase: Client, user: schemas.UserCreate):
                 # SDK may return object with .user or dict
                 new_user = getattr(resp, 'user', None) or (resp.get('user') if isinstance(resp, dict) else None)
                 if new_user:
-                    return schemas.User(
+                    created = schemas.User(
                         id=new_user.id,
                         username=(new_user.user_metadata or {}).get('username', new_user.email.split('@')[0]),
                         email=new_user.email,
@@ -204,6 +288,8 @@ def create_user(supabase: Client, user: schemas.UserCreate):
                         is_active=True,
                         created_at=new_user.created_at
                     )
+                    user_directory.add(created)
+                    return created
             except Exception as sdk_e:
                 logger.warning(f"SDK admin.create_user failed: {sdk_e}")
 
@@ -235,7 +321,7 @@ def create_user(supabase: Client, user: schemas.UserCreate):
             if r.status_code in (200, 201):
                 data = r.json()
                 user_data = data.get('user', data)
-                return schemas.User(
+                created = schemas.User(
                     id=user_data.get('id'),
                     username=(user_data.get('user_metadata') or {}).get('username', (user_data.get('email') or '').split('@')[0]),
                     email=user_data.get('email'),
@@ -243,6 +329,8 @@ def create_user(supabase: Client, user: schemas.UserCreate):
                     is_active=True,
                     created_at=user_data.get('created_at')
                 )
+                user_directory.add(created)
+                return created
             else:
                 logger.error(f"HTTP admin create user failed: {r.status_code} {r.text}")
         except httpx.HTTPError as he:
@@ -282,6 +370,7 @@ def delete_user(supabase: Client, user_id: str):
         
         if response.status_code in [200, 204]:
             logger.info(f"Successfully deleted user: {user.email}")
+            user_directory.discard(user_id)
             return user
         else:
             error_detail = response.json() if response.text else {}
@@ -318,61 +407,94 @@ def get_jd(supabase: Client, jd_id: int):
         logger.error(f"Error getting job description: {e}")
     return None
 
+def _remember_jd(content_hash: str, db_jd: schemas.JobDescription) -> None:
+    with _jd_row_lock:
+        jd_row_cache.set(content_hash, db_jd)
+        _jd_row_hashes.setdefault(db_jd.id, set()).add(content_hash)
+
+def forget_jd(jd_id: int) -> None:
+    """Drop a JD from the JD row cache (after it changed in the database)"""
+    with _jd_row_lock:
+        for content_hash in _jd_row_hashes.pop(jd_id, ()):
+            jd_row_cache.pop(content_hash)
+
+def _jd_insert_data(jd: schemas.JDModel, content_hash: str) -> dict:
+    return {
+        "job_id_str": jd.jobId,
+        "content_hash": content_hash,
+        "job_title": jd.jobTitle,
+        "company_name": jd.companyProfile.companyName,
+        "location": f"{jd.location.city}, {jd.location.state}" if jd.location else None,
+        "ctc": jd.compensationAndBenefits.salaryRange if jd.compensationAndBenefits else None,
+        "details": jd.dict()
+    }
+
 def get_or_create_job_description(supabase: Client, jd: schemas.JDModel):
-    """Get or create job description in Supabase"""
-    try:
-        # First, try to find by the LLM-provided jobId (if it exists and is not empty)
-        db_jd_by_job_id = None
-        if jd.jobId:
-            response = supabase.table("job_descriptions").select("*").eq("job_id_str", jd.jobId).execute()
-            if response.data:
-                db_jd_by_job_id = response.data[0]
-                logger.info(f"Found existing JD by jobId '{jd.jobId}' (ID: {db_jd_by_job_id['id']})")
-                return _convert_to_schema(db_jd_by_job_id)
+    """
+    Get or create job description in Supabase.
 
-        # If not found by jobId, or jobId was missing/empty, use content hash
-        content_hash = _create_jd_content_hash(jd)
-        response = supabase.table("job_descriptions").select("*").eq("content_hash", content_hash).execute()
-        
-        if response.data:
-            db_jd_by_hash = response.data[0]
-            logger.info(f"Found existing JD by content hash '{content_hash}' (ID: {db_jd_by_hash['id']})")
-            # If the found JD doesn't have a job_id_str, but the new one does, update it.
-            if not db_jd_by_hash.get("job_id_str") and jd.jobId:
-                logger.info(f"Updating existing JD (ID: {db_jd_by_hash['id']}) with jobId: {jd.jobId}")
-                update_response = supabase.table("job_descriptions").update({
-                    "job_id_str": jd.jobId
-                }).eq("id", db_jd_by_hash["id"]).execute()
-                if update_response.data:
-                    db_jd_by_hash = update_response.data[0]
-            return _convert_to_schema(db_jd_by_hash)
-
-        # If not found by either method, create a new one
-        logger.info(f"Creating new JD with content hash '{content_hash}'")
-        location_str = f"{jd.location.city}, {jd.location.state}" if jd.location else None
-        ctc_str = jd.compensationAndBenefits.salaryRange if jd.compensationAndBenefits else None
+    Resolved in one round trip by the get_or_create_job_description database
+    function (see add_jd_get_or_create_function.sql): by jobId first, then by
+    content hash, inserting the JD when neither matches. Repeated calls for
+    the same JD content are served from the JD row cache.
+    """
+    content_hash = _create_jd_content_hash(jd)
+    db_jd = jd_row_cache.get(content_hash)
+    if db_jd is not None:
+        return db_jd
 
-        insert_data = {
-            "job_id_str": jd.jobId,
-            "content_hash": content_hash,
-            "job_title": jd.jobTitle,
-            "company_name": jd.companyProfile.companyName,
-            "location": location_str,
-            "ctc": ctc_str,
-            "details": jd.dict()
-        }
-        
-        response = supabase.table("job_descriptions").insert(insert_data).execute()
-        if response.data:
-            return _convert_to_schema(response.data[0])
+    try:
+        params = {f"p_{key}": value for key, value in _jd_insert_data(jd, content_hash).items()}
+        try:
+            response = supabase.rpc("get_or_create_job_description", params).execute()
+        except APIError as e:
+            # PGRST202: the database function is missing (migration not applied yet)
+            if e.code != "PGRST202":
+                raise
+            logger.warning("Database function get_or_create_job_description is missing; run add_jd_get_or_create_function.sql")
+            db_jd = _get_or_create_job_description_by_queries(supabase, jd, content_hash)
         else:
-            logger.error(f"Insert returned no data for JD")
-            return None
+            db_jd = _convert_to_schema(response.data[0]) if response.data else None
+            if db_jd is None:
+                logger.error(f"get_or_create_job_description returned no data for JD")
     except Exception as e:
         logger.error(f"Error getting or creating job description: {e}")
         # Re-raise the exception so the endpoint can handle it properly
         raise
 
+    if db_jd is not None:
+        _remember_jd(content_hash, db_jd)
+    return db_jd
+
+def _get_or_create_job_description_by_queries(supabase: Client, jd: schemas.JDModel, content_hash: str):
+    """Fallback for databases without the get_or_create_job_description function: the same resolution in up to four queries"""
+    # First, try to find by the LLM-provided jobId (if it exists and is not empty)
+    if jd.jobId:
+        response = supabase.table("job_descriptions").select("*").eq("job_id_str", jd.jobId).execute()
+        if response.data:
+            return _convert_to_schema(response.data[0])
+
+    # If not found by jobId, or jobId was missing/empty, use content hash
+    response = supabase.table("job_descriptions").select("*").eq("content_hash", content_hash).execute()
+    if response.data:
+        db_jd_by_hash = response.data[0]
+        # If the found JD doesn't have a job_id_str, but the new one does, update it.
+        if not db_jd_by_hash.get("job_id_str") and jd.jobId:
+            update_response = supabase.table("job_descriptions").update({
+                "job_id_str": jd.jobId
+            }).eq("id", db_jd_by_hash["id"]).execute()
+            if update_response.data:
+                db_jd_by_hash = update_response.data[0]
+        return _convert_to_schema(db_jd_by_hash)
+
+    # If not found by either method, create a new one
+    logger.info(f"Creating new JD with content hash '{content_hash}'")
+    response = supabase.table("job_descriptions").insert(_jd_insert_data(jd, content_hash)).execute()
+    if response.data:
+        return _convert_to_schema(response.data[0])
+    logger.error(f"Insert returned no data for JD")
+    return None
+
 def get_jds(supabase: Client, skip: int = 0, limit: int = 100):
     """Get job descriptions from Supabase, sorted by creation date (latest first)"""
     try:
@@ -383,12 +505,37 @@ def get_jds(supabase: Client, skip: int = 0, limit: int = 100):
         logger.error(f"Error getting job descriptions: {e}")
     return []
 
+def get_jds_by_ids(supabase: Client, jd_ids: List[int]) -> Dict[int, schemas.JobDescription]:
+    """Return the given job descriptions, keyed by id"""
+    if not jd_ids:
+        return {}
+    try:
+        response = supabase.table("job_descriptions").select("*").in_("id", jd_ids).execute()
+        return {row["id"]: _convert_to_schema(row) for row in response.data or []}
+    except Exception as e:
+        logger.error(f"Error fetching job descriptions: {e}")
+        return {}
+
+def iter_active_jds(supabase: Client, batch_size: int = 500) -> Iterator[schemas.JobDescription]:
+    """Yield every job description with status 'Active', fetched in pages of `batch_size`"""
+    last_id = 0
+    while True:
+        response = (supabase.table("job_descriptions").select("*").eq("status", "Active").gt("id", last_id)
+                    .order("id").limit(batch_size).execute())
+        rows = response.data or []
+        for row in rows:
+            yield _convert_to_schema(row)
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1]["id"]
+
 def update_jd(supabase: Client, jd_id: int, jd_update: schemas.JobDescriptionUpdate):
     """Update job description in Supabase"""
     try:
         update_data = jd_update.dict(exclude_unset=True)
         if update_data:
             response = supabase.table("job_descriptions").update(update_data).eq("id", jd_id).execute()
+            forget_jd(jd_id)
             if response.data:
                 return _convert_to_schema(response.data[0])
     except Exception as e:
@@ -412,80 +559,158 @@ def update_jd_details(supabase: Client, jd_id: int, jd_update: schemas.JobDescri
         }
         
         response = supabase.table("job_descriptions").update(update_data).eq("id", jd_id).execute()
+        forget_jd(jd_id)
         if response.data:
             return _convert_to_schema(response.data[0])
     except Exception as e:
         logger.error(f"Error updating job description details: {e}")
     return None
 
-def get_jd_results(supabase: Client, jd_id: int):
-    """Get job description results from Supabase, sorted by creation date (latest first)"""
+# Columns read for result listings; the JD row and the candidate's stored profile are never needed
+_RESULT_COLUMNS = "id, score, match_level, created_at"
+_RESULT_CANDIDATE_COLUMNS = "candidate:candidates(id, name, email, phone, assessment_result, recruiter_id, uploaded_at)"
+
+# Sort orders of result listings: (column, cast applied to cursor values)
+_RESULT_ORDERS = {"created_at": str, "score": float}
+
+def encode_cursor(sort_value: Any, result_id: int) -> str:
+    """Opaque keyset cursor pointing after the result (sort_value, id)"""
+    return base64.urlsafe_b64encode(json.dumps([sort_value, result_id]).encode()).decode()
+
+def decode_cursor(cursor: str, order_by: str = "created_at") -> Tuple[Any, int]:
+    """Inverse of encode_cursor for a listing sorted by `order_by`; raises ValueError for malformed cursors"""
     try:
-        response = supabase.table("analysis_results").select("""
-            *,
-            job_description:job_descriptions(*),
-            candidate:candidates(*)
-        """).eq("job_description_id", jd_id).order("created_at", desc=True).execute()
-        if response.data:
-            results = []
-            for item in response.data:
-                # Convert to schema (simplified)
-                results.append(schemas.AnalysisResult(
-                    id=item["id"],
-                    score=item["score"],
-                    match_level=item["match_level"],
-                    details=item.get("details", {}),
-                    candidate=schemas.Candidate(
-                        id=item["candidate"]["id"],
-                        name=item["candidate"]["name"],
-                        email=item["candidate"]["email"]
-                    ) if item.get("candidate") else None
-                ))
-            return results
+        sort_value, result_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return _RESULT_ORDERS[order_by](sort_value), int(result_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def _result_from_row(item: dict) -> schemas.AnalysisResult:
+    candidate_data = item.get("candidate")
+    return schemas.AnalysisResult(
+        id=item["id"],
+        score=item["score"],
+        match_level=item["match_level"],
+        details=item.get("details"),
+        created_at=item.get("created_at"),
+        candidate=schemas.Candidate(
+            id=candidate_data["id"],
+            name=candidate_data["name"],
+            email=candidate_data["email"],
+            phone=candidate_data.get("phone"),
+            assessment_result=candidate_data.get("assessment_result"),
+            recruiter_id=candidate_data.get("recruiter_id"),
+            uploaded_at=candidate_data.get("uploaded_at")
+        ) if candidate_data else None
+    )
+
+def _list_analysis_results(supabase: Client, column: str, value: Any, limit: int, after: Optional[Tuple[Any, int]],
+                           summary: bool, order_by: str = "created_at", min_score: Optional[float] = None,
+                           match_level: Optional[str] = None, status: Optional[str] = None,
+                           latest: bool = False) -> Tuple[List[schemas.AnalysisResult], Optional[str]]:
+    """
+    One page of analysis results where `column` equals `value`, sorted by
+    `order_by` (descending), starting after the decoded cursor `after`.
+
+    Pages are keyset-paginated on (order_by, id) so deep pages cost the same as
+    the first; the returned cursor is None on the last page. `summary` leaves out
+    the per-result `details` JSON. The filters run in the database; `latest`
+    reads the latest_analysis_results view, which keeps only the newest result
+    of each candidate per JD.
+    """
+    columns = _RESULT_COLUMNS if summary else f"{_RESULT_COLUMNS}, details"
+    table = "latest_analysis_results" if latest else "analysis_results"
+    query = supabase.table(table).select(f"{columns}, {_RESULT_CANDIDATE_COLUMNS}").eq(column, value)
+    if min_score is not None:
+        query = query.gte("score", min_score)
+    if match_level:
+        query = query.eq("match_level", match_level)
+    if status:
+        query = query.eq("details->>status", status)
+    if after:
+        sort_value, result_id = after
+        query = query.or_(f'{order_by}.lt."{sort_value}",and({order_by}.eq."{sort_value}",id.lt.{result_id})')
+    # One extra row tells whether another page follows
+    response = query.order(order_by, desc=True).order("id", desc=True).limit(limit + 1).execute()
+    rows = response.data or []
+    next_cursor = encode_cursor(rows[limit - 1][order_by], rows[limit - 1]["id"]) if len(rows) > limit else None
+    return [_result_from_row(item) for item in rows[:limit]], next_cursor
+
+def get_jd_results(supabase: Client, jd_id: int, limit: int = 100, cursor: Optional[str] = None, summary: bool = False,
+                   order_by: str = "created_at", min_score: Optional[float] = None, match_level: Optional[str] = None,
+                   status: Optional[str] = None, latest: bool = False) -> Tuple[List[schemas.AnalysisResult], Optional[str]]:
+    """
+    Get one page of a job description's results and the next cursor, sorted by
+    creation date or score (highest first) and optionally filtered by minimum
+    score, match level and status (Pass/Rejected/Pending)
+    """
+    if order_by not in _RESULT_ORDERS:
+        raise ValueError(f"Cannot order results by {order_by}")
+    after = decode_cursor(cursor, order_by) if cursor else None
+    try:
+        return _list_analysis_results(supabase, "job_description_id", jd_id, limit, after, summary, order_by=order_by,
+                                      min_score=min_score, match_level=match_level, status=status, latest=latest)
     except Exception as e:
         logger.error(f"Error getting job description results: {e}")
-    return []
+    return [], None
 
-def get_user_analyses(supabase: Client, user_id: str):
-    """Get user analyses from Supabase, sorted by creation date (latest first)"""
+def get_user_analyses(supabase: Client, user_id: str, limit: int = 100, cursor: Optional[str] = None,
+                      summary: bool = False) -> Tuple[List[schemas.AnalysisResult], Optional[str]]:
+    """Get one page of a user's analyses, sorted by creation date (latest first), and the next cursor"""
+    after = decode_cursor(cursor) if cursor else None
     try:
-        response = supabase.table("analysis_results").select("""
-            *,
-            job_description:job_descriptions(*),
-            candidate:candidates(*)
-        """).eq("user_id", user_id).order("created_at", desc=True).execute()
-        if response.data:
-            results = []
-            for item in response.data:
-                # Convert to schema (simplified)
-                candidate_data = item.get("candidate")
-                candidate = None
-                if candidate_data:
-                    candidate = schemas.Candidate(
-                        id=candidate_data["id"],
-                        name=candidate_data["name"],
-                        email=candidate_data["email"],
-                        phone=candidate_data.get("phone"),
-                        assessment_result=candidate_data.get("assessment_result"),
-                        recruiter_id=candidate_data.get("recruiter_id"),
-                        uploaded_at=candidate_data.get("uploaded_at")
-                    )
-                
-                results.append(schemas.AnalysisResult(
-                    id=item["id"],
-                    score=item["score"],
-                    match_level=item["match_level"],
-                    details=item.get("details", {}),
-                    candidate=candidate
-                ))
-            return results
+        return _list_analysis_results(supabase, "user_id", user_id, limit, after, summary)
     except Exception as e:
         logger.error(f"Error getting user analyses: {e}")
-    return []
+    return [], None
+
+def iter_jd_result_details(supabase: Client, jd_id: int, batch_size: int = 1000) -> Iterator[List[dict]]:
+    """Yield every result of a JD as batches of {"id", "details"} rows, paged by id"""
+    last_id = 0
+    while True:
+        response = (supabase.table("analysis_results").select("id, details").eq("job_description_id", jd_id)
+                    .gt("id", last_id).order("id").limit(batch_size).execute())
+        rows = response.data or []
+        if rows:
+            yield rows
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1]["id"]
+
+def update_analysis_results(supabase: Client, rows: List[dict]) -> int:
+    """
+    Write new score, match_level and details for existing results in one request.
+
+    Each row holds "id", "score", "match_level" and "details". The
+    update_analysis_results database function (see
+    add_analysis_results_update_function.sql) applies them as a single UPDATE,
+    so results deleted in the meantime are skipped rather than re-created.
+    Returns the number of results updated.
+    """
+    if not rows:
+        return 0
+    try:
+        response = supabase.rpc("update_analysis_results", {"p_rows": rows}).execute()
+    except APIError as e:
+        # PGRST202: the database function is missing (migration not applied yet)
+        if e.code != "PGRST202":
+            raise
+        logger.warning("Database function update_analysis_results is missing; run add_analysis_results_update_function.sql")
+        return _update_analysis_results_by_queries(supabase, rows)
+    return response.data or 0
+
+def _update_analysis_results_by_queries(supabase: Client, rows: List[dict]) -> int:
+    """Fallback for databases without the update_analysis_results function: one UPDATE per result"""
+    updated = 0
+    for row in rows:
+        values = {key: value for key, value in row.items() if key != "id"}
+        response = supabase.table("analysis_results").update(values).eq("id", row["id"]).execute()
+        updated += len(response.data or [])
+    return updated
 
 # Candidate CRUD operations
-def get_or_create_candidate(supabase: Client, cv: schemas.CVModel, recruiter_id: str, assessment_result: str = None):
-    """Get or create candidate in Supabase"""
+def get_or_create_candidate(supabase: Client, cv: schemas.CVModel, recruiter_id: str, assessment_result: str = None, profile: dict = None):
+    """Get or create candidate in Supabase, storing the serialized CV profile (see matching.CVProfile) when given"""
     try:
         # First, try to find by email
         response = supabase.table("candidates").select("*").eq("email", cv.Personal_Data.email).execute()
@@ -498,6 +723,8 @@ def get_or_create_candidate(supabase: Client, cv: schemas.CVModel, recruiter_id:
                 "recruiter_id": recruiter_id,
                 "assessment_result": assessment_result
             }
+            if profile is not None:
+                update_data["profile"] = profile
             update_response = supabase.table("candidates").update(update_data).eq("id", candidate_data["id"]).execute()
             if update_response.data:
                 return _convert_candidate_to_schema(update_response.data[0])
@@ -510,6 +737,8 @@ def get_or_create_candidate(supabase: Client, cv: schemas.CVModel, recruiter_id:
             "recruiter_id": recruiter_id,
             "assessment_result": assessment_result
         }
+        if profile is not None:
+            insert_data["profile"] = profile
         response = supabase.table("candidates").insert(insert_data).execute()
         if response.data:
             return _convert_candidate_to_schema(response.data[0])
@@ -517,6 +746,103 @@ def get_or_create_candidate(supabase: Client, cv: schemas.CVModel, recruiter_id:
         logger.error(f"Error getting or creating candidate: {e}")
     return None
 
+def _candidate_row(cv: schemas.CVModel, recruiter_id: str, assessment_result: str = None, profile: dict = None) -> dict:
+    return {
+        "name": f"{cv.Personal_Data.firstName or ''} {cv.Personal_Data.lastName or ''}".strip(),
+        "email": cv.Personal_Data.email,
+        "phone": cv.Personal_Data.phone,
+        "recruiter_id": recruiter_id,
+        "assessment_result": assessment_result,
+        "profile": profile
+    }
+
+def upsert_candidates(supabase: Client, candidates: List[dict]) -> List[Optional[schemas.Candidate]]:
+    """
+    Insert or update many candidates in one request, keyed on email.
+
+    Each entry holds the keyword arguments of get_or_create_candidate (cv,
+    recruiter_id and optionally assessment_result and profile). Returns the
+    stored candidates aligned with `candidates`; entries sharing an email are
+    written once (the last one wins) and get the same candidate. When the bulk
+    request fails, each candidate is saved on its own with get_or_create_candidate,
+    so one bad row only loses itself; entries that still fail are None.
+    """
+    if not candidates:
+        return []
+    rows, entries, positions, by_email = [], [], [], {}
+    for entry in candidates:
+        row = _candidate_row(**entry)
+        email = row["email"]
+        if email is not None and email in by_email:
+            rows[by_email[email]] = row
+            entries[by_email[email]] = entry
+        else:
+            if email is not None:
+                by_email[email] = len(rows)
+            rows.append(row)
+            entries.append(entry)
+        positions.append(by_email[email] if email is not None else len(rows) - 1)
+    try:
+        response = supabase.table("candidates").upsert(rows, on_conflict="email").execute()
+    except Exception as e:
+        logger.error(f"Error upserting {len(rows)} candidates, saving them one by one: {e}")
+        stored = [get_or_create_candidate(supabase, **entry) for entry in entries]
+        return [stored[position] for position in positions]
+
+    stored_rows = response.data or []
+    if len(stored_rows) != len(rows):
+        # The rows did not come back one per input: match them by email, and the
+        # email-less ones (always inserted) by their order among email-less rows
+        stored_by_email = {row["email"]: row for row in stored_rows if row.get("email") is not None}
+        without_email = iter([row for row in stored_rows if row.get("email") is None])
+        stored_rows = [stored_by_email.get(row["email"]) if row["email"] is not None else next(without_email, None) for row in rows]
+    stored = []
+    for row in stored_rows:
+        try:
+            stored.append(_convert_candidate_to_schema(row) if row else None)
+        except Exception as e:
+            logger.error(f"Error reading stored candidate {row.get('id')}: {e}")
+            stored.append(None)
+    return [stored[position] for position in positions]
+
+def get_candidates_by_ids(supabase: Client, candidate_ids: List[int]) -> Dict[int, dict]:
+    """Return the id, name, email and stored CV profile of the given candidates, keyed by candidate id"""
+    if not candidate_ids:
+        return {}
+    try:
+        response = supabase.table("candidates").select("id, name, email, profile").in_("id", candidate_ids).execute()
+        return {row["id"]: row for row in response.data or []}
+    except Exception as e:
+        logger.error(f"Error fetching candidates: {e}")
+        return {}
+
+def iter_candidate_profiles(supabase: Client, batch_size: int = 1000) -> Iterator[Tuple[int, dict]]:
+    """Yield (candidate id, stored CV profile) for every candidate that has one, fetched in pages of `batch_size`"""
+    last_id = 0
+    while True:
+        response = (supabase.table("candidates").select("id, profile").gt("id", last_id)
+                    .order("id").limit(batch_size).execute())
+        rows = response.data or []
+        for row in rows:
+            if row.get("profile"):
+                yield row["id"], row["profile"]
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1]["id"]
+
+def iter_candidate_ids(supabase: Client, batch_size: int = 5000) -> Iterator[int]:
+    """Yield the id of every candidate that has a stored CV profile, fetched in pages of `batch_size`"""
+    last_id = 0
+    while True:
+        response = (supabase.table("candidates").select("id").not_.is_("profile", "null").gt("id", last_id)
+                    .order("id").limit(batch_size).execute())
+        rows = response.data or []
+        for row in rows:
+            yield row["id"]
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1]["id"]
+
 # AnalysisResult CRUD operations
 def create_analysis_result(supabase: Client, jd_db_id: int, candidate_db_id: int, user_id: str, result: dict):
     """Create analysis result in Supabase"""
@@ -536,6 +862,39 @@ def create_analysis_result(supabase: Client, jd_db_id: int, candidate_db_id: int
         logger.error(f"Error creating analysis result: {e}")
     return None
 
+def create_analysis_results(supabase: Client, results: List[dict]) -> List[Optional[schemas.AnalysisResult]]:
+    """
+    Insert many analysis results in one request.
+
+    Each entry holds the keyword arguments of create_analysis_result
+    (jd_db_id, candidate_db_id, user_id, result). Returns the stored results
+    aligned with `results`. When the bulk insert fails, each result is inserted
+    on its own so one bad row only loses itself; results that still fail are None.
+    """
+    if not results:
+        return []
+    rows = [
+        {
+            "job_description_id": entry["jd_db_id"],
+            "candidate_id": entry["candidate_db_id"],
+            "user_id": entry["user_id"],
+            "score": entry["result"]["match_score"],
+            "match_level": entry["result"]["match_level"],
+            "details": entry["result"]["match_details"]
+        }
+        for entry in results
+    ]
+    try:
+        response = supabase.table("analysis_results").insert(rows).execute()
+        stored = [_convert_analysis_result_to_schema(row) for row in response.data or []]
+        if len(stored) == len(rows):
+            return stored
+        logger.error(f"Inserting {len(rows)} analysis results returned {len(stored)} rows")
+        return stored + [None] * (len(rows) - len(stored))
+    except Exception as e:
+        logger.error(f"Error creating {len(rows)} analysis results, inserting them one by one: {e}")
+    return [create_analysis_result(supabase, **entry) for entry in results]
+
 # Helper functions
 def _convert_to_schema(data: Dict[str, Any]) -> schemas.JobDescription:
     """Convert database data to JobDescription schema"""
@@ -0,0 +1,81 @@
+import os
+import hashlib
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .cache import TTLCache, SQLiteCache
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially different copies of a text share a cache entry."""
+    return " ".join(text.split())
+
+def embedding_key(model: str, text: str) -> str:
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"{model}:{digest}"
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache keyed by (model name, normalized text hash).
+
+    Lookups go to the in-process LRU tier first and fall back to the optional
+    on-disk SQLite tier; disk hits are promoted into memory. Vectors are kept as
+    float32 in both tiers so a value reads back identically from either one.
+    """
+
+    def __init__(self, memory: TTLCache, disk: Optional[SQLiteCache] = None):
+        self.memory = memory
+        self.disk = disk
+
+    @classmethod
+    def from_env(cls) -> "EmbeddingCache":
+        ttl = float(os.getenv("EMBEDDING_CACHE_TTL", 0)) or None
+        memory = TTLCache(maxsize=int(os.getenv("EMBEDDING_CACHE_SIZE", 10000)), ttl=ttl)
+        disk = None
+        path = os.getenv("EMBEDDING_CACHE_PATH")
+        if path:
+            disk = SQLiteCache(
+                path,
+                ttl=ttl,
+                max_entries=int(os.getenv("EMBEDDING_CACHE_DISK_MAX_ENTRIES", 200000)),
+                table="embeddings"
+            )
+        return cls(memory, disk)
+
+    def get_many(self, model: str, texts: List[str]) -> Dict[str, np.ndarray]:
+        """Return the cached vectors for whichever of `texts` are present."""
+        found = {}
+        for text in texts:
+            if text in found:
+                continue
+            key = embedding_key(model, text)
+            vector = self.memory.get(key)
+            if vector is None and self.disk is not None:
+                blob = self.disk.get(key)
+                if blob is not None:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    self.memory.set(key, vector)
+            if vector is not None:
+                found[text] = vector
+        return found
+
+    def set_many(self, model: str, texts: List[str], vectors: np.ndarray) -> None:
+        blobs = {}
+        for text, vector in zip(texts, vectors):
+            key = embedding_key(model, text)
+            vector = np.asarray(vector, dtype=np.float32)
+            self.memory.set(key, vector)
+            blobs[key] = vector.tobytes()
+        if self.disk is not None:
+            self.disk.set_many(blobs)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> Dict[str, Dict]:
+        stats = {"memory": {**self.memory.stats.as_dict(), "size": len(self.memory)}}
+        if self.disk is not None:
+            stats["disk"] = {**self.disk.stats.as_dict(), "size": len(self.disk)}
+        return stats
@@ -0,0 +1,279 @@
+import os
+import asyncio
+import logging
+import threading
+from typing import List, Optional, Union
+
+import httpx
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Hugging Face Inference API configuration
+HF_API_KEY = os.getenv('HUGGINGFACE_API_KEY')
+# Use BAAI/bge-small-en-v1.5 - works better with HF Inference API
+HF_MODEL = os.getenv('HUGGINGFACE_MODEL', 'BAAI/bge-small-en-v1.5')
+HF_API_URL = f"https://router.huggingface.co/hf-inference/models/{HF_MODEL}"
+
+# "hf" calls the Hugging Face Inference router, "local" runs the model in-process on CPU
+EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'hf').lower()
+
+# Local ONNX backend configuration. The model defaults to HF_MODEL; point
+# LOCAL_EMBEDDING_ONNX_FILE at a quantized int8 export to trade a little accuracy for speed.
+LOCAL_EMBEDDING_MODEL_DIR = os.getenv('LOCAL_EMBEDDING_MODEL_DIR')
+LOCAL_EMBEDDING_REPO = os.getenv('LOCAL_EMBEDDING_REPO', HF_MODEL)
+LOCAL_EMBEDDING_ONNX_FILE = os.getenv('LOCAL_EMBEDDING_ONNX_FILE', 'onnx/model.onnx')
+LOCAL_EMBEDDING_THREADS = int(os.getenv('LOCAL_EMBEDDING_THREADS', 0))  # 0 lets ONNX Runtime decide
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv('LOCAL_EMBEDDING_BATCH_SIZE', 32))
+LOCAL_EMBEDDING_MAX_LENGTH = int(os.getenv('LOCAL_EMBEDDING_MAX_LENGTH', 512))
+LOCAL_EMBEDDING_POOLING = os.getenv('LOCAL_EMBEDDING_POOLING', 'cls').lower()  # bge models use CLS pooling
+
+# Connection pool sizing for the shared embedding client
+EMBEDDING_HTTP_TIMEOUT = float(os.getenv('EMBEDDING_HTTP_TIMEOUT', 30.0))
+EMBEDDING_HTTP_MAX_CONNECTIONS = int(os.getenv('EMBEDDING_HTTP_MAX_CONNECTIONS', 20))
+EMBEDDING_HTTP_KEEPALIVE = int(os.getenv('EMBEDDING_HTTP_KEEPALIVE', 10))
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def _parse_embeddings(response: httpx.Response) -> np.ndarray:
+    # If the model is not available or payload invalid, HF will return a JSON error message
+    if response.status_code != 200:
+        # Log response body for debugging
+        try:
+            body = response.json()
+        except Exception:
+            body = response.text
+        logger.error(f"HF API returned status {response.status_code}: {body}")
+
+    response.raise_for_status()
+    result = response.json()
+
+    # Convert HF response to numpy array
+    # HF returns a list of floats for single input, or list[list[float]] for batch
+    if isinstance(result, list) and len(result) > 0 and isinstance(result[0], (int, float)):
+        return np.array([result])
+    elif isinstance(result, list):
+        return np.array(result)
+    else:
+        # Unexpected format
+        raise RuntimeError(f"Unexpected HF response format: {type(result)} - {result}")
+
+class HFEmbeddingClient:
+    """
+    Pooled client for the Hugging Face Inference router.
+
+    Holds one sync `httpx.Client` and one `httpx.AsyncClient` for the lifetime of
+    the process, so TCP/TLS connections are reused across requests (over HTTP/2
+    when the `h2` package is installed). Both clients are created lazily and
+    closed by `close()` / `aclose()`.
+    """
+
+    def __init__(self, api_url: str = HF_API_URL, api_key: Optional[str] = HF_API_KEY, model_name: str = HF_MODEL):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.model_name = model_name
+        self._client: Optional[httpx.Client] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._lock = threading.Lock()
+
+    def _client_options(self) -> dict:
+        if not self.api_key:
+            raise ValueError("HUGGINGFACE_API_KEY environment variable is not set. Please set it in your .env file.")
+        return {
+            "timeout": EMBEDDING_HTTP_TIMEOUT,
+            "http2": _http2_available(),
+            "limits": httpx.Limits(
+                max_connections=EMBEDDING_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=EMBEDDING_HTTP_KEEPALIVE
+            ),
+            "headers": {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+        }
+
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = httpx.Client(**self._client_options())
+        return self._client
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            with self._lock:
+                if self._async_client is None:
+                    self._async_client = httpx.AsyncClient(**self._client_options())
+        return self._async_client
+
+    def start(self) -> None:
+        if self.api_key:
+            # Touch both clients so their pools exist before the first request
+            _ = self.client, self.async_client
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        # Always send a JSON dict payload as {"inputs": [..]} to the HF Inference endpoint
+        try:
+            response = self.client.post(self.api_url, json={"inputs": texts})
+            return _parse_embeddings(response)
+        except httpx.HTTPError as e:
+            logger.error(f"HF API request failed: {e}")
+            raise RuntimeError(f"Error calling Hugging Face API: {e}")
+
+    async def aembed(self, texts: List[str]) -> np.ndarray:
+        try:
+            response = await self.async_client.post(self.api_url, json={"inputs": texts})
+            return _parse_embeddings(response)
+        except httpx.HTTPError as e:
+            logger.error(f"HF API request failed: {e}")
+            raise RuntimeError(f"Error calling Hugging Face API: {e}")
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    async def aclose(self) -> None:
+        self.close()
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+class LocalEmbeddingBackend:
+    """
+    In-process CPU embedding backend running an ONNX export of the model.
+
+    Produces the same vectors as the HF router for `HF_MODEL` (CLS pooling plus
+    L2 normalization for bge models) without any network round trip or rate limit.
+    Texts are tokenized and run through ONNX Runtime in batches of `batch_size`.
+
+    Requires the optional `onnxruntime` and `tokenizers` packages (and
+    `huggingface_hub` when the model is not already on disk).
+    """
+
+    def __init__(self, model_dir: Optional[str] = LOCAL_EMBEDDING_MODEL_DIR, repo: str = LOCAL_EMBEDDING_REPO,
+                 onnx_file: str = LOCAL_EMBEDDING_ONNX_FILE, threads: int = LOCAL_EMBEDDING_THREADS,
+                 batch_size: int = LOCAL_EMBEDDING_BATCH_SIZE, max_length: int = LOCAL_EMBEDDING_MAX_LENGTH,
+                 pooling: str = LOCAL_EMBEDDING_POOLING):
+        self.model_dir = model_dir
+        self.repo = repo
+        self.onnx_file = onnx_file
+        self.threads = threads
+        self.batch_size = max(1, batch_size)
+        self.max_length = max_length
+        self.pooling = pooling
+        self.model_name = f"local:{repo}:{onnx_file}"
+        self._session = None
+        self._tokenizer = None
+        self._lock = threading.Lock()
+
+    def _resolve_file(self, filename: str) -> str:
+        if self.model_dir:
+            return os.path.join(self.model_dir, filename)
+        try:
+            from huggingface_hub import hf_hub_download
+        except ImportError as e:
+            raise RuntimeError("huggingface_hub is not installed. Install it with: pip install huggingface_hub, or set LOCAL_EMBEDDING_MODEL_DIR.") from e
+        return hf_hub_download(self.repo, filename)
+
+    def _load(self) -> None:
+        if self._session is not None:
+            return
+        with self._lock:
+            if self._session is not None:
+                return
+            try:
+                import onnxruntime as ort
+                from tokenizers import Tokenizer
+            except ImportError as e:
+                raise RuntimeError("EMBEDDING_BACKEND=local requires onnxruntime and tokenizers. Install with: pip install \".[local]\"") from e
+
+            tokenizer = Tokenizer.from_file(self._resolve_file("tokenizer.json"))
+            tokenizer.enable_truncation(max_length=self.max_length)
+            tokenizer.enable_padding()
+
+            options = ort.SessionOptions()
+            if self.threads:
+                options.intra_op_num_threads = self.threads
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            self._tokenizer = tokenizer
+            self._session = ort.InferenceSession(self._resolve_file(self.onnx_file), options, providers=["CPUExecutionProvider"])
+            logger.info(f"Loaded local embedding model {self.repo} ({self.onnx_file})")
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self._tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        input_names = {i.name for i in self._session.get_inputs()}
+        if "token_type_ids" in input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        hidden = self._session.run(None, {k: v for k, v in feeds.items() if k in input_names})[0]
+        if self.pooling == "mean":
+            mask = attention_mask[..., None].astype(hidden.dtype)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        else:
+            pooled = hidden[:, 0]
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return pooled / np.clip(norms, 1e-12, None)
+
+    def start(self) -> None:
+        """Load the model and run one warm-up inference so the first request is not slow."""
+        self._load()
+        self.embed(["warm up"])
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        self._load()
+        batches = [self._embed_batch(texts[i:i + self.batch_size]) for i in range(0, len(texts), self.batch_size)]
+        return np.vstack(batches)
+
+    async def aembed(self, texts: List[str]) -> np.ndarray:
+        # Inference is CPU bound; keep it off the event loop
+        return await asyncio.to_thread(self.embed, texts)
+
+    def close(self) -> None:
+        pass
+
+    async def aclose(self) -> None:
+        pass
+
+EmbeddingBackend = Union[HFEmbeddingClient, LocalEmbeddingBackend]
+
+embedding_client: Optional[EmbeddingBackend] = None
+_client_lock = threading.Lock()
+
+def get_embedding_client() -> EmbeddingBackend:
+    """Return the shared embedding backend selected by EMBEDDING_BACKEND."""
+    global embedding_client
+    if embedding_client is not None:
+        return embedding_client
+
+    with _client_lock:
+        if embedding_client is None:
+            if EMBEDDING_BACKEND == "local":
+                embedding_client = LocalEmbeddingBackend()
+            elif EMBEDDING_BACKEND == "hf":
+                embedding_client = HFEmbeddingClient()
+            else:
+                raise ValueError(f"Unknown EMBEDDING_BACKEND '{EMBEDDING_BACKEND}'. Use 'hf' or 'local'.")
+    return embedding_client
+
+def startup() -> None:
+    """Create the shared embedding backend and warm it up (FastAPI startup)."""
+    get_embedding_client().start()
+
+async def shutdown() -> None:
+    """Close the shared embedding backend (FastAPI shutdown)."""
+    global embedding_client
+    with _client_lock:
+        client, embedding_client = embedding_client, None
+    if client is not None:
+        await client.aclose()
@@ -0,0 +1,223 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+import sqlite3
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Local SQLite file backing the job queue; jobs and their per-item progress survive restarts
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", ".cache/jobs.db")
+# Number of jobs executed concurrently by the in-process workers
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+# Seconds an idle worker waits before checking the queue again
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 2.0))
+
+class JobStore:
+    """
+    SQLite-backed job queue.
+
+    A job is a batch of items (one CV to score or one resume file to extract)
+    plus a JSON payload shared by all of them. Each item's result is written as
+    soon as it is processed, so a job interrupted by a restart is picked up
+    again and only its pending items are processed.
+
+    Job status moves queued -> running -> completed | failed; item status moves
+    pending -> done | failed.
+    """
+
+    def __init__(self, path: str = JOBS_DB_PATH):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, user_id TEXT, payload TEXT NOT NULL, "
+            "total INTEGER NOT NULL, output TEXT, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS jobs_status_idx ON jobs (status, created_at);"
+            "CREATE TABLE IF NOT EXISTS job_items ("
+            "job_id TEXT NOT NULL, position INTEGER NOT NULL, status TEXT NOT NULL, input BLOB NOT NULL, "
+            "result TEXT, error TEXT, PRIMARY KEY (job_id, position));"
+        )
+        self._conn.commit()
+
+    def create(self, kind: str, user_id: Optional[str], payload: Dict[str, Any], inputs: List[bytes]) -> str:
+        """Queue a job with one item per entry of `inputs` and return its id."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, status, user_id, payload, total, created_at, updated_at) VALUES (?, ?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, kind, user_id, json.dumps(payload), len(inputs), now, now)
+            )
+            self._conn.executemany(
+                "INSERT INTO job_items (job_id, position, status, input) VALUES (?, ?, 'pending', ?)",
+                [(job_id, position, sqlite3.Binary(data)) for position, data in enumerate(inputs)]
+            )
+            self._conn.commit()
+        return job_id
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """Mark the oldest queued job as running and return it, or None if the queue is empty."""
+        with self._lock:
+            row = self._conn.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1").fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ?", (time.time(), row["id"]))
+            self._conn.commit()
+        return self.get(row["id"])
+
+    def requeue_running(self) -> int:
+        """Put jobs left running by a stopped worker back in the queue; returns how many were requeued."""
+        with self._lock:
+            cursor = self._conn.execute("UPDATE jobs SET status = 'queued', updated_at = ? WHERE status = 'running'", (time.time(),))
+            self._conn.commit()
+        return cursor.rowcount
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            counts = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM job_items WHERE job_id = ? GROUP BY status", (job_id,)
+            ).fetchall())
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["output"] = json.loads(job["output"]) if job["output"] is not None else None
+        job["completed"] = counts.get("done", 0)
+        job["failed"] = counts.get("failed", 0)
+        return job
+
+    def pending_items(self, job_id: str) -> List[Tuple[int, bytes]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT position, input FROM job_items WHERE job_id = ? AND status = 'pending' ORDER BY position", (job_id,)
+            ).fetchall()
+        return [(row["position"], bytes(row["input"])) for row in rows]
+
+    def complete_item(self, job_id: str, position: int, result: Any = None, error: Optional[str] = None) -> None:
+        """Record the outcome of one item; an item with an `error` is marked failed."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE job_items SET status = ?, result = ?, error = ? WHERE job_id = ? AND position = ?",
+                ("failed" if error else "done", json.dumps(result) if result is not None else None, error, job_id, position)
+            )
+            self._conn.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (time.time(), job_id))
+            self._conn.commit()
+
+    def item_results(self, job_id: str) -> List[Dict[str, Any]]:
+        """Outcome of every processed item so far, in submission order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT position, status, result, error FROM job_items WHERE job_id = ? AND status != 'pending' ORDER BY position", (job_id,)
+            ).fetchall()
+        return [
+            {"position": row["position"], "status": row["status"],
+             "result": json.loads(row["result"]) if row["result"] is not None else None, "error": row["error"]}
+            for row in rows
+        ]
+
+    def finish(self, job_id: str, status: str, output: Any = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, output = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, json.dumps(output) if output is not None else None, error, time.time(), job_id)
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+_job_store: Optional[JobStore] = None
+_store_lock = threading.Lock()
+
+def get_job_store() -> JobStore:
+    global _job_store
+    if _job_store is not None:
+        return _job_store
+
+    with _store_lock:
+        if _job_store is None:
+            _job_store = JobStore()
+    return _job_store
+
+JobHandler = Callable[[Dict[str, Any], JobStore], Awaitable[Any]]
+
+class JobRunner:
+    """
+    In-process asyncio workers executing queued jobs.
+
+    Handlers are registered per job kind. A handler receives the claimed job and
+    the store, processes the job's pending items (recording each with
+    `JobStore.complete_item`) and returns the job's final output.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, poll_interval: float = JOB_POLL_INTERVAL):
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.handlers: Dict[str, JobHandler] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        self.handlers[kind] = handler
+
+    async def start(self, store: Optional[JobStore] = None) -> None:
+        store = store or get_job_store()
+        requeued = await asyncio.to_thread(store.requeue_running)
+        if requeued:
+            logger.info(f"Resuming {requeued} interrupted job(s)")
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._work(store)) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        """Wake idle workers after a job has been submitted."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _work(self, store: JobStore) -> None:
+        while True:
+            job = await asyncio.to_thread(store.claim_next)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.run_job(job, store)
+
+    async def run_job(self, job: Dict[str, Any], store: Optional[JobStore] = None) -> None:
+        store = store or get_job_store()
+        handler = self.handlers.get(job["kind"])
+        if handler is None:
+            await asyncio.to_thread(store.finish, job["id"], "failed", error=f"No handler for job kind '{job['kind']}'")
+            return
+        try:
+            output = await handler(job, store)
+        except asyncio.CancelledError:
+            # Shutting down: the job stays running and is requeued on the next start
+            raise
+        except Exception as e:
+            logger.exception(f"Job {job['id']} failed")
+            await asyncio.to_thread(store.finish, job["id"], "failed", error=str(e))
+            return
+        await asyncio.to_thread(store.finish, job["id"], "completed", output=output)
+
+job_runner = JobRunner()
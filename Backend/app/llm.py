@@ -1,22 +1,45 @@
 import os
 import json
+import asyncio
 import re
 import groq
+import logging
+import functools
 import threading
-from typing import Optional, Dict, List
+from typing import Any, Callable, Optional, Dict, List
 from dotenv import load_dotenv
 from groq import APIError
 
-from .parsing import preprocess_resume_text, clean_json_response
+from .parsing import preprocess_resume_text, clean_json_response, to_bool
 from .schemas import JDModel, CVModel
+from .llm_cache import LLMResultCache, extraction_key
+from .llm_gateway import LLMGateway
 
 load_dotenv()
 
 LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME", "gemma2-9b-it")
 
+# Bump when an extraction prompt or schema changes so cached results from the old prompt are not reused
+RESUME_PROMPT_VERSION = 1
+JD_PROMPT_VERSION = 1
+SKILL_PRESENCE_PROMPT_VERSION = 1
+INTERVIEW_QUESTIONS_PROMPT_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+# Parsed resume/JD extraction results (keyed by document content hash) and interview questions
+llm_cache = LLMResultCache.from_env()
+
 client = None
+async_client = None
 _client_lock = threading.Lock()
 
+def _groq_api_key() -> str:
+    GROK_API_KEY = os.getenv('GROK_API_KEY')
+    if not GROK_API_KEY:
+        raise ValueError("GROK_API_KEY environment variable is not set. Please set it in your .env file or environment.")
+    return GROK_API_KEY
+
 def get_groq_client():
     global client
     if client is not None:
@@ -24,16 +47,61 @@ def get_groq_client():
     
     with _client_lock:
         if client is None:
-            GROK_API_KEY = os.getenv('GROK_API_KEY')
-            if not GROK_API_KEY:
-                raise ValueError("GROK_API_KEY environment variable is not set. Please set it in your .env file or environment.")
-            client = groq.Groq(api_key=GROK_API_KEY)
+            # Retries are handled by the gateway, which shares backoff across all callers
+            client = groq.Groq(api_key=_groq_api_key(), max_retries=0)
     return client
 
+def get_async_groq_client():
+    global async_client
+    if async_client is not None:
+        return async_client
+
+    with _client_lock:
+        if async_client is None:
+            async_client = groq.AsyncGroq(api_key=_groq_api_key(), max_retries=0)
+    return async_client
+
+# Every Groq call goes through the gateway: shared quotas, concurrency cap and retries
+gateway = LLMGateway(lambda: get_groq_client(), lambda: get_async_groq_client())
+
 class LLMJsonError(Exception):
     """Custom exception for errors related to LLM JSON processing."""
     pass
 
+def _usage_tokens(response) -> int:
+    tokens = getattr(getattr(response, "usage", None), "total_tokens", 0)
+    return tokens if isinstance(tokens, int) else 0
+
+def _as_llm_error(error: Exception, action: str) -> LLMJsonError:
+    if isinstance(error, APIError):
+        return LLMJsonError(f"The AI service returned an error: {error.message}")
+    # Any other unexpected error (e.g. network issues, Groq library errors)
+    return LLMJsonError(f"An unexpected error occurred while {action}: {error}")
+
+def _complete(request: dict, parse: Callable[[str], Any], cache_key: str, action: str) -> Any:
+    """Send a chat completion through the gateway, parse its reply and cache the result."""
+    try:
+        response = gateway.complete_sync(**request)
+        result = parse(response.choices[0].message.content.strip())
+    except LLMJsonError:
+        raise
+    except Exception as e:
+        raise _as_llm_error(e, action) from e
+    llm_cache.set(cache_key, result, _usage_tokens(response))
+    return result
+
+async def _acomplete(request: dict, parse: Callable[[str], Any], cache_key: str, action: str) -> Any:
+    """Async counterpart of `_complete` using the async Groq client."""
+    try:
+        response = await gateway.complete(**request)
+        result = parse(response.choices[0].message.content.strip())
+    except LLMJsonError:
+        raise
+    except Exception as e:
+        raise _as_llm_error(e, action) from e
+    llm_cache.set(cache_key, result, _usage_tokens(response))
+    return result
+
 JD_SCHEMA_JSON = '''{
   "jobId": "string",
   "jobTitle": "string",
@@ -200,14 +268,11 @@ RESUME_SCHEMA_JSON = '''{
     }
 }'''
 
-def convert_resume_to_json(resume_text: str, jd_skill_categories: Optional[Dict[str, List[str]]] = None) -> dict:
-    local_client = get_groq_client()
-    try:
-        schema = RESUME_SCHEMA_JSON
-        cleaned_text = preprocess_resume_text(resume_text)
-        skill_presence_instruction = ""
-        if jd_skill_categories:
-            skill_presence_instruction = f"""
+def _resume_request(cleaned_text: str, jd_skill_categories: Optional[Dict[str, List[str]]] = None) -> dict:
+    schema = RESUME_SCHEMA_JSON
+    skill_presence_instruction = ""
+    if jd_skill_categories:
+        skill_presence_instruction = f"""
 - For the 'skill_presence' field, create a dictionary where each skill from the provided categories (critical, important, extra) is a key with a boolean value.
 - Set the value to 'true' if the skill is present in the resume, 'false' if it is not found.
 - Check all skills in the provided categories and assign boolean values accordingly.
@@ -215,7 +280,7 @@ def convert_resume_to_json(resume_text: str, jd_skill_categories: Optional[Dict[
 - Use the provided skill categories for this check:
 {json.dumps(jd_skill_categories, indent=2)}
 """
-        prompt = f"""
+    prompt = f"""
 You are a JSON extraction engine. Convert the following resume text into precisely the JSON schema specified below.
 IMPORTANT INSTRUCTIONS:
 - Extract only information that is clearly present in the text
@@ -243,45 +308,107 @@ Resume Text:
 {cleaned_text}
 NOTE: Output only valid JSON matching the exact schema structure.
 """
-        response = local_client.chat.completions.create(
-            model=LLM_MODEL_NAME,
-            messages=[
-                {"role": "system", "content": "You are a precise JSON extraction expert. Only extract information that is explicitly stated in the text. Return valid JSON only."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.05,
-            max_tokens=6000
-        )
-        content = response.choices[0].message.content.strip()
-        cleaned_content = clean_json_response(content)
-        try:
-            result = json.loads(cleaned_content)
-            if "Analytics" not in result:
-                result["Analytics"] = {}
-            if "keyword_analysis" not in result["Analytics"]:
-                result["Analytics"]["keyword_analysis"] = {}
-            
-            # Ensure skill_presence is properly initialized
-            if "skill_presence" not in result:
-                result["skill_presence"] = {}
-            elif not isinstance(result["skill_presence"], dict):
-                result["skill_presence"] = {}
-            
-            return result
-        except json.JSONDecodeError:
-            raise LLMJsonError("Could not parse the response from the AI service as JSON.")
-    except APIError as e:
-        # Explicitly catch and re-raise APIError as LLMJsonError for consistent error handling by the caller
-        raise LLMJsonError(f"The AI service returned an error: {e.message}") from e
-    except Exception as e:
-        # Catch any other unexpected errors (e.g., network issues, Groq library errors) and wrap them
-        raise LLMJsonError(f"An unexpected error occurred while processing the resume: {e}") from e
+    return dict(
+        model=LLM_MODEL_NAME,
+        messages=[
+            {"role": "system", "content": "You are a precise JSON extraction expert. Only extract information that is explicitly stated in the text. Return valid JSON only."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.05,
+        max_tokens=6000
+    )
 
-def convert_jd_to_json(jd_text: str) -> dict:
-    local_client = get_groq_client()
+def _parse_resume(content: str) -> dict:
     try:
-        schema = JD_SCHEMA_JSON
-        prompt = f"""
+        result = json.loads(clean_json_response(content))
+    except json.JSONDecodeError:
+        raise LLMJsonError("Could not parse the response from the AI service as JSON.")
+    if "Analytics" not in result:
+        result["Analytics"] = {}
+    if "keyword_analysis" not in result["Analytics"]:
+        result["Analytics"]["keyword_analysis"] = {}
+    
+    # Ensure skill_presence is properly initialized
+    if "skill_presence" not in result:
+        result["skill_presence"] = {}
+    elif not isinstance(result["skill_presence"], dict):
+        result["skill_presence"] = {}
+    return result
+
+def convert_resume_to_json(resume_text: str, jd_skill_categories: Optional[Dict[str, List[str]]] = None) -> dict:
+    cleaned_text = preprocess_resume_text(resume_text)
+    cache_key = extraction_key("resume", LLM_MODEL_NAME, RESUME_PROMPT_VERSION, cleaned_text, jd_skill_categories)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    return _complete(_resume_request(cleaned_text, jd_skill_categories), _parse_resume, cache_key, "processing the resume")
+
+async def aconvert_resume_to_json(resume_text: str, jd_skill_categories: Optional[Dict[str, List[str]]] = None) -> dict:
+    """Async variant of convert_resume_to_json that never blocks the event loop."""
+    cleaned_text = preprocess_resume_text(resume_text)
+    cache_key = extraction_key("resume", LLM_MODEL_NAME, RESUME_PROMPT_VERSION, cleaned_text, jd_skill_categories)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    return await _acomplete(_resume_request(cleaned_text, jd_skill_categories), _parse_resume, cache_key, "processing the resume")
+
+def _skill_presence_request(skills: List[str], resume_text: str) -> dict:
+    prompt = f"""
+For each skill below, decide whether the resume shows that the candidate has it, directly or through an equivalent tool, technology or practice.
+Skills:
+{json.dumps(skills)}
+Resume:
+{resume_text}
+Output only a JSON object mapping every skill exactly as written above to true or false.
+"""
+    return dict(
+        model=LLM_MODEL_NAME,
+        messages=[
+            {"role": "system", "content": "You are a precise resume screener. Return valid JSON only."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.0,
+        max_tokens=32 + 16 * len(skills)
+    )
+
+def _parse_skill_presence(skills: List[str], content: str) -> Dict[str, bool]:
+    try:
+        answer = json.loads(clean_json_response(content))
+    except json.JSONDecodeError:
+        raise LLMJsonError("Could not parse the response from the AI service as JSON.")
+    if not isinstance(answer, dict):
+        raise LLMJsonError("The AI service did not return a JSON object for skill presence.")
+    return {skill: to_bool(answer.get(skill)) for skill in skills}
+
+def _skill_presence_key(skills: List[str], resume_text: str) -> str:
+    return extraction_key("skills", LLM_MODEL_NAME, SKILL_PRESENCE_PROMPT_VERSION, resume_text, {"skills": sorted(skills)})
+
+def check_skill_presence(skills: List[str], resume_text: str) -> Dict[str, bool]:
+    """
+    Ask the LLM whether each of `skills` is evidenced by `resume_text`.
+
+    A small targeted call used only for skills the lexical and embedding checks
+    could not decide; results are cached like the extraction calls.
+    """
+    cache_key = _skill_presence_key(skills, resume_text)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    return _complete(_skill_presence_request(skills, resume_text), functools.partial(_parse_skill_presence, skills),
+                     cache_key, "checking skill presence")
+
+async def acheck_skill_presence(skills: List[str], resume_text: str) -> Dict[str, bool]:
+    """Async variant of check_skill_presence."""
+    cache_key = _skill_presence_key(skills, resume_text)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    return await _acomplete(_skill_presence_request(skills, resume_text), functools.partial(_parse_skill_presence, skills),
+                            cache_key, "checking skill presence")
+
+def _jd_request(jd_text: str) -> dict:
+    schema = JD_SCHEMA_JSON
+    prompt = f"""
 You are a JSON-extraction engine. Convert the following raw job posting text into exactly the JSON schema below:
 — Do not add any extra fields or prose.
 - If the **state is not explicitly given**, but the **city is**, **infer the state** based on the city (e.g., if city is Varanasi, assign state as Uttar Pradesh).
@@ -313,35 +440,43 @@ Job Description Text:
 {jd_text}
 NOTE: Please output only a valid JSON matching the EXACT schema.
 """
-        response = local_client.chat.completions.create(
-            model=LLM_MODEL_NAME,
-            messages=[
-                {"role": "system", "content": "You are a JSON extraction expert. Always return valid JSON only."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.1,
-            max_tokens=4000 
-        )
-        content = response.choices[0].message.content.strip()
-        cleaned_content = clean_json_response(content)
-        try:
-            result = json.loads(cleaned_content)
-            if "requiredSkills" not in result:
-                result["requiredSkills"] = []
-            if "educationRequired" not in result:
-                result["educationRequired"] = []
-            return result
-        except json.JSONDecodeError:
-            raise LLMJsonError("Could not parse the response from the AI service as JSON.")
-    except APIError as e:
-        # Explicitly catch and re-raise APIError as LLMJsonError for consistent error handling by the caller
-        raise LLMJsonError(f"The AI service returned an error: {e.message}") from e
-    except Exception as e:
-        # Catch any other unexpected errors (e.g., network issues, Groq library errors) and wrap them
-        raise LLMJsonError(f"An unexpected error occurred while processing the job description: {e}") from e
+    return dict(
+        model=LLM_MODEL_NAME,
+        messages=[
+            {"role": "system", "content": "You are a JSON extraction expert. Always return valid JSON only."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.1,
+        max_tokens=4000
+    )
 
-def generate_interview_questions(jd: JDModel, cv: CVModel) -> list:
-    local_client = get_groq_client()
+def _parse_jd(content: str) -> dict:
+    try:
+        result = json.loads(clean_json_response(content))
+    except json.JSONDecodeError:
+        raise LLMJsonError("Could not parse the response from the AI service as JSON.")
+    if "requiredSkills" not in result:
+        result["requiredSkills"] = []
+    if "educationRequired" not in result:
+        result["educationRequired"] = []
+    return result
+
+def convert_jd_to_json(jd_text: str) -> dict:
+    cache_key = extraction_key("jd", LLM_MODEL_NAME, JD_PROMPT_VERSION, jd_text)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    return _complete(_jd_request(jd_text), _parse_jd, cache_key, "processing the job description")
+
+async def aconvert_jd_to_json(jd_text: str) -> dict:
+    """Async variant of convert_jd_to_json that never blocks the event loop."""
+    cache_key = extraction_key("jd", LLM_MODEL_NAME, JD_PROMPT_VERSION, jd_text)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    return await _acomplete(_jd_request(jd_text), _parse_jd, cache_key, "processing the job description")
+
+def _interview_questions_request(jd: JDModel, cv: CVModel) -> dict:
     prompt = f"""
 Given the following job description and candidate resume, generate 3-5 specific interview questions that would help assess the candidate's fit for this role. Focus on their experience, skills, and any gaps or strengths.
 
@@ -360,23 +495,61 @@ Suggested Role: {cv.Analytics.suggested_role}
 
 Output only a JSON array of questions.
 """
+    return dict(
+        model=LLM_MODEL_NAME,
+        messages=[
+            {"role": "system", "content": "You are an expert HR interviewer. Generate only interview questions as a JSON array."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.2,
+        max_tokens=512
+    )
+
+def _parse_interview_questions(content: str) -> list:
     try:
-        response = local_client.chat.completions.create(
-            model=LLM_MODEL_NAME,
-            messages=[
-                {"role": "system", "content": "You are an expert HR interviewer. Generate only interview questions as a JSON array."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.2,
-            max_tokens=512
-        )
-        content = response.choices[0].message.content.strip()
         questions = json.loads(clean_json_response(content))
-        if isinstance(questions, list):
-            return [str(q) for q in questions if isinstance(q, str)]
-    except (APIError, json.JSONDecodeError) as e:
-        # Catch API errors and JSON parsing errors, re-raise as LLMJsonError
+    except json.JSONDecodeError as e:
         raise LLMJsonError(f"Could not generate interview questions: {e}") from e
-    except Exception as e:
-        # Catch any other unexpected errors and wrap them in LLMJsonError
-        raise LLMJsonError(f"An unexpected error occurred while generating interview questions: {e}") from e
+    if not isinstance(questions, list):
+        raise LLMJsonError("Could not generate interview questions: the AI service did not return a JSON array.")
+    return [str(q) for q in questions if isinstance(q, str)]
+
+def interview_questions_key(jd: JDModel, cv: CVModel) -> str:
+    """Cache key of the questions for one (JD, candidate) pair."""
+    pair = json.dumps([jd.dict(), cv.dict(by_alias=True)], sort_keys=True, default=str)
+    return extraction_key("questions", LLM_MODEL_NAME, INTERVIEW_QUESTIONS_PROMPT_VERSION, pair)
+
+def cached_interview_questions(jd: JDModel, cv: CVModel) -> Optional[list]:
+    """Questions already generated for this pair, or None; never calls the LLM."""
+    return llm_cache.get(interview_questions_key(jd, cv))
+
+def generate_interview_questions(jd: JDModel, cv: CVModel) -> list:
+    cache_key = interview_questions_key(jd, cv)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    return _complete(_interview_questions_request(jd, cv), _parse_interview_questions, cache_key, "generating interview questions")
+
+# Question generations running right now, by interview_questions_key, so a candidate opened
+# while /match is still pre-generating its questions waits for that call instead of repeating it
+_questions_in_flight: Dict[str, asyncio.Task] = {}
+
+async def agenerate_interview_questions(jd: JDModel, cv: CVModel) -> list:
+    """
+    Async variant of generate_interview_questions; questions are cached per (JD, candidate) pair.
+
+    Concurrent calls for the same pair share one LLM call.
+    """
+    cache_key = interview_questions_key(jd, cv)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    task = _questions_in_flight.get(cache_key)
+    if task is None or task.get_loop() is not asyncio.get_running_loop():
+        task = asyncio.ensure_future(
+            _acomplete(_interview_questions_request(jd, cv), _parse_interview_questions, cache_key, "generating interview questions")
+        )
+        _questions_in_flight[cache_key] = task
+        task.add_done_callback(lambda done: _questions_in_flight.pop(cache_key, None) if _questions_in_flight.get(cache_key) is done else None)
+    # A caller that goes away (e.g. a closed request) does not cancel the call for the others
+    return await asyncio.shield(task)
@@ -0,0 +1,87 @@
+import os
+import json
+import hashlib
+import threading
+from typing import Any, Dict, Optional
+
+from .cache import TTLCache, SQLiteCache
+from .embedding_cache import normalize_text
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+def skill_categories_hash(skill_categories: Optional[Dict[str, Any]]) -> str:
+    """Order-independent digest of the skill categories sent with a prompt ("-" when there are none)."""
+    if not skill_categories:
+        return "-"
+    canonical = json.dumps(skill_categories, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+def extraction_key(kind: str, model: str, prompt_version: int, text: str, skill_categories: Optional[Dict[str, Any]] = None) -> str:
+    return f"{kind}:{model}:v{prompt_version}:{text_hash(text)}:{skill_categories_hash(skill_categories)}"
+
+class LLMResultCache:
+    """
+    Cache of parsed LLM extraction results keyed by (kind, model, prompt version,
+    document hash, skill categories hash).
+
+    Entries hold the parsed JSON plus the tokens the original call consumed, so
+    every hit can be reported as tokens saved. Like `EmbeddingCache`, lookups go
+    to the in-process LRU tier first and fall back to the optional SQLite tier;
+    disk hits are promoted into memory. Values are stored serialized and decoded
+    on every hit, so callers may mutate what they get back.
+    """
+
+    def __init__(self, memory: TTLCache, disk: Optional[SQLiteCache] = None):
+        self.memory = memory
+        self.disk = disk
+        self.saved_tokens = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "LLMResultCache":
+        ttl = float(os.getenv("LLM_CACHE_TTL", 0)) or None
+        memory = TTLCache(maxsize=int(os.getenv("LLM_CACHE_SIZE", 1000)), ttl=ttl)
+        disk = None
+        path = os.getenv("LLM_CACHE_PATH")
+        if path:
+            disk = SQLiteCache(
+                path,
+                ttl=ttl,
+                max_entries=int(os.getenv("LLM_CACHE_DISK_MAX_ENTRIES", 50000)),
+                table="llm_results"
+            )
+        return cls(memory, disk)
+
+    def get(self, key: str) -> Optional[dict]:
+        entry = self.memory.get(key)
+        if entry is None and self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is not None:
+                entry = entry.decode("utf-8")
+                self.memory.set(key, entry)
+        if entry is None:
+            return None
+        entry = json.loads(entry)
+        with self._lock:
+            self.saved_tokens += entry["tokens"]
+        return entry["result"]
+
+    def set(self, key: str, result: dict, tokens: int = 0) -> None:
+        entry = json.dumps({"result": result, "tokens": tokens})
+        self.memory.set(key, entry)
+        if self.disk is not None:
+            self.disk.set(key, entry.encode("utf-8"))
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+        with self._lock:
+            self.saved_tokens = 0
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"memory": {**self.memory.stats.as_dict(), "size": len(self.memory)}, "saved_tokens": self.saved_tokens}
+        if self.disk is not None:
+            stats["disk"] = {**self.disk.stats.as_dict(), "size": len(self.disk)}
+        return stats
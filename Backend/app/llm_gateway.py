@@ -0,0 +1,282 @@
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Optional
+
+import groq
+
+logger = logging.getLogger(__name__)
+
+# Quotas of the Groq plan; calls are paced so neither is exceeded
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", 30))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", 15000))
+# LLM calls in flight at once across all endpoints
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+# Retries for rate-limited (429), overloaded (5xx) and dropped calls
+LLM_RATE_LIMIT_RETRIES = int(os.getenv("LLM_RATE_LIMIT_RETRIES", 4))
+LLM_RATE_LIMIT_BACKOFF = float(os.getenv("LLM_RATE_LIMIT_BACKOFF", 2.0))  # seconds, doubled per retry
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at `rate_per_minute`.
+
+    `reserve(amount)` takes the tokens immediately, letting the balance go
+    negative, and returns how long the caller must wait before using them, so
+    reservations are served in order and callers never spin. A request larger
+    than the bucket is allowed once the bucket is full.
+
+    A rate of 0 disables the limit.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None, timer: Callable[[], float] = time.monotonic):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._timer = timer
+        self._tokens = self.capacity
+        self._updated = timer()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill(self._timer())
+            amount = min(amount, self.capacity)
+            self._tokens -= amount
+            return max(0.0, -self._tokens / self.rate)
+
+    def refund(self, amount: float) -> None:
+        """Return tokens that were reserved but not used (e.g. an overestimated completion)."""
+        with self._lock:
+            self._refill(self._timer())
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+class ConcurrencyLimit:
+    """
+    A counting semaphore usable from both worker threads and the event loop.
+
+    Waiters, threads and coroutines alike, queue in arrival order and a
+    released slot is handed straight to the first of them: a thread through
+    its own event, a coroutine through a future resolved on its loop. Nobody
+    polls, and nobody can overtake a caller that is already waiting.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        # threading.Event of a waiting thread, or (loop, future) of a waiting coroutine
+        self._waiters: deque = deque()
+
+    def _take(self) -> bool:
+        if self.in_flight >= self.limit or self._waiters:
+            return False
+        self.in_flight += 1
+        return True
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            return self._take()
+
+    def acquire(self) -> None:
+        with self._lock:
+            if self._take():
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        # Set by release() once the slot is ours
+        event.wait()
+
+    async def aacquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._take():
+                return
+            future = loop.create_future()
+            waiter = (loop, future)
+            self._waiters.append(waiter)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                queued = waiter in self._waiters
+                if queued:
+                    self._waiters.remove(waiter)
+            # A slot handed over just before the cancellation is passed on (a
+            # cancelled future gets it passed on by _hand_over instead)
+            if not queued and not future.cancelled():
+                self.release()
+            raise
+
+    def _hand_over(self, future: asyncio.Future) -> None:
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+    def release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if isinstance(waiter, threading.Event):
+                    waiter.set()
+                    return
+                loop, future = waiter
+                try:
+                    loop.call_soon_threadsafe(self._hand_over, future)
+                    return
+                except RuntimeError:
+                    # The waiter's event loop is closed; give the slot to the next one
+                    continue
+            self.in_flight -= 1
+
+def _retryable(error: Exception) -> bool:
+    if isinstance(error, (groq.RateLimitError, groq.InternalServerError, groq.APIConnectionError)):
+        return True
+    return isinstance(error, groq.APIStatusError) and error.status_code >= 500
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+def _estimate_tokens(request: dict) -> int:
+    # ~4 characters per token for the prompt, plus the completion budget
+    prompt_chars = sum(len(m.get("content") or "") for m in request.get("messages", []))
+    return prompt_chars // 4 + int(request.get("max_tokens") or 0)
+
+class LLMGateway:
+    """
+    Single entry point for Groq chat completions.
+
+    Every call, whether from the async client (`complete`) or the sync client
+    used by worker threads (`complete_sync`), shares:
+
+    - request and token buckets sized to the plan's per-minute quotas; a call
+      reserves its estimated tokens up front and is refunded the unused part
+      once the response reports its actual usage
+    - a global cap on calls in flight
+    - retries of 429/5xx/connection errors with jittered exponential backoff,
+      honoring `retry-after`; a 429 also pauses every other caller until then
+
+    Errors that are not retryable, or still failing after the last retry, are
+    raised unchanged.
+    """
+
+    def __init__(self, client_factory: Callable[[], Any], async_client_factory: Callable[[], Any],
+                 requests_per_minute: float = LLM_REQUESTS_PER_MINUTE, tokens_per_minute: float = LLM_TOKENS_PER_MINUTE,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY, max_retries: int = LLM_RATE_LIMIT_RETRIES,
+                 backoff: float = LLM_RATE_LIMIT_BACKOFF):
+        self.client_factory = client_factory
+        self.async_client_factory = async_client_factory
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.slots = ConcurrencyLimit(max_concurrency)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        # Monotonic time before which no call may start, set when Groq rate limits us
+        self.paused_until = 0.0
+        self.stats = {"calls": 0, "retries": 0, "rate_limited": 0, "failures": 0}
+        self._stats_lock = threading.Lock()
+
+    def metrics(self) -> dict:
+        with self._stats_lock:
+            return {**self.stats, "in_flight": self.slots.in_flight}
+
+    def _count(self, stat: str) -> None:
+        with self._stats_lock:
+            self.stats[stat] += 1
+
+    def _reserve(self, request: dict) -> tuple:
+        estimate = _estimate_tokens(request)
+        delay = max(self.requests.reserve(1), self.tokens.reserve(estimate), self._pause_remaining())
+        return estimate, delay
+
+    def _pause_remaining(self) -> float:
+        return self.paused_until - time.monotonic()
+
+    def _settle(self, estimate: int, response: Any) -> None:
+        used = getattr(getattr(response, "usage", None), "total_tokens", None)
+        if isinstance(used, int) and used < estimate:
+            self.tokens.refund(estimate - used)
+
+    def _backoff_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Delay before retrying `error`, or None when it should be raised."""
+        if not _retryable(error) or attempt >= self.max_retries:
+            self._count("failures")
+            return None
+        delay = _retry_after(error)
+        if delay is None:
+            delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+        if isinstance(error, groq.RateLimitError):
+            self._count("rate_limited")
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+        self._count("retries")
+        logger.warning(f"Groq call failed ({type(error).__name__}), retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries})")
+        return delay
+
+    async def complete(self, **request) -> Any:
+        """Run `chat.completions.create(**request)` on the async Groq client."""
+        client = self.async_client_factory()
+        attempt = 0
+        while True:
+            estimate, delay = self._reserve(request)
+            # A 429 seen by another caller while this one slept extends the pause
+            while delay > 0:
+                await asyncio.sleep(delay)
+                delay = self._pause_remaining()
+            await self.slots.aacquire()
+            try:
+                self._count("calls")
+                response = await client.chat.completions.create(**request)
+            except Exception as e:
+                # A rejected call does not count against the token quota
+                self.tokens.refund(estimate)
+                delay = self._backoff_delay(e, attempt)
+                if delay is None:
+                    raise
+            else:
+                self._settle(estimate, response)
+                return response
+            finally:
+                self.slots.release()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def complete_sync(self, **request) -> Any:
+        """Blocking counterpart of `complete` for code running in worker threads."""
+        client = self.client_factory()
+        attempt = 0
+        while True:
+            estimate, delay = self._reserve(request)
+            while delay > 0:
+                time.sleep(delay)
+                delay = self._pause_remaining()
+            self.slots.acquire()
+            try:
+                self._count("calls")
+                response = client.chat.completions.create(**request)
+            except Exception as e:
+                # A rejected call does not count against the token quota
+                self.tokens.refund(estimate)
+                delay = self._backoff_delay(e, attempt)
+                if delay is None:
+                    raise
+            else:
+                self._settle(estimate, response)
+                return response
+            finally:
+                self.slots.release()
+            time.sleep(delay)
+            attempt += 1
@@ -3,27 +3,35 @@ from dotenv import load_dotenv
 # Load environment variables FIRST before any other imports
 load_dotenv()
 
-from fastapi import FastAPI, UploadFile, File, Form, Body, Depends, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, Form, Body, Depends, HTTPException, Query, BackgroundTasks, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordRequestForm
+from starlette.background import BackgroundTask
 import tempfile
 import shutil
+import io
 import os
+import asyncio
+import functools
 import json
 import nltk
 import secrets
+import threading
 import logging
-from typing import List
-from datetime import timedelta
+import itertools
+from typing import Awaitable, Callable, List, Optional
+from datetime import datetime, timedelta, timezone
 import pydantic
+from dataclasses import dataclass
 
-from app import crud, schemas, auth, llm
+from app import crud, schemas, auth, llm, matching, embeddings, jobs, vector_index
 from app.database import get_supabase
 from app.schemas import JDModel, CVModel
-from app.parsing import extract_text_from_file, clean_resume_json, to_bool
-from app.llm import convert_jd_to_json, convert_resume_to_json, generate_interview_questions
-from app.matching import compute_similarity, get_match_level
+from app.parsing import extract_text_from_file, extract_texts_from_files, shutdown_extraction_pool, clean_resume_json, to_bool
+from app.matching import get_match_level, EmbeddingPlan, cv_profile_texts
+from app.skill_presence import adetect_skill_presence, skill_presence_stats
 
 logging.basicConfig(level=logging.INFO)
 
@@ -35,6 +43,23 @@ ALLOWED_CONTENT_TYPES = [
     "application/msword" # .doc
 ]
 
+# Number of CVs of one /match request scored and persisted in parallel
+MATCH_CONCURRENCY = max(1, int(os.getenv("MATCH_CONCURRENCY", 8)))
+# Number of resumes of one /extract_resumes request sent to the LLM in parallel
+EXTRACTION_LLM_CONCURRENCY = max(1, int(os.getenv("EXTRACTION_LLM_CONCURRENCY", 4)))
+# Interview questions are generated in the background after a match only for this many top candidates
+INTERVIEW_QUESTIONS_TOP_K = max(0, int(os.getenv("INTERVIEW_QUESTIONS_TOP_K", 3)))
+# Default number of candidates fully scored by /match?ranking=two_stage after the cheap prefilter
+PREFILTER_TOP_K = max(0, int(os.getenv("PREFILTER_TOP_K", 50)))
+# Candidates retrieved from the candidate index and fully scored by /jds/{jd_id}/candidates/search
+CANDIDATE_SEARCH_SHORTLIST = max(1, int(os.getenv("CANDIDATE_SEARCH_SHORTLIST", 200)))
+# JDs retrieved from the JD index and fully scored by /candidates/{candidate_id}/jds
+JD_SEARCH_SHORTLIST = max(1, int(os.getenv("JD_SEARCH_SHORTLIST", 50)))
+# Largest page of results /jds/{jd_id}/results and /analyses return per request
+RESULTS_PAGE_MAX = max(1, int(os.getenv("RESULTS_PAGE_MAX", 500)))
+# Stored results of a JD read, rescored and written back per request by /jds/{jd_id}/rescore
+RESCORE_BATCH_SIZE = max(1, int(os.getenv("RESCORE_BATCH_SIZE", 1000)))
+
 app = FastAPI()
 
 def download_nltk_data():
@@ -64,14 +89,39 @@ def startup_event():
     
     logging.info("Running startup tasks...")
     # download_nltk_data()
+    embeddings.startup()
     logging.info("Startup tasks completed.")
 
+@app.on_event("startup")
+async def start_job_workers():
+    if os.getenv("TESTING") == "1":
+        return
+    # Also requeues jobs interrupted by the previous shutdown
+    await jobs.job_runner.start()
+
+@app.on_event("startup")
+async def start_index_build():
+    if os.getenv("TESTING") == "1":
+        return
+    # Searches on an empty index answer 503 until the sync is done; on a large pool it can take minutes
+    _index_build.set()
+    app.state.index_build = asyncio.create_task(asyncio.to_thread(_sync_indexes, get_supabase()))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await jobs.job_runner.stop()
+    await asyncio.to_thread(vector_index.save_indexes)
+    await embeddings.shutdown()
+    shutdown_extraction_pool()
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Pagination cursor of /jds/{jd_id}/results and /analyses
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Root endpoint
@@ -94,6 +144,19 @@ async def health_check():
         "service": "cv-automation-api"
     }
 
+# Cache metrics endpoint
+@app.get("/metrics")
+async def metrics():
+    """Hit/miss counters for the in-process caches"""
+    return {
+        "embedding_cache": matching.embedding_cache.stats(),
+        "llm_cache": llm.llm_cache.stats(),
+        "llm_gateway": llm.gateway.metrics(),
+        "jd_row_cache": crud.jd_row_cache.stats.as_dict(),
+        "auth_token_cache": auth.token_cache.stats.as_dict(),
+        "skill_presence": skill_presence_stats()
+    }
+
 # Token endpoint for Supabase authentication
 @app.post("/token", response_model=schemas.Token)
 async def login_for_access_token(
@@ -176,7 +239,7 @@ def create_user(user: schemas.UserCreate, supabase = Depends(get_supabase), curr
             new_user_data = response_data if isinstance(response_data, dict) else response_data.get('user', {})
             
             logging.info(f"Successfully created user: {user.email}")
-            return schemas.User(
+            created = schemas.User(
                 id=new_user_data.get('id'),
                 username=new_user_data.get('user_metadata', {}).get('username', user.email.split('@')[0]),
                 email=new_user_data.get('email', user.email),
@@ -184,6 +247,8 @@ def create_user(user: schemas.UserCreate, supabase = Depends(get_supabase), curr
                 is_active=True,
                 created_at=new_user_data.get('created_at')
             )
+            crud.user_directory.add(created)
+            return created
         else:
             error_detail = response.json() if response.text else {}
             logging.error(f"Failed to create user. Status: {response.status_code}, Response: {error_detail}")
@@ -266,7 +331,7 @@ async def extract_jd(
             raise HTTPException(status_code=400, detail=f"Failed to extract text from {jd_file.filename}")
         
         try:
-            jd_json = convert_jd_to_json(jd_text)
+            jd_json = await llm.aconvert_jd_to_json(jd_text)
         except llm.LLMJsonError as e:
             logging.error(f"Failed to process JD from file {jd_file.filename}: {e}", exc_info=True)
             raise HTTPException(status_code=502, detail=f"Failed to process job description: The AI service encountered an error.")
@@ -275,6 +340,7 @@ async def extract_jd(
 
 @app.post("/save_jd", response_model=schemas.JobDescription)
 async def save_jd(
+    background_tasks: BackgroundTasks,
     jd_json: dict = Body(...),
     supabase = Depends(get_supabase),
     current_user: schemas.User = Depends(auth.get_current_user)
@@ -309,6 +375,7 @@ async def save_jd(
             detail="Failed to save job description. This may be due to database permissions (RLS policy). Check server logs for details."
         )
     
+    background_tasks.add_task(_index_jd, db_jd)
     return db_jd
 
 def ensure_complete_skill_presence(skill_presence: dict, skill_categories: dict) -> dict:
@@ -326,12 +393,15 @@ def ensure_complete_skill_presence(skill_presence: dict, skill_categories: dict)
     
     return skill_presence
 
-@app.post("/extract_resumes", response_model=List[schemas.ExtractedCVResponse])
-async def extract_resumes(
-    resume_files: list[UploadFile] = File(...),
-    jd_json: str = Form(...),
-    current_user: schemas.User = Depends(auth.get_current_user)
-):
+async def _detect_skill_presence(cv_json: dict, skill_categories: dict, known: dict = None) -> dict:
+    """Run the skill presence engine on an extracted resume; unparseable resumes keep only the known verdicts."""
+    try:
+        cv_obj = CVModel.parse_obj(cv_json)
+    except pydantic.ValidationError:
+        return ensure_complete_skill_presence(known or {}, skill_categories)
+    return await adetect_skill_presence(cv_obj, skill_categories, known)
+
+def _validate_resume_uploads(resume_files: List[UploadFile]) -> None:
     for resume_file in resume_files:
         if resume_file.content_type not in ALLOWED_CONTENT_TYPES:
             raise HTTPException(status_code=400, detail=f"Unsupported file type for {resume_file.filename}: {resume_file.content_type}.")
@@ -342,57 +412,82 @@ async def extract_resumes(
         if file_size > MAX_FILE_SIZE:
             raise HTTPException(status_code=413, detail=f"File {resume_file.filename} exceeds size limit of 10MB")
 
-    jd_json = json.loads(jd_json)
+def _skill_categories(jd_json: dict):
     required_skills = jd_json.get("requiredSkills", [])
-    skill_categories = None
-    if isinstance(required_skills, dict):
-        skill_categories = required_skills
-    
-    results = []
+    return required_skills if isinstance(required_skills, dict) else None
+
+async def _extract_as_completed(named_files: list, skill_categories):
+    """
+    Extract resumes given as (filename, file object) pairs, yielding (position, result) as each finishes.
+
+    `result` is the ExtractedCVResponse payload, or None when the file could not
+    be read or the LLM extraction failed (logged and skipped, like before).
+    """
     with tempfile.TemporaryDirectory() as tmpdir:
-        for resume_file in resume_files:
-            sanitized_filename = os.path.basename(resume_file.filename)
+        resume_paths = []
+        for index, (filename, fileobj) in enumerate(named_files):
+            # Prefix with the upload index so files sharing a name do not overwrite each other
+            sanitized_filename = f"{index}_{os.path.basename(filename)}"
             resume_path = os.path.join(tmpdir, sanitized_filename)
             with open(resume_path, "wb") as f:
-                shutil.copyfileobj(resume_file.file, f)
-                resume_file.file.seek(0) # Reset file pointer after reading
+                shutil.copyfileobj(fileobj, f)
+                fileobj.seek(0) # Reset file pointer after reading
+            resume_paths.append(resume_path)
 
-            resume_text = extract_text_from_file(resume_path)
-            if not resume_text:
-                logging.warning(f"Could not extract text from {resume_file.filename}, skipping.")
-                continue
-            try:
-                resume_json = convert_resume_to_json(resume_text, skill_categories)
-            except llm.LLMJsonError as e:
-                logging.error(f"Could not process resume {resume_file.filename}: {e}")
-                # Continue processing other resumes, but the result will be missing for this one
-                continue
-            resume_json = clean_resume_json(resume_json)
-            # Ensure skill_presence is complete if JD skill categories were provided
-            # This guarantees a consistent structure for downstream processing.
-            if skill_categories:
-                resume_json["skill_presence"] = ensure_complete_skill_presence(
-                    resume_json.get("skill_presence", {}), 
-                    skill_categories
-                )
-            else:
-                # If no categories were provided, ensure skill_presence is at least a dict
-                resume_json["skill_presence"] = resume_json.get("skill_presence", {})
-            results.append({
-                "cv_json": resume_json,
-                "skill_presence": resume_json["skill_presence"] # Use the (now complete) skill_presence from resume_json
-            })
-    return results
+        # PDF/DOCX parsing is CPU bound, so every file is parsed in the extraction process pool
+        resume_texts = await extract_texts_from_files(resume_paths)
 
-@app.post("/match", response_model=schemas.MatchResponse)
-async def match(
-    jd_json: dict = Body(...),
-    cvs: list = Body(...),
-    supabase = Depends(get_supabase),
-    current_user: schemas.User = Depends(auth.get_current_user) 
+    semaphore = asyncio.Semaphore(EXTRACTION_LLM_CONCURRENCY)
+
+    async def extract(position, filename, resume_text):
+        if not resume_text:
+            logging.warning(f"Could not extract text from {filename}, skipping.")
+            return position, None
+        try:
+            async with semaphore:
+                # The extraction itself does not depend on the JD, so it is cached once per
+                # resume; the JD's skills are then checked by the skill presence engine
+                resume_json = await llm.aconvert_resume_to_json(resume_text)
+                resume_json = clean_resume_json(resume_json)
+                if skill_categories:
+                    resume_json["skill_presence"] = await _detect_skill_presence(
+                        resume_json, skill_categories, resume_json.get("skill_presence")
+                    )
+        except llm.LLMJsonError as e:
+            logging.error(f"Could not process resume {filename}: {e}")
+            # Continue processing other resumes, but the result will be missing for this one
+            return position, None
+        # If no categories were provided, ensure skill_presence is at least a dict
+        resume_json["skill_presence"] = resume_json.get("skill_presence") or {}
+        return position, {
+            "cv_json": resume_json,
+            "skill_presence": resume_json["skill_presence"] # Use the (now complete) skill_presence from resume_json
+        }
+
+    tasks = [asyncio.create_task(extract(i, name, text)) for i, ((name, _), text) in enumerate(zip(named_files, resume_texts))]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+@app.post("/extract_resumes", response_model=List[schemas.ExtractedCVResponse])
+async def extract_resumes(
+    resume_files: list[UploadFile] = File(...),
+    jd_json: str = Form(...),
+    current_user: schemas.User = Depends(auth.get_current_user)
 ):
-    recruiter_id = current_user.id
-    
+    _validate_resume_uploads(resume_files)
+    skill_categories = _skill_categories(json.loads(jd_json))
+
+    results = [None] * len(resume_files)
+    async for position, result in _extract_as_completed([(f.filename, f.file) for f in resume_files], skill_categories):
+        results[position] = result
+    return [result for result in results if result is not None]
+
+def _parse_match_jd(jd_json: dict):
+    """Parse a /match JD whose requiredSkills may be categorized; returns (jd_obj, flat_skills, skill_categories)."""
     required_skills = jd_json.get("requiredSkills", [])
     skill_categories = None
     if isinstance(required_skills, dict):
@@ -403,123 +498,501 @@ async def match(
         flat_skills = required_skills
         jd_json_flat = jd_json
 
-    jd_obj = JDModel.parse_obj(jd_json_flat)
+    return JDModel.parse_obj(jd_json_flat), flat_skills, skill_categories
+
+@dataclass
+class PreparedMatch:
+    """
+    A parsed /match payload with its JD saved and profiled.
+
+    - `parsed_cvs`: (CVModel, skill_presence) pairs
+    - `evaluate_cv(cv_obj, skill_presence)`: the MatchResult payload and CV
+      profile of one CV, without touching the database (blocking; run it in
+      a worker thread)
+    - `save_results(evaluated)`: persist a list of (cv_obj, cv_profile, result)
+      triples with one candidate upsert and one analysis_results insert;
+      returns how many results could not be saved
+    - `await prefilter(pairs)`: the cheap first-stage MatchResult payloads of
+      (CVModel, skill_presence) pairs, without persisting anything
+    """
+    jd_obj: JDModel
+    parsed_cvs: list
+    evaluate_cv: Callable[..., tuple]
+    save_results: Callable[[list], int]
+    prefilter: Callable[[list], Awaitable[List[dict]]]
+
+    def score_cv(self, cv_obj, skill_presence) -> dict:
+        """Evaluate and persist one CV (blocking)."""
+        result, cv_profile = self.evaluate_cv(cv_obj, skill_presence)
+        self.save_results([(cv_obj, cv_profile, result)])
+        return result
+
+async def _prepare_match(jd_json: dict, cvs: list, supabase, current_user) -> PreparedMatch:
+    """Parse a /match payload, save the JD and prepare its profile."""
+    jd_obj, flat_skills, skill_categories = _parse_match_jd(jd_json)
 
     # Optional per-JD overrides for skill weights and rejection rules
     skill_weights = (jd_json.get("skillWeights") or {}) if isinstance(jd_json, dict) else {}
     rejection_rules = (jd_json.get("rejectionRules") or {}) if isinstance(jd_json, dict) else {}
     
-    # Save JD to DB
-    db_jd = crud.get_or_create_job_description(supabase=supabase, jd=jd_obj)
+    parsed_cvs = [
+        (CVModel.parse_obj(cv_entry["cv_json"]), cv_entry.get("skill_presence", {}))
+        for cv_entry in cvs
+    ]
 
-    results = []
-    for cv_entry in cvs:
-        cv_json = cv_entry["cv_json"]
-        skill_presence = cv_entry.get("skill_presence", {})
+    if skill_categories:
+        # Fill in verdicts for JD skills the client did not send (e.g. a stored CV
+        # re-screened against a new JD) without re-extracting the resume
+        semaphore = asyncio.Semaphore(EXTRACTION_LLM_CONCURRENCY)
+
+        async def complete_presence(cv_obj, skill_presence):
+            async with semaphore:
+                detected = await adetect_skill_presence(cv_obj, skill_categories, skill_presence)
+            return cv_obj, {**(skill_presence or {}), **detected}
+
+        parsed_cvs = list(await asyncio.gather(*(complete_presence(cv_obj, sp) for cv_obj, sp in parsed_cvs)))
+
+    # Save JD to DB while everything that depends only on the JD is prepared once
+    # (and reused across requests for the same JD content) instead of once per CV
+    db_jd, jd_profile = await asyncio.gather(
+        asyncio.to_thread(crud.get_or_create_job_description, supabase=supabase, jd=jd_obj),
+        matching.aget_jd_profile(jd_obj, crud._create_jd_content_hash(jd_obj))
+    )
+    if db_jd:
+        await asyncio.to_thread(_index_jd, db_jd, jd_profile)
+
+    evaluate_cv = functools.partial(
+        _evaluate_cv, jd_obj=jd_obj, jd_profile=jd_profile, flat_skills=flat_skills, skill_categories=skill_categories,
+        skill_weights=skill_weights, rejection_rules=rejection_rules
+    )
+    save_results = functools.partial(_save_match_results, db_jd=db_jd, supabase=supabase, current_user=current_user)
+
+    async def prefilter(candidates: list) -> List[dict]:
+        scores = await matching.aprefilter_scores(jd_obj, jd_profile, candidates, skill_categories)
+        return [
+            _prefilter_result(cv_obj, skill_presence, score, details, jd_obj=jd_obj, flat_skills=flat_skills, skill_categories=skill_categories)
+            for (cv_obj, skill_presence), (score, details) in zip(candidates, scores)
+        ]
+
+    return PreparedMatch(jd_obj, parsed_cvs, evaluate_cv, save_results, prefilter)
+
+def _matching_metadata(job_title: str, scores: List[float], results_not_saved: int = 0, prefiltered: int = 0) -> dict:
+    """`scores` are the full match scores; CVs ranked by their prefilter score only are counted in `prefiltered`, never averaged in."""
+    return {
+        "job_title": job_title,
+        "candidates_evaluated": len(scores) + prefiltered,
+        "candidates_prefiltered": prefiltered,
+        "top_match_score": max(scores) if scores else 0,
+        "average_match_score": round(sum(scores) / len(scores), 2) if scores else 0,
+        "results_not_saved": results_not_saved
+    }
+
+async def _pregenerate_interview_questions(jd_obj: JDModel, ranked_cvs: List[CVModel]) -> None:
+    """Generate and cache interview questions for the INTERVIEW_QUESTIONS_TOP_K best candidates."""
+    async def generate(cv_obj):
+        try:
+            await llm.agenerate_interview_questions(jd_obj, cv_obj)
+        except llm.LLMJsonError as e:
+            logging.warning(f"Could not pre-generate interview questions: {e}")
+
+    await asyncio.gather(*(generate(cv_obj) for cv_obj in ranked_cvs[:INTERVIEW_QUESTIONS_TOP_K]))
+
+def _select_finalists(scores: List[float], top_k: int, threshold: Optional[float]) -> List[int]:
+    """Positions of the `top_k` best prefilter scores plus any scoring at least `threshold`, in input order."""
+    ranked = sorted(range(len(scores)), key=lambda position: scores[position], reverse=True)
+    finalists = set(ranked[:top_k])
+    if threshold is not None:
+        finalists.update(position for position, score in enumerate(scores) if score >= threshold)
+    return sorted(finalists)
+
+@app.post("/match", response_model=schemas.MatchResponse)
+async def match(
+    background_tasks: BackgroundTasks,
+    jd_json: dict = Body(...),
+    cvs: list = Body(...),
+    ranking: str = Query("full", pattern="^(full|two_stage)$"),
+    top_k: int = Query(PREFILTER_TOP_K, ge=0),
+    prefilter_threshold: Optional[float] = Query(None, ge=0, le=100),
+    supabase = Depends(get_supabase),
+    current_user: schemas.User = Depends(auth.get_current_user) 
+):
+    """
+    Score every CV against the JD, best match first.
+
+    With `ranking=two_stage` all CVs first get a cheap prefilter score (skill
+    presence, experience, location and one pooled embedding similarity); only
+    the `top_k` best and those scoring at least `prefilter_threshold` (0-100)
+    are fully scored and saved. The others are returned after them with their
+    prefilter score and `scoring_stage` "prefilter".
+    """
+    prepared = await _prepare_match(jd_json, cvs, supabase, current_user)
+    jd_obj, parsed_cvs = prepared.jd_obj, prepared.parsed_cvs
+
+    prefiltered = []
+    if ranking == "two_stage":
+        first_stage = await prepared.prefilter(parsed_cvs)
+        finalists = _select_finalists([result["match_score"] for result in first_stage], top_k, prefilter_threshold)
+        prefiltered = [result for position, result in enumerate(first_stage) if position not in finalists]
+        parsed_cvs = [parsed_cvs[position] for position in finalists]
+
+    # Collect every CV-side text the batch needs and embed them up front in as few
+    # requests as possible; scoring below is then served from the resolved vectors.
+    embedding_plan = EmbeddingPlan()
+    for cv_obj, skill_presence in parsed_cvs:
+        embedding_plan.add(cv_profile_texts(cv_obj))
+
+    # Scoring is CPU-bound, so it runs in worker threads, at most MATCH_CONCURRENCY
+    # at a time, keeping the event loop free for other requests.
+    semaphore = asyncio.Semaphore(MATCH_CONCURRENCY)
+
+    async def evaluate(cv_obj, skill_presence):
+        async with semaphore:
+            return await asyncio.to_thread(prepared.evaluate_cv, cv_obj, skill_presence)
+
+    async with embedding_plan.aresolved():
+        # Worker threads inherit the resolved vectors through the copied context
+        evaluated = await asyncio.gather(*(evaluate(cv_obj, skill_presence) for cv_obj, skill_presence in parsed_cvs))
+
+    # The whole batch is saved with one candidate upsert and one analysis_results insert
+    not_saved = await asyncio.to_thread(prepared.save_results, [
+        (cv_obj, cv_profile, result) for (cv_obj, _), (result, cv_profile) in zip(parsed_cvs, evaluated)
+    ])
+    results = [result for result, _ in evaluated]
+
+    ranked = sorted(zip(results, parsed_cvs), key=lambda pair: pair[0]["match_score"], reverse=True)
+    # Questions already generated for the best candidates (e.g. on an earlier match) come back with them
+    for result, (cv_obj, _) in ranked[:INTERVIEW_QUESTIONS_TOP_K]:
+        result["interview_questions"] = llm.cached_interview_questions(jd_obj, cv_obj) or []
+    results = [result for result, _ in ranked] + sorted(prefiltered, key=lambda result: result["match_score"], reverse=True)
+    # Questions are only worth generating for the candidates recruiters will open first
+    background_tasks.add_task(_pregenerate_interview_questions, jd_obj, [cv_obj for _, (cv_obj, _) in ranked])
+    return {
+        "results": results,
+        "matching_metadata": _matching_metadata(jd_obj.jobTitle, [result["match_score"] for result, _ in ranked],
+                                                results_not_saved=not_saved, prefiltered=len(prefiltered))
+    }
+
+async def _score_as_completed(parsed_cvs: list, score_cv):
+    """
+    Score CVs at most MATCH_CONCURRENCY at a time, yielding (position, result, error) as each finishes.
+
+    Each CV resolves its own embeddings so the first result does not wait for
+    the whole batch. A CV that fails yields its exception as `error` instead of
+    stopping the others. Closing the generator cancels the remaining CVs.
+    """
+    semaphore = asyncio.Semaphore(MATCH_CONCURRENCY)
+
+    async def score(position, cv_obj, skill_presence):
+        async with semaphore:
+            plan = EmbeddingPlan()
+            plan.add(cv_profile_texts(cv_obj))
+            try:
+                async with plan.aresolved():
+                    return position, await asyncio.to_thread(score_cv, cv_obj, skill_presence), None
+            except Exception as e:
+                logging.exception("Scoring a CV failed")
+                return position, None, e
+
+    tasks = [asyncio.create_task(score(i, cv_obj, skill_presence)) for i, (cv_obj, skill_presence) in enumerate(parsed_cvs)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+def _stream_frame(frame_type: str, data: dict, stream_format: str) -> str:
+    data = jsonable_encoder(data)
+    if stream_format == "sse":
+        return f"event: {frame_type}\ndata: {json.dumps(data)}\n\n"
+    return json.dumps({"type": frame_type, "data": data}) + "\n"
+
+@app.post("/match/stream")
+async def match_stream(
+    jd_json: dict = Body(...),
+    cvs: list = Body(...),
+    stream_format: str = Query("ndjson", alias="format", pattern="^(ndjson|sse)$"),
+    supabase = Depends(get_supabase),
+    current_user: schemas.User = Depends(auth.get_current_user)
+):
+    """
+    Streaming variant of /match.
+
+    Emits one `result` frame (a MatchResult) per CV as soon as it is scored, in
+    completion order, then a final `metadata` frame (MatchingMetadata). A CV
+    that fails produces an `error` frame instead and the stream continues.
+    Frames are NDJSON lines ({"type": ..., "data": ...}) or Server-Sent Events
+    with `?format=sse`.
+    """
+    prepared = await _prepare_match(jd_json, cvs, supabase, current_user)
+    jd_obj, parsed_cvs = prepared.jd_obj, prepared.parsed_cvs
+
+    scored = []
+
+    async def frames():
+        async for position, result, error in _score_as_completed(parsed_cvs, prepared.score_cv):
+            if error is not None:
+                yield _stream_frame("error", {"detail": str(error)}, stream_format)
+                continue
+            scored.append((result["match_score"], position))
+            yield _stream_frame("result", schemas.MatchResult.parse_obj(result), stream_format)
+        yield _stream_frame("metadata", _matching_metadata(jd_obj.jobTitle, [score for score, _ in scored]), stream_format)
+
+    async def pregenerate_questions():
+        ranked = sorted(scored, reverse=True)
+        await _pregenerate_interview_questions(jd_obj, [parsed_cvs[position][0] for _, position in ranked])
+
+    media_type = "text/event-stream" if stream_format == "sse" else "application/x-ndjson"
+    return StreamingResponse(frames(), media_type=media_type, background=BackgroundTask(pregenerate_questions))
+
+@app.post("/interview_questions", response_model=schemas.InterviewQuestionsResponse)
+async def interview_questions(
+    jd_json: dict = Body(...),
+    cv_json: dict = Body(...),
+    current_user: schemas.User = Depends(auth.get_current_user)
+):
+    """
+    Interview questions for one (JD, candidate) pair, generated on first request.
+
+    Questions are cached per pair, so opening the same candidate again (or one
+    pre-generated after /match) does not call the LLM.
+    """
+    try:
+        jd_obj, _, _ = _parse_match_jd(jd_json)
         cv_obj = CVModel.parse_obj(cv_json)
+    except pydantic.ValidationError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid interview questions request: {e}")
 
-        # Save candidate to DB
-        db_candidate = crud.get_or_create_candidate(supabase=supabase, cv=cv_obj, recruiter_id=recruiter_id)
-
-        # Filtering, matching, etc. (existing logic)
-        filter_status = {"passed": True, "reason": ""}
-        # ... (rest of the filtering logic)
-
-        # Use weighted skill matching if skill categories are available
-        if skill_categories:
-            # Pass overrides through context by attaching to details after computation
-            score, details = compute_similarity(jd_obj, cv_obj, skill_categories, skill_presence)
-            # Recompute skills with custom weights/status if overrides provided
-            if skill_weights or rejection_rules:
-                from .matching import calculate_weighted_skills_match, calculate_match_status
-                skills_match, skills_details = calculate_weighted_skills_match(
-                    skill_categories,
-                    skill_presence,
-                    critical_weight=skill_weights.get("critical"),
-                    important_weight=skill_weights.get("important"),
-                    desired_weight=skill_weights.get("desired"),
-                    base_skill_score=skill_weights.get("base")
-                )
-                status = calculate_match_status(
-                    skills_match,
-                    skills_details,
-                    "weighted",
-                    pass_min=rejection_rules.get("passMin", 0.7),
-                    reject_below=rejection_rules.get("rejectBelow", 0.4),
-                    critical_min_percent=rejection_rules.get("criticalMinPercent", 70.0)
-                )
-                details["skills_match"] = round(float(skills_match), 4)
-                details["skills_details"] = skills_details
-                details["skills_match_type"] = "weighted"
-                details["status"] = status
-        else:
-            score, details = compute_similarity(jd_obj, cv_obj)
-        
-        # This part reconstructs all the details needed by the frontend
-        present = [s for s in flat_skills if skill_presence.get(s, False)]
-        absent = [s for s in flat_skills if not skill_presence.get(s, False)]
-        critical_skills = skill_categories.get("critical", []) if skill_categories else []
-        if not critical_skills:
-            critical_skill_status = "Not Applicable"
-            critical_present = []
-            critical_absent = []
+    try:
+        questions = await llm.agenerate_interview_questions(jd_obj, cv_obj)
+    except llm.LLMJsonError as e:
+        logging.error(f"Failed to generate interview questions: {e}")
+        raise HTTPException(status_code=502, detail="Failed to generate interview questions: The AI service encountered an error.")
+    return {"interview_questions": questions}
+
+def _skill_summary(flat_skills: list, skill_categories: Optional[dict], skill_presence: dict) -> dict:
+    """The present/absent and critical-skill fields of a MatchResult."""
+    present = [s for s in flat_skills if skill_presence.get(s, False)]
+    absent = [s for s in flat_skills if not skill_presence.get(s, False)]
+    critical_skills = skill_categories.get("critical", []) if skill_categories else []
+    if not critical_skills:
+        critical_skill_status = "Not Applicable"
+        critical_present = []
+        critical_absent = []
+    else:
+        critical_present = [s for s in critical_skills if skill_presence.get(s, False)]
+        critical_absent = [s for s in critical_skills if not skill_presence.get(s, False)]
+    
+        if len(critical_absent) == 0 and len(critical_present) > 0:
+            critical_skill_status = "All Present"
+        elif len(critical_present) == 0 and len(critical_absent) > 0:
+            critical_skill_status = "All Absent"
         else:
-            critical_present = [s for s in critical_skills if skill_presence.get(s, False)]
-            critical_absent = [s for s in critical_skills if not skill_presence.get(s, False)]
-        
-            if len(critical_absent) == 0 and len(critical_present) > 0:
-                critical_skill_status = "All Present"
-            elif len(critical_present) == 0 and len(critical_absent) > 0:
-                critical_skill_status = "All Absent"
-            else:
-                critical_skill_status = "Partial Present"
-        
-        disclaimer = "Disclaimer: None of the critical required skills are present in this CV." if critical_skill_status == "All Absent" else None
+            critical_skill_status = "Partial Present"
+    
+    disclaimer = "Disclaimer: None of the critical required skills are present in this CV." if critical_skill_status == "All Absent" else None
+    return {
+        "critical_skill_status": critical_skill_status,
+        "critical_present": critical_present,
+        "critical_absent": critical_absent,
+        "present_skills": present,
+        "absent_skills": absent,
+        "disclaimer": disclaimer
+    }
 
-        result_data = {
-            "candidate_id": cv_obj.UUID,
-            "candidate_name": f"{cv_obj.Personal_Data.firstName or ''} {cv_obj.Personal_Data.lastName or ''}".strip(),
-            "match_score": round(score * 100, 2),
-            "match_level": get_match_level(score),
-            "match_details": details,
-            "critical_skill_status": critical_skill_status,
-            "critical_present": critical_present,
-            "critical_absent": critical_absent,
-            "present_skills": present,
-            "absent_skills": absent,
-            "disclaimer": disclaimer,
-            "job_stability": cv_obj.Analytics.job_stability,
-            "education_gap": cv_obj.Analytics.education_gap,
-            "suggested_role": cv_obj.Analytics.suggested_role,
-            "interview_questions": generate_interview_questions(jd_obj, cv_obj),
-            "skill_presence": skill_presence,
-            "filter_status": filter_status
-        }
-        results.append(result_data)
-
-        # Save analysis result to DB, ensuring details are stored
-        if db_jd and db_candidate:
-            crud.create_analysis_result(
-                supabase=supabase,
-                jd_db_id=db_jd.id,
-                candidate_db_id=db_candidate.id,
-                user_id=current_user.id,
-                result={
-                    "match_score": result_data["match_score"],
-                    "match_level": result_data["match_level"],
-                    "match_details": result_data["match_details"]
-                }
+def _prefilter_result(cv_obj, skill_presence, score, details, *, jd_obj, flat_skills, skill_categories) -> dict:
+    """MatchResult payload of a CV ranked by its prefilter score only; nothing is persisted."""
+    return {
+        "candidate_id": cv_obj.UUID,
+        "candidate_name": f"{cv_obj.Personal_Data.firstName or ''} {cv_obj.Personal_Data.lastName or ''}".strip(),
+        "match_score": round(score * 100, 2),
+        "match_level": get_match_level(score),
+        "match_details": details,
+        **_skill_summary(flat_skills, skill_categories, skill_presence),
+        "job_stability": cv_obj.Analytics.job_stability,
+        "education_gap": cv_obj.Analytics.education_gap,
+        "suggested_role": cv_obj.Analytics.suggested_role,
+        "interview_questions": [],
+        "skill_presence": skill_presence,
+        "filter_status": {"passed": True, "reason": ""},
+        "scoring_stage": "prefilter"
+    }
+
+def _evaluate_cv(cv_obj, skill_presence, *, jd_obj, jd_profile, flat_skills, skill_categories, skill_weights, rejection_rules) -> tuple:
+    """Score one CV against the JD; returns its MatchResult payload and the CV profile to store with the candidate."""
+    # The CV profile is stored with the candidate so later matches can skip re-parsing and re-embedding
+    cv_profile = matching.build_cv_profile(cv_obj)
+
+    # Filtering, matching, etc. (existing logic)
+    filter_status = {"passed": True, "reason": ""}
+    # ... (rest of the filtering logic)
+
+    # Use weighted skill matching if skill categories are available
+    if skill_categories:
+        # Pass overrides through context by attaching to details after computation
+        score, details = matching.score_profiles(jd_profile, cv_profile, skill_categories, skill_presence)
+        # Recompute skills with custom weights/status if overrides provided
+        if skill_weights or rejection_rules:
+            from .matching import calculate_weighted_skills_match, calculate_match_status
+            skills_match, skills_details = calculate_weighted_skills_match(
+                skill_categories,
+                skill_presence,
+                critical_weight=skill_weights.get("critical"),
+                important_weight=skill_weights.get("important"),
+                desired_weight=skill_weights.get("desired"),
+                base_skill_score=skill_weights.get("base")
             )
+            status = calculate_match_status(
+                skills_match,
+                skills_details,
+                "weighted",
+                pass_min=rejection_rules.get("passMin", 0.7),
+                reject_below=rejection_rules.get("rejectBelow", 0.4),
+                critical_min_percent=rejection_rules.get("criticalMinPercent", 70.0)
+            )
+            details["skills_match"] = round(float(skills_match), 4)
+            details["skills_details"] = skills_details
+            details["skills_match_type"] = "weighted"
+            details["status"] = status
+            score = matching.score_details(details)
+    else:
+        score, details = matching.score_profiles(jd_profile, cv_profile)
+    
+    result_data = {
+        "candidate_id": cv_obj.UUID,
+        "candidate_name": f"{cv_obj.Personal_Data.firstName or ''} {cv_obj.Personal_Data.lastName or ''}".strip(),
+        "match_score": round(score * 100, 2),
+        "match_level": get_match_level(score),
+        "match_details": details,
+        **_skill_summary(flat_skills, skill_categories, skill_presence),
+        "job_stability": cv_obj.Analytics.job_stability,
+        "education_gap": cv_obj.Analytics.education_gap,
+        "suggested_role": cv_obj.Analytics.suggested_role,
+        # Generated on demand (POST /interview_questions); /match attaches cached ones to its top candidates
+        "interview_questions": [],
+        "skill_presence": skill_presence,
+        "filter_status": filter_status,
+        "scoring_stage": "full"
+    }
+
+    return result_data, cv_profile
+
+def _save_match_results(evaluated: list, *, db_jd, supabase, current_user) -> int:
+    """
+    Save the candidates and analysis results of (cv_obj, cv_profile, result) triples in two requests, however many there are.
 
-    results = sorted(results, key=lambda x: x["match_score"], reverse=True)
+    Returns how many of the results could not be saved.
+    """
+    db_candidates = crud.upsert_candidates(supabase, [
+        {"cv": cv_obj, "recruiter_id": current_user.id, "profile": cv_profile.to_dict()}
+        for cv_obj, cv_profile, _ in evaluated
+    ])
+    analysis_results = []
+    for (cv_obj, cv_profile, result), db_candidate in zip(evaluated, db_candidates):
+        if db_candidate is None:
+            continue
+        vector_index.index_candidate(db_candidate.id, cv_profile)
+        if db_jd:
+            analysis_results.append({
+                "jd_db_id": db_jd.id,
+                "candidate_db_id": db_candidate.id,
+                "user_id": current_user.id,
+                "result": {
+                    "match_score": result["match_score"],
+                    "match_level": result["match_level"],
+                    "match_details": result["match_details"]
+                }
+            })
+    saved = sum(stored is not None for stored in crud.create_analysis_results(supabase, analysis_results))
+    if saved < len(evaluated):
+        logging.error(f"{len(evaluated) - saved} of {len(evaluated)} match results were not saved")
+    return len(evaluated) - saved
+
+# Background jobs: bulk matching and extraction run by in-process workers (see app/jobs.py)
+
+async def _run_match_job(job: dict, store: jobs.JobStore) -> dict:
+    payload = job["payload"]
+    pending = await asyncio.to_thread(store.pending_items, job["id"])
+    if pending:
+        current_user = schemas.User.parse_obj(payload["user"])
+        cvs = [json.loads(data) for _, data in pending]
+        prepared = await _prepare_match(payload["jd_json"], cvs, get_supabase(), current_user)
+        async for index, result, error in _score_as_completed(prepared.parsed_cvs, prepared.score_cv):
+            if error is not None:
+                await asyncio.to_thread(store.complete_item, job["id"], pending[index][0], error=str(error))
+            else:
+                await asyncio.to_thread(store.complete_item, job["id"], pending[index][0], jsonable_encoder(schemas.MatchResult.parse_obj(result)))
+
+    items = await asyncio.to_thread(store.item_results, job["id"])
+    results = sorted((item["result"] for item in items if item["status"] == "done"), key=lambda x: x["match_score"], reverse=True)
     return {
         "results": results,
-        "matching_metadata": {
-            "job_title": jd_obj.jobTitle,
-            "candidates_evaluated": len(results),
-            "top_match_score": results[0]["match_score"] if results else 0,
-            "average_match_score": round(sum(r["match_score"] for r in results) / len(results), 2) if results else 0
-        }
+        "matching_metadata": _matching_metadata(payload["jd_json"].get("jobTitle"), [r["match_score"] for r in results])
+    }
+
+async def _run_extraction_job(job: dict, store: jobs.JobStore) -> list:
+    payload = job["payload"]
+    pending = await asyncio.to_thread(store.pending_items, job["id"])
+    if pending:
+        named_files = [(payload["filenames"][position], io.BytesIO(data)) for position, data in pending]
+        async for index, result in _extract_as_completed(named_files, _skill_categories(payload["jd_json"])):
+            if result is None:
+                await asyncio.to_thread(store.complete_item, job["id"], pending[index][0], error="Could not extract resume")
+            else:
+                await asyncio.to_thread(store.complete_item, job["id"], pending[index][0], jsonable_encoder(result))
+
+    items = await asyncio.to_thread(store.item_results, job["id"])
+    return [item["result"] for item in items if item["status"] == "done"]
+
+jobs.job_runner.register("match", _run_match_job)
+jobs.job_runner.register("extract_resumes", _run_extraction_job)
+
+@app.post("/jobs/match", response_model=schemas.JobSubmitted, status_code=status.HTTP_202_ACCEPTED)
+async def submit_match_job(
+    jd_json: dict = Body(...),
+    cvs: list = Body(...),
+    current_user: schemas.User = Depends(auth.get_current_user)
+):
+    """Queue a /match batch and return its job id immediately; poll GET /jobs/{job_id} for progress."""
+    try:
+        _parse_match_jd(jd_json)
+        for cv_entry in cvs:
+            CVModel.parse_obj(cv_entry["cv_json"])
+    except (pydantic.ValidationError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=422, detail=f"Invalid match request: {e}")
+
+    payload = {"jd_json": jd_json, "user": jsonable_encoder(current_user)}
+    store = jobs.get_job_store()
+    job_id = await asyncio.to_thread(store.create, "match", current_user.id, payload, [json.dumps(cv_entry).encode("utf-8") for cv_entry in cvs])
+    jobs.job_runner.notify()
+    return {"job_id": job_id, "status": "queued", "total": len(cvs)}
+
+@app.post("/jobs/extract_resumes", response_model=schemas.JobSubmitted, status_code=status.HTTP_202_ACCEPTED)
+async def submit_extraction_job(
+    resume_files: list[UploadFile] = File(...),
+    jd_json: str = Form(...),
+    current_user: schemas.User = Depends(auth.get_current_user)
+):
+    """Queue an /extract_resumes batch and return its job id immediately."""
+    _validate_resume_uploads(resume_files)
+    payload = {"jd_json": json.loads(jd_json), "filenames": [f.filename for f in resume_files], "user": jsonable_encoder(current_user)}
+    store = jobs.get_job_store()
+    job_id = await asyncio.to_thread(store.create, "extract_resumes", current_user.id, payload, [f.file.read() for f in resume_files])
+    jobs.job_runner.notify()
+    return {"job_id": job_id, "status": "queued", "total": len(resume_files)}
+
+@app.get("/jobs/{job_id}", response_model=schemas.JobStatus)
+async def read_job(job_id: str, current_user: schemas.User = Depends(auth.get_current_user)):
+    """Job progress, the results of items processed so far and, once completed, the final output."""
+    store = jobs.get_job_store()
+    job = await asyncio.to_thread(store.get, job_id)
+    if job is None or job["user_id"] != current_user.id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        **job,
+        "created_at": datetime.fromtimestamp(job["created_at"], tz=timezone.utc),
+        "updated_at": datetime.fromtimestamp(job["updated_at"], tz=timezone.utc),
+        "results": await asyncio.to_thread(store.item_results, job_id)
     }
 
 @app.get("/jds", response_model=List[schemas.JobDescription])
@@ -538,6 +1011,7 @@ def read_jd(jd_id: int, supabase = Depends(get_supabase), current_user: schemas.
 def update_jd_details(
     jd_id: int,
     jd_update: schemas.JobDescriptionDetailUpdate,
+    background_tasks: BackgroundTasks,
     supabase = Depends(get_supabase),
     current_user: schemas.User = Depends(auth.get_current_user)
 ):
@@ -546,32 +1020,331 @@ def update_jd_details(
     db_jd = crud.update_jd_details(supabase, jd_id=jd_id, jd_update=jd_update)
     if db_jd is None:
         raise HTTPException(status_code=404, detail="Job Description not found")
+    background_tasks.add_task(_index_jd, db_jd)
     return db_jd
 
 @app.patch("/jds/{jd_id}", response_model=schemas.JobDescription)
 def update_jd(
     jd_id: int,
     jd_update: schemas.JobDescriptionUpdate,
+    background_tasks: BackgroundTasks,
     supabase = Depends(get_supabase),
     current_user: schemas.User = Depends(auth.get_current_user)
 ):
     db_jd = crud.update_jd(supabase, jd_id=jd_id, jd_update=jd_update)
     if db_jd is None:
         raise HTTPException(status_code=404, detail="Job Description not found")
+    background_tasks.add_task(_index_jd, db_jd)
     return db_jd
 
+def _page_response(page: tuple, response: Response) -> list:
+    """Return the items of a (items, next_cursor) page, passing the cursor in the X-Next-Cursor header."""
+    items, next_cursor = page
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
+
 @app.get("/jds/{jd_id}/results", response_model=List[schemas.AnalysisResult])
-def read_jd_results(jd_id: int, supabase = Depends(get_supabase), current_user: schemas.User = Depends(auth.get_current_user)):
-    results = crud.get_jd_results(supabase, jd_id=jd_id)
-    return results
+def read_jd_results(
+    jd_id: int,
+    response: Response,
+    limit: int = Query(100, ge=1, le=RESULTS_PAGE_MAX),
+    cursor: Optional[str] = None,
+    summary: bool = False,
+    order_by: str = Query("created_at", pattern="^(created_at|score)$"),
+    min_score: Optional[float] = Query(None, ge=0, le=100),
+    match_level: Optional[str] = None,
+    result_status: Optional[str] = Query(None, alias="status"),
+    latest: bool = False,
+    supabase = Depends(get_supabase),
+    current_user: schemas.User = Depends(auth.get_current_user)
+):
+    try:
+        page = crud.get_jd_results(supabase, jd_id=jd_id, limit=limit, cursor=cursor, summary=summary, order_by=order_by,
+                                   min_score=min_score, match_level=match_level, status=result_status, latest=latest)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _page_response(page, response)
+
+@app.post("/jds/{jd_id}/rescore", response_model=schemas.RescoreResponse)
+def rescore_jd_results(
+    jd_id: int,
+    request: schemas.RescoreRequest,
+    supabase = Depends(get_supabase),
+    current_user: schemas.User = Depends(auth.get_current_user)
+):
+    """Re-apply new weights and rejection rules to every stored result of a JD, without re-running the CVs."""
+    if current_user.role not in ["admin", "backend_team"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    unknown = set(request.weights) - {name for name, _ in matching.RESCORE_DIMENSIONS}
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown weights: {', '.join(sorted(unknown))}")
+    if crud.get_jd(supabase, jd_id=jd_id) is None:
+        raise HTTPException(status_code=404, detail="Job Description not found")
+
+    rescored = 0
+    status_counts: dict = {}
+    try:
+        for rows in crud.iter_jd_result_details(supabase, jd_id, batch_size=RESCORE_BATCH_SIZE):
+            scores, levels, details = matching.rescore_details(
+                [row.get("details") or {} for row in rows],
+                weights=request.weights, skill_weights=request.skillWeights, rejection_rules=request.rejectionRules
+            )
+            rescored += crud.update_analysis_results(supabase, [
+                {"id": row["id"], "score": round(float(score) * 100, 2), "match_level": level, "details": row_details}
+                for row, score, level, row_details in zip(rows, scores, levels, details)
+            ])
+            for row_details in details:
+                status_counts[row_details["status"]] = status_counts.get(row_details["status"], 0) + 1
+    except Exception as e:
+        # Earlier batches are already written; say how far the rescore got so it can be re-run
+        logging.exception(f"Rescoring JD {jd_id} failed after {rescored} results")
+        raise HTTPException(status_code=500, detail={
+            "message": f"Error rescoring results: {e}", "jd_id": jd_id, "rescored": rescored, "status_counts": status_counts
+        })
+    return {"jd_id": jd_id, "rescored": rescored, "status_counts": status_counts}
+
+# Set while the startup sync of the vector indexes runs
+_index_build = threading.Event()
+
+def _sync_candidate_index(supabase, batch_size: int = 500) -> None:
+    """
+    Bring the candidate index loaded from disk up to date with the database.
+
+    An empty index (first start, or the file was lost) is built from every
+    stored profile. Otherwise only candidates saved since the file was last
+    written (e.g. before an unclean shutdown) are fetched and added, and
+    candidates no longer stored are dropped.
+    """
+    index = vector_index.get_candidate_index()
+    if not len(index):
+        vector_index.rebuild_candidate_index(crud.iter_candidate_profiles(supabase))
+        return
+    stored = set(crud.iter_candidate_ids(supabase))
+    indexed = index.ids()
+    for candidate_id in indexed - stored:
+        vector_index.candidate_index.remove(candidate_id)
+    missing = sorted(stored - indexed)
+    for start in range(0, len(missing), batch_size):
+        rows = crud.get_candidates_by_ids(supabase, missing[start:start + batch_size])
+        for candidate_id, row in rows.items():
+            cv_profile = matching.load_cv_profile(row.get("profile"))
+            if cv_profile is not None:
+                vector_index.index_candidate(candidate_id, cv_profile)
+    if missing or indexed - stored:
+        logging.info(f"Synced the candidate index: {len(missing)} candidates checked, {len(indexed - stored)} dropped")
+
+def _sync_jd_index(supabase) -> None:
+    """
+    Bring the JD index loaded from disk up to date with the active JDs.
+
+    An empty index is built from every active JD. Otherwise JDs saved or
+    reactivated since the file was last written are added and JDs no longer
+    active are dropped.
+    """
+    if not len(vector_index.get_jd_index()):
+        vector_index.rebuild_jd_index(_iter_active_jd_profiles(supabase))
+        return
+    active = {db_jd.id: db_jd for db_jd in crud.iter_active_jds(supabase)}
+    indexed = vector_index.get_jd_index().ids()
+    for jd_id in indexed - active.keys():
+        vector_index.index_jd(jd_id, None)
+    missing = [active[jd_id] for jd_id in sorted(active.keys() - indexed)]
+    for jd_id, jd_profile in _jd_profiles(missing):
+        vector_index.index_jd(jd_id, jd_profile)
+    if missing or indexed - active.keys():
+        logging.info(f"Synced the JD index: {len(missing)} JDs added, {len(indexed - active.keys())} dropped")
+
+def _sync_indexes(supabase) -> None:
+    """Startup sync of the candidate and JD indexes with the database, saved once done."""
+    try:
+        _sync_candidate_index(supabase)
+        _sync_jd_index(supabase)
+        vector_index.save_indexes()
+    except Exception:
+        logging.exception("Could not sync the vector indexes; rebuild them with /candidates/index/rebuild and /jds/index/rebuild")
+    finally:
+        _index_build.clear()
+
+def _search_candidates(supabase, jd_profile: matching.JDProfile, limit: int, shortlist: int) -> dict:
+    """Shortlist the nearest candidates in the candidate index, then score their stored profiles exactly."""
+    index = vector_index.get_candidate_index()
+    if not len(index) and _index_build.is_set():
+        raise HTTPException(status_code=503, detail="Candidate index is building; try again shortly")
+
+    query = matching.jd_search_vector(jd_profile)
+    hits = index.search(query, shortlist) if query is not None else []
+    rows = crud.get_candidates_by_ids(supabase, [candidate_id for candidate_id, _ in hits])
+
+    results = []
+    for candidate_id, retrieval_score in hits:
+        row = rows.get(candidate_id)
+        cv_profile = matching.load_cv_profile(row.get("profile")) if row else None
+        if cv_profile is None:
+            continue
+        score, details = matching.score_profiles(jd_profile, cv_profile)
+        results.append({
+            "candidate_id": candidate_id,
+            "candidate_name": row.get("name"),
+            "email": row.get("email"),
+            "match_score": round(score * 100, 2),
+            "match_level": get_match_level(score),
+            "retrieval_score": round(retrieval_score, 4),
+            "match_details": details
+        })
+    results.sort(key=lambda result: result["match_score"], reverse=True)
+    return {"results": results[:limit], "shortlisted": len(hits), "indexed": len(index)}
+
+@app.get("/jds/{jd_id}/candidates/search", response_model=schemas.CandidateSearchResponse)
+async def search_jd_candidates(
+    jd_id: int,
+    limit: int = Query(20, ge=1, le=500),
+    shortlist: int = Query(CANDIDATE_SEARCH_SHORTLIST, ge=1, le=5000),
+    supabase = Depends(get_supabase),
+    current_user: schemas.User = Depends(auth.get_current_user)
+):
+    """
+    Best stored candidates for a saved JD, across the whole candidate pool.
+
+    The `shortlist` nearest candidates are retrieved from the candidate vector
+    index (title, responsibilities and skills embeddings), then only those are
+    scored with their stored CV profiles and the best `limit` returned. Nothing
+    is re-embedded or saved.
+    """
+    if current_user.role not in ["admin", "backend_team"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    db_jd = await asyncio.to_thread(crud.get_jd, supabase, jd_id)
+    if db_jd is None:
+        raise HTTPException(status_code=404, detail="Job Description not found")
+    try:
+        jd_obj, _, _ = _parse_match_jd(db_jd.details)
+    except pydantic.ValidationError as e:
+        raise HTTPException(status_code=422, detail=f"Stored job description cannot be matched: {e}")
+    jd_profile = await matching.aget_jd_profile(jd_obj, db_jd.content_hash)
+    return await asyncio.to_thread(_search_candidates, supabase, jd_profile, limit, max(limit, shortlist))
+
+@app.post("/candidates/index/rebuild", response_model=schemas.IndexStatus)
+def rebuild_candidate_index(supabase = Depends(get_supabase), current_user: schemas.User = Depends(auth.get_current_admin_user)):
+    """Rebuild the candidate vector index from every stored candidate profile."""
+    index = vector_index.rebuild_candidate_index(crud.iter_candidate_profiles(supabase))
+    return {"indexed": len(index)}
+
+# JD index: reverse search from a candidate to the active JDs that fit it (see app/vector_index.py)
+
+def _jd_profiles(db_jds: List[schemas.JobDescription]) -> List[tuple]:
+    """(JD id, JDProfile) of stored JDs, with every JD-side text embedded in one batched lookup; JDs that fail to parse are skipped."""
+    parsed = []
+    for db_jd in db_jds:
+        try:
+            parsed.append((db_jd, _parse_match_jd(db_jd.details)[0]))
+        except pydantic.ValidationError as e:
+            logging.warning(f"Skipping stored JD {db_jd.id} that cannot be matched: {e}")
+    plan = EmbeddingPlan()
+    for _, jd_obj in parsed:
+        plan.add(matching.jd_profile_texts(jd_obj))
+    with plan.resolved():
+        return [(db_jd.id, matching.get_jd_profile(jd_obj, db_jd.content_hash)) for db_jd, jd_obj in parsed]
+
+def _index_jd(db_jd: schemas.JobDescription, jd_profile: Optional[matching.JDProfile] = None) -> None:
+    """Bring a saved or updated JD's entry in the JD index up to date: indexed while Active, dropped otherwise."""
+    try:
+        if (db_jd.status or "Active") != "Active":
+            vector_index.index_jd(db_jd.id, None)
+            return
+        if jd_profile is None:
+            profiles = _jd_profiles([db_jd])
+            jd_profile = profiles[0][1] if profiles else None
+        vector_index.index_jd(db_jd.id, jd_profile)
+    except Exception:
+        logging.exception(f"Could not update JD {db_jd.id} in the JD index")
+
+def _iter_active_jd_profiles(supabase, batch_size: int = 100):
+    active_jds = crud.iter_active_jds(supabase)
+    while True:
+        batch = list(itertools.islice(active_jds, batch_size))
+        if not batch:
+            return
+        yield from _jd_profiles(batch)
+
+def _search_jds(supabase, cv_profile: matching.CVProfile, limit: int, shortlist: int) -> dict:
+    """Shortlist the nearest active JDs in the JD index, then score the candidate against those exactly."""
+    index = vector_index.get_jd_index()
+    if not len(index) and _index_build.is_set():
+        raise HTTPException(status_code=503, detail="JD index is building; try again shortly")
+
+    query = matching.cv_search_vector(cv_profile)
+    hits = index.search(query, shortlist) if query is not None else []
+    db_jds = crud.get_jds_by_ids(supabase, [jd_id for jd_id, _ in hits])
+    # The index may briefly lag a status change; never return a JD that is no longer active
+    active = [db_jd for db_jd in db_jds.values() if (db_jd.status or "Active") == "Active"]
+    profiles = dict(_jd_profiles(active))
+    retrieval_scores = dict(hits)
+
+    results = []
+    for db_jd in active:
+        if db_jd.id not in profiles:
+            continue
+        score, details = matching.score_profiles(profiles[db_jd.id], cv_profile)
+        results.append({
+            "jd_id": db_jd.id,
+            "job_title": db_jd.job_title,
+            "company_name": db_jd.company_name,
+            "location": db_jd.location,
+            "match_score": round(score * 100, 2),
+            "match_level": get_match_level(score),
+            "retrieval_score": round(retrieval_scores[db_jd.id], 4),
+            "match_details": details
+        })
+    results.sort(key=lambda result: result["match_score"], reverse=True)
+    return {"results": results[:limit], "shortlisted": len(hits), "indexed": len(index)}
+
+@app.get("/candidates/{candidate_id}/jds", response_model=schemas.JDSearchResponse)
+async def search_candidate_jds(
+    candidate_id: int,
+    limit: int = Query(10, ge=1, le=500),
+    shortlist: int = Query(JD_SEARCH_SHORTLIST, ge=1, le=5000),
+    supabase = Depends(get_supabase),
+    current_user: schemas.User = Depends(auth.get_current_user)
+):
+    """
+    Best active JDs for a stored candidate.
+
+    The `shortlist` nearest active JDs are retrieved from the JD vector index,
+    then the candidate's stored CV profile is scored against each of them with
+    the same weights as /match and the best `limit` returned.
+    """
+    rows = await asyncio.to_thread(crud.get_candidates_by_ids, supabase, [candidate_id])
+    if candidate_id not in rows:
+        raise HTTPException(status_code=404, detail="Candidate not found")
+    cv_profile = matching.load_cv_profile(rows[candidate_id].get("profile"))
+    if cv_profile is None:
+        raise HTTPException(status_code=409, detail="Candidate has no current CV profile; match the CV again to store one")
+    return await asyncio.to_thread(_search_jds, supabase, cv_profile, limit, max(limit, shortlist))
+
+@app.post("/jds/index/rebuild", response_model=schemas.IndexStatus)
+def rebuild_jd_index(supabase = Depends(get_supabase), current_user: schemas.User = Depends(auth.get_current_admin_user)):
+    """Rebuild the JD vector index from every active job description."""
+    index = vector_index.rebuild_jd_index(_iter_active_jd_profiles(supabase))
+    return {"indexed": len(index)}
 
 @app.get("/analyses", response_model=List[schemas.AnalysisResult])
-def read_user_analyses(supabase = Depends(get_supabase), current_user: schemas.User = Depends(auth.get_current_user)):
-    analyses = crud.get_user_analyses(supabase, user_id=current_user.id)
-    return analyses
+def read_user_analyses(
+    response: Response,
+    limit: int = Query(100, ge=1, le=RESULTS_PAGE_MAX),
+    cursor: Optional[str] = None,
+    summary: bool = False,
+    supabase = Depends(get_supabase),
+    current_user: schemas.User = Depends(auth.get_current_user)
+):
+    try:
+        page = crud.get_user_analyses(supabase, user_id=current_user.id, limit=limit, cursor=cursor, summary=summary)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _page_response(page, response)
 
 @app.post("/jds/upload", response_model=schemas.JobDescription)
 async def upload_jd(
+    background_tasks: BackgroundTasks,
     jd_file: UploadFile = File(...),
     supabase = Depends(get_supabase),
     current_user: schemas.User = Depends(auth.get_current_user)
@@ -602,7 +1375,7 @@ async def upload_jd(
             raise HTTPException(status_code=400, detail=f"Failed to extract text from {jd_file.filename}")
 
         try:
-            jd_json = convert_jd_to_json(jd_text)
+            jd_json = await llm.aconvert_jd_to_json(jd_text)
         except llm.LLMJsonError as e:
             logging.error(f"Failed to process JD from file {jd_file.filename}: {e}", exc_info=True)
             raise HTTPException(status_code=502, detail=f"Failed to process job description: The AI service encountered an error.")
@@ -625,6 +1398,8 @@ async def upload_jd(
             )
         
         db_jd = crud.get_or_create_job_description(supabase=supabase, jd=jd_obj)
+        if db_jd:
+            background_tasks.add_task(_index_jd, db_jd)
         
         return db_jd
 
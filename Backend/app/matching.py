@@ -1,17 +1,23 @@
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 from datetime import datetime
 import re
 import os
-from typing import Dict, List, Tuple
+import base64
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass
+from contextlib import contextmanager, asynccontextmanager
+from contextvars import ContextVar
 from difflib import SequenceMatcher
 import nltk
 from nltk.stem import WordNetLemmatizer
 from nltk.corpus import stopwords
 from dotenv import load_dotenv
-import httpx
 
 from .schemas import JDModel, CVModel, Experience, Education, LocationModel, Skill, Qualifications
+from .cache import TTLCache
+from .embedding_cache import EmbeddingCache
+from .similarity import normalize, cosine, cosine_matrix
+from .embeddings import HF_API_KEY, HF_MODEL, HF_API_URL, get_embedding_client
 
 # Load environment variables
 load_dotenv()
@@ -30,65 +36,153 @@ IMPORTANT_SKILLS_WEIGHT = float(os.getenv('IMPORTANT_SKILLS_WEIGHT', 0.3))
 DESIRED_SKILLS_WEIGHT = float(os.getenv('DESIRED_SKILLS_WEIGHT', 0.2))
 BASE_SKILL_SCORE = float(os.getenv('BASE_SKILL_SCORE', 0.1))
 
-# Hugging Face Inference API configuration
-HF_API_KEY = os.getenv('HUGGINGFACE_API_KEY')
-# Use BAAI/bge-small-en-v1.5 - works better with HF Inference API
-HF_MODEL = os.getenv('HUGGINGFACE_MODEL', 'BAAI/bge-small-en-v1.5')
-HF_API_URL = f"https://router.huggingface.co/hf-inference/models/{HF_MODEL}"
+# Weights of the cheap prefilter stage of two-stage ranking (see prefilter_score)
+PREFILTER_SKILLS_WEIGHT = float(os.getenv('PREFILTER_SKILLS_WEIGHT', 0.40))
+PREFILTER_EXPERIENCE_WEIGHT = float(os.getenv('PREFILTER_EXPERIENCE_WEIGHT', 0.20))
+PREFILTER_LOCATION_WEIGHT = float(os.getenv('PREFILTER_LOCATION_WEIGHT', 0.10))
+PREFILTER_SIMILARITY_WEIGHT = float(os.getenv('PREFILTER_SIMILARITY_WEIGHT', 0.30))
+
+# Maximum number of texts sent to the embedding backend in one request
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', 64))
+
+EXPERIENCE_QUERY = "How many years of experience are required?"
+
+embedding_cache = EmbeddingCache.from_env()
+
+# Prepared JD profiles kept in memory, keyed by (JD content hash, embedding model)
+JD_PROFILE_CACHE_SIZE = int(os.getenv('JD_PROFILE_CACHE_SIZE', 256))
+jd_profile_cache = TTLCache(maxsize=JD_PROFILE_CACHE_SIZE)
+
+# Vectors resolved up front by an active EmbeddingPlan (see EmbeddingPlan.resolved)
+_resolved_embeddings: ContextVar[Optional[Dict[str, np.ndarray]]] = ContextVar("resolved_embeddings", default=None)
+
+def _request_embeddings(texts: List[str]) -> np.ndarray:
+    """Request embeddings for `texts` from the configured embedding backend (HF router or local ONNX)."""
+    return get_embedding_client().embed(texts)
+
+async def _arequest_embeddings(texts: List[str]) -> np.ndarray:
+    """Async counterpart of `_request_embeddings`; never blocks the event loop."""
+    return await get_embedding_client().aembed(texts)
+
+def _validate_texts(texts: List[str]) -> List[str]:
+    # Normalize and validate input
+    if isinstance(texts, str):
+        texts = [texts]
+    if not texts or any(t is None or (isinstance(t, str) and t.strip() == "") for t in texts):
+        raise ValueError("Input text cannot be empty")
+    return texts
 
 def get_embeddings(texts: List[str]) -> np.ndarray:
     """
-    Get embeddings from Hugging Face Inference API.
+    Get embeddings for `texts`, serving repeated texts from the embedding cache.
+    
+    Texts resolved by an active EmbeddingPlan are returned without any lookup.
+    Otherwise only texts missing from the cache are sent to the Hugging Face API,
+    deduplicated and split into requests of at most EMBEDDING_BATCH_SIZE texts.
     
     Args:
         texts: List of texts to encode
         
     Returns:
-        numpy array of embeddings
+        numpy array of float32 unit-length embeddings
     """
-    if not HF_API_KEY:
-        raise ValueError("HUGGINGFACE_API_KEY environment variable is not set. Please set it in your .env file.")
+    texts = _validate_texts(texts)
 
-    # Normalize and validate input
-    if isinstance(texts, str):
-        texts = [texts]
-    if not texts or any(t is None or (isinstance(t, str) and t.strip() == "") for t in texts):
-        raise ValueError("Input text cannot be empty")
+    resolved = _resolved_embeddings.get()
+    if resolved is not None and all(t in resolved for t in texts):
+        return np.array([resolved[t] for t in texts])
 
-    headers = {"Authorization": f"Bearer {HF_API_KEY}", "Content-Type": "application/json"}
+    # Vectors from different backends/exports are not interchangeable, so the
+    # cache is namespaced by the backend's model name
+    model_name = get_embedding_client().model_name
+    vectors = embedding_cache.get_many(model_name, texts)
+    missing = list(dict.fromkeys(t for t in texts if t not in vectors))
+    for start in range(0, len(missing), EMBEDDING_BATCH_SIZE):
+        batch = missing[start:start + EMBEDDING_BATCH_SIZE]
+        fetched = np.asarray(_request_embeddings(batch), dtype=np.float32)
+        embedding_cache.set_many(model_name, batch, fetched)
+        vectors.update(zip(batch, fetched))
 
-    # Always send a JSON dict payload as {"inputs": [..]} to the HF Inference endpoint
-    payload = {"inputs": texts}
+    return normalize(np.array([vectors[t] for t in texts]))
 
-    try:
-        with httpx.Client(timeout=30.0) as client:
-            response = client.post(HF_API_URL, headers=headers, json=payload)
-
-            # If the model is not available or payload invalid, HF will return a JSON error message
-            if response.status_code != 200:
-                # Log response body for debugging
-                try:
-                    body = response.json()
-                except Exception:
-                    body = response.text
-                print(f"HF API returned status {response.status_code}: {body}")
-
-            response.raise_for_status()
-            result = response.json()
-
-            # Convert HF response to numpy array
-            # HF returns a list of floats for single input, or list[list[float]] for batch
-            if isinstance(result, list) and len(result) > 0 and isinstance(result[0], (int, float)):
-                return np.array([result])
-            elif isinstance(result, list):
-                return np.array(result)
-            else:
-                # Unexpected format
-                raise RuntimeError(f"Unexpected HF response format: {type(result)} - {result}")
+async def aget_embeddings(texts: List[str]) -> np.ndarray:
+    """
+    Async variant of `get_embeddings` built on the shared `httpx.AsyncClient`.
+    
+    Concurrent callers share pooled connections and the event loop stays free
+    while requests are in flight.
+    """
+    texts = _validate_texts(texts)
 
-    except httpx.HTTPError as e:
-        print(f"HF API request failed: {e}")
-        raise RuntimeError(f"Error calling Hugging Face API: {e}")
+    resolved = _resolved_embeddings.get()
+    if resolved is not None and all(t in resolved for t in texts):
+        return np.array([resolved[t] for t in texts])
+
+    model_name = get_embedding_client().model_name
+    vectors = embedding_cache.get_many(model_name, texts)
+    missing = list(dict.fromkeys(t for t in texts if t not in vectors))
+    for start in range(0, len(missing), EMBEDDING_BATCH_SIZE):
+        batch = missing[start:start + EMBEDDING_BATCH_SIZE]
+        fetched = np.asarray(await _arequest_embeddings(batch), dtype=np.float32)
+        embedding_cache.set_many(model_name, batch, fetched)
+        vectors.update(zip(batch, fetched))
+
+    return normalize(np.array([vectors[t] for t in texts]))
+
+class EmbeddingPlan:
+    """
+    Two-phase "collect then resolve" embedding lookup.
+    
+    Scorers declare the texts they will embed (see `embedding_texts`), the plan
+    deduplicates them and resolves all of them with as few backend requests as
+    EMBEDDING_BATCH_SIZE allows. Inside `resolved()`, `get_embeddings` serves the
+    declared texts from the resolved vectors, so scoring issues no further requests.
+    
+    Example:
+        plan = EmbeddingPlan()
+        for cv in cvs:
+            plan.add(embedding_texts(jd, cv))
+        with plan.resolved():
+            scores = [compute_similarity(jd, cv) for cv in cvs]
+    """
+
+    def __init__(self):
+        self._texts: Dict[str, None] = {}
+
+    def add(self, texts: List[str]) -> None:
+        for text in texts:
+            if text and text.strip():
+                self._texts[text] = None
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def _pending(self) -> Tuple[Dict[str, np.ndarray], List[str]]:
+        parent = _resolved_embeddings.get() or {}
+        return dict(parent), [t for t in self._texts if t not in parent]
+
+    @contextmanager
+    def resolved(self):
+        vectors, pending = self._pending()
+        if pending:
+            vectors.update(zip(pending, get_embeddings(pending)))
+        token = _resolved_embeddings.set(vectors)
+        try:
+            yield vectors
+        finally:
+            _resolved_embeddings.reset(token)
+
+    @asynccontextmanager
+    async def aresolved(self):
+        """Like `resolved()`, but fetches missing vectors with `aget_embeddings`."""
+        vectors, pending = self._pending()
+        if pending:
+            vectors.update(zip(pending, await aget_embeddings(pending)))
+        token = _resolved_embeddings.set(vectors)
+        try:
+            yield vectors
+        finally:
+            _resolved_embeddings.reset(token)
 
 def cosine_sim(emb1: np.ndarray, emb2: np.ndarray) -> float:
     """
@@ -101,13 +195,7 @@ def cosine_sim(emb1: np.ndarray, emb2: np.ndarray) -> float:
     Returns:
         Cosine similarity score
     """
-    # Ensure embeddings are 2D
-    if emb1.ndim == 1:
-        emb1 = emb1.reshape(1, -1)
-    if emb2.ndim == 1:
-        emb2 = emb2.reshape(1, -1)
-    
-    return cosine_similarity(emb1, emb2)[0][0]
+    return cosine(emb1, emb2)
 
 CITY_VARIATIONS = {
     'gurgaon': ['gurugram', 'gurgaon'],
@@ -154,11 +242,15 @@ def parse_date(date_str: str) -> datetime:
         return datetime.now()
 
 def calculate_experience_years(experiences: List[Experience]) -> float:
+    return _experience_years([(exp.startDate, exp.endDate) for exp in experiences])
+
+def _experience_years(periods: List[Tuple[Optional[str], Optional[str]]]) -> float:
+    """Total years across (startDate, endDate) periods; open-ended periods run until today."""
     total_days = 0
-    for exp in experiences:
+    for start, end in periods:
         try:
-            start_date = parse_date(exp.startDate)
-            end_date = parse_date(exp.endDate) if exp.endDate and exp.endDate.lower() != "present" else datetime.now()
+            start_date = parse_date(start)
+            end_date = parse_date(end) if end and end.lower() != "present" else datetime.now()
             total_days += (end_date - start_date).days
         except (AttributeError, TypeError):
             continue
@@ -171,11 +263,12 @@ def extract_required_experience(qualifications: Qualifications) -> float:
     required_sentences = qualifications.required
     sentence_embeddings = get_embeddings(required_sentences)
 
-    query = "How many years of experience are required?"
-    query_embedding = get_embeddings([query])[0]
-    
+    query_embedding = get_embeddings([EXPERIENCE_QUERY])[0]
+    return _required_years(required_sentences, sentence_embeddings, query_embedding)
+
+def _required_years(required_sentences: List[str], sentence_embeddings: np.ndarray, query_embedding: np.ndarray) -> float:
     # Calculate similarities
-    similarities = [cosine_sim(query_embedding, sent_emb) for sent_emb in sentence_embeddings]
+    similarities = cosine_matrix(query_embedding, sentence_embeddings, normalized=True)[0]
     
     top_idx = int(np.argmax(similarities))
     best_sentence = required_sentences[top_idx].lower()
@@ -202,26 +295,25 @@ def extract_required_experience(qualifications: Qualifications) -> float:
 
     return 0.0
 
-def calculate_role_relevance(jd_title: str, cv_suggested_role: str, cv_experiences: List[Experience]) -> float:
+def _role_relevance_cv_text(cv_suggested_role: str, cv_experiences: List[Experience]) -> str:
+    """Return the CV text compared against the JD title, or "" when relevance falls back to 0.5."""
     if cv_suggested_role:
-        jd_emb = get_embeddings([jd_title.lower()])[0]
-        suggested_role_emb = get_embeddings([cv_suggested_role.lower()])[0]
-        role_similarity = cosine_sim(jd_emb, suggested_role_emb)
-        return max(0.3, role_similarity)
-    
-    if not cv_experiences:
-        return 0.5
-    
-    cv_titles = [exp.jobTitle for exp in cv_experiences if exp.jobTitle]
+        return cv_suggested_role.lower()
+    cv_titles = [exp.jobTitle for exp in cv_experiences or [] if exp.jobTitle]
     cv_titles_text = " ".join(cv_titles).lower()
-    
-    if not cv_titles_text.strip():
+    return cv_titles_text if cv_titles_text.strip() else ""
+
+def calculate_role_relevance(jd_title: str, cv_suggested_role: str, cv_experiences: List[Experience]) -> float:
+    cv_text = _role_relevance_cv_text(cv_suggested_role, cv_experiences)
+    if not cv_text:
         return 0.5
     
     jd_emb = get_embeddings([jd_title.lower()])[0]
-    cv_emb = get_embeddings([cv_titles_text])[0]
-    
-    similarity = cosine_sim(jd_emb, cv_emb)
+    cv_emb = get_embeddings([cv_text])[0]
+    return _role_relevance_score(jd_emb, cv_emb)
+
+def _role_relevance_score(jd_title_lower_emb: np.ndarray, cv_role_emb: np.ndarray) -> float:
+    similarity = cosine(jd_title_lower_emb, cv_role_emb, normalized=True)
     return max(0.3, similarity)
 
 def calculate_experience_match(cv_exp: float, jd_req: float, role_relevance: float) -> float:
@@ -347,14 +439,9 @@ def calculate_field_similarity(cv_field: str, jd_text: str) -> float:
         return 0.0
     cv_embed = get_embeddings([cv_field])[0]
     jd_embed = get_embeddings([jd_text])[0]
-    return cosine_sim(cv_embed, jd_embed)
-
-def calculate_education_match(cv_education: list[Education], jd_education: list[str]) -> float:
-    if not jd_education:
-        return 1.0
-    if not cv_education:
-        return 0.0
+    return cosine(cv_embed, jd_embed, normalized=True)
 
+def _parse_education_requirements(jd_education: list[str]) -> list[dict]:
     jd_requirements = []
     for req in jd_education:
         level = extract_highest_degree_level(req)
@@ -364,7 +451,9 @@ def calculate_education_match(cv_education: list[Education], jd_education: list[
             "level": level,
             "field": field
         })
+    return jd_requirements
 
+def _parse_education_entries(cv_education: list[Education]) -> list[dict]:
     cv_entries = []
     for edu in cv_education:
         degree = normalize_degree(edu.degree) if edu.degree else ""
@@ -379,18 +468,45 @@ def calculate_education_match(cv_education: list[Education], jd_education: list[
             "level": level,
             "field": field
         })
+    return cv_entries
+
+def calculate_education_match(cv_education: list[Education], jd_education: list[str]) -> float:
+    if not jd_education:
+        return 1.0
+    if not cv_education:
+        return 0.0
+
+    jd_requirements = _parse_education_requirements(jd_education)
+    cv_entries = _parse_education_entries(cv_education)
 
     jd_texts = [req["text"] for req in jd_requirements]
     cv_texts = [entry["text"] for entry in cv_entries]
     
     jd_embeddings = get_embeddings(jd_texts)
     cv_embeddings = get_embeddings(cv_texts)
-    
+
+    jd_fields = _unique_fields(jd_requirements)
+    return _education_score(jd_requirements, jd_embeddings, jd_fields, None, cv_entries, cv_embeddings)
+
+def _unique_fields(entries: List[dict]) -> List[str]:
+    return list(dict.fromkeys(entry["field"] for entry in entries if entry["field"]))
+
+def _education_score(jd_requirements: List[dict], jd_embeddings: np.ndarray, jd_fields: List[str],
+    jd_field_embeddings: Optional[np.ndarray], cv_entries: List[dict], cv_embeddings: np.ndarray,
+    cv_field_embeddings: Optional[np.ndarray] = None) -> float:
+    """Score parsed CV education entries against parsed JD requirements; field embeddings are fetched if not given."""
     # Calculate similarity matrix
-    similarity_matrix = np.zeros((len(jd_embeddings), len(cv_embeddings)))
-    for i in range(len(jd_embeddings)):
-        for j in range(len(cv_embeddings)):
-            similarity_matrix[i][j] = cosine_sim(jd_embeddings[i], cv_embeddings[j])
+    similarity_matrix = cosine_matrix(jd_embeddings, cv_embeddings, normalized=True)
+
+    # Field similarities for every (JD field, CV field) pair in one product
+    cv_fields = _unique_fields(cv_entries)
+    field_matrix = None
+    if any(jf != cf for jf in jd_fields for cf in cv_fields):
+        if jd_field_embeddings is None:
+            jd_field_embeddings = get_embeddings(jd_fields)
+        if cv_field_embeddings is None:
+            cv_field_embeddings = get_embeddings(cv_fields)
+        field_matrix = cosine_matrix(jd_field_embeddings, cv_field_embeddings, normalized=True)
 
     requirement_scores = []
     for i, jd_req in enumerate(jd_requirements):
@@ -405,8 +521,8 @@ def calculate_education_match(cv_education: list[Education], jd_education: list[
                 if jd_req["field"] == cv_entry["field"]:
                     field_bonus = 0.3
                 else:
-                    field_sim = calculate_field_similarity(cv_entry["field"], jd_req["field"])
-                    field_bonus = 0.2 * field_sim
+                    field_sim = field_matrix[jd_fields.index(jd_req["field"]), cv_fields.index(cv_entry["field"])]
+                    field_bonus = 0.2 * float(field_sim)
             total_score = min(1.0, base_score + level_bonus + field_bonus)
             if total_score > best_match_score:
                 best_match_score = total_score
@@ -415,11 +531,21 @@ def calculate_education_match(cv_education: list[Education], jd_education: list[
     final_score = min(1.0, max(requirement_scores) if requirement_scores else 0.0)
     return final_score
 
+def _normalize_location(location: LocationModel) -> Tuple[str, str, str]:
+    """Return the lowercased (city, state, country) compared by calculate_location_match."""
+    return tuple(value.lower().strip() if value else "" for value in (location.city, location.state, location.country))
+
+def _is_remote(location: LocationModel) -> bool:
+    return bool(location.remoteStatus and 'remote' in location.remoteStatus.lower())
+
 def calculate_location_match(cv_location: LocationModel, jd_location: LocationModel) -> float:
-    cv_city = cv_location.city.lower().strip() if cv_location.city else ""
-    jd_city = jd_location.city.lower().strip() if jd_location.city else ""
+    return _location_score(_normalize_location(cv_location), _normalize_location(jd_location), _is_remote(jd_location))
+
+def _location_score(cv_location: Tuple[str, str, str], jd_location: Tuple[str, str, str], jd_remote: bool) -> float:
+    cv_city, cv_state, cv_country = cv_location
+    jd_city, jd_state, jd_country = jd_location
     
-    if jd_location.remoteStatus and 'remote' in jd_location.remoteStatus.lower():
+    if jd_remote:
         return 1.0
     
     city_match = fuzzy_match_cities(cv_city, jd_city)
@@ -428,18 +554,20 @@ def calculate_location_match(cv_location: LocationModel, jd_location: LocationMo
     elif city_match >= 0.7:
         return 0.9
     
-    cv_state = cv_location.state.lower().strip() if cv_location.state else ""
-    jd_state = jd_location.state.lower().strip() if jd_location.state else ""
     if cv_state and cv_state == jd_state:
         return 0.8
     
-    cv_country = cv_location.country.lower().strip() if cv_location.country else ""
-    jd_country = jd_location.country.lower().strip() if jd_location.country else ""
     if cv_country and cv_country == jd_country:
         return 0.6
     
     return 0.3
 
+def _skills_texts(jd_required_skills: List[str], cv_skills: List[Skill]) -> Tuple[str, str]:
+    """Return the (JD, CV) skill texts compared by calculate_skills_match."""
+    jd_skills_text = " ".join(jd_required_skills or [])
+    cv_skills_text = " ".join(s.skillName for s in cv_skills or [])
+    return jd_skills_text, cv_skills_text
+
 def calculate_skills_match(jd_required_skills: List[str], cv_skills: List[Skill]) -> float:
     """Legacy function for backward compatibility - uses semantic similarity"""
     if not jd_required_skills:
@@ -450,13 +578,14 @@ def calculate_skills_match(jd_required_skills: List[str], cv_skills: List[Skill]
     if not cv_skill_names:
         return 0.3
     
-    jd_skills_text = " ".join(jd_required_skills)
-    cv_skills_text = " ".join(cv_skill_names)
+    jd_skills_text, cv_skills_text = _skills_texts(jd_required_skills, cv_skills)
     
     jd_skills_emb = get_embeddings([jd_skills_text])[0]
     cv_skills_emb = get_embeddings([cv_skills_text])[0]
-    semantic_similarity = cosine_sim(jd_skills_emb, cv_skills_emb)
-    
+    return _semantic_skills_score(jd_skills_emb, cv_skills_emb)
+
+def _semantic_skills_score(jd_skills_emb: np.ndarray, cv_skills_emb: np.ndarray) -> float:
+    semantic_similarity = cosine(jd_skills_emb, cv_skills_emb, normalized=True)
     return max(0.3, min(1.0, semantic_similarity))
 
 def calculate_weighted_skills_match(skill_categories: Dict[str, List[str]], skill_presence: Dict[str, bool], *,
@@ -566,22 +695,133 @@ def calculate_match_status(skills_match: float, skills_details: Dict, skills_mat
     # Pending for all other cases (40% <= skills_match < 70%)
     return "Pending"
 
-def calculate_enhanced_sim_resp(jd_responsibilities: List[str], cv_experiences: List[Experience]) -> float:
-    if not jd_responsibilities or not cv_experiences:
-        return 0.0
+# Stored sub-scores of a result (analysis_results.details) in the order of the dimension weights
+RESCORE_DIMENSIONS = [
+    ("title", "job_title_similarity"),
+    ("responsibilities", "responsibilities_similarity"),
+    ("experience", "experience_suitability"),
+    ("education", "education_relevance"),
+    ("skills", "skills_match"),
+    ("location", "location_compatibility"),
+]
+_SKILL_CATEGORIES = ("critical", "important", "extra")
+
+def dimension_weights(weights: Dict[str, float] = None) -> np.ndarray:
+    """Weights of RESCORE_DIMENSIONS, in order: the MATCHING_*_WEIGHT settings, overridden per dimension by `weights`."""
+    weights = weights or {}
+    defaults = dict(zip((name for name, _ in RESCORE_DIMENSIONS),
+                        (TITLE_WEIGHT, RESPONSIBILITIES_WEIGHT, EXPERIENCE_WEIGHT, EDUCATION_WEIGHT, SKILLS_WEIGHT, LOCATION_WEIGHT)))
+    return np.array([float(weights.get(name, defaults[name])) for name, _ in RESCORE_DIMENSIONS])
+
+def detail_features(details_list: List[Dict]) -> np.ndarray:
+    """The RESCORE_DIMENSIONS sub-scores of result details as an (n, dimensions) matrix."""
+    return np.array([[float(d.get(key) or 0.0) for _, key in RESCORE_DIMENSIONS] for d in details_list]).reshape(len(details_list), len(RESCORE_DIMENSIONS))
+
+def combine_scores(features: np.ndarray, weights: Dict[str, float] = None) -> np.ndarray:
+    """
+    Final 0-1 scores (rounded to 4 places) of rows of RESCORE_DIMENSIONS sub-scores.
+
+    score_profiles, /match's skill weight overrides and rescore_details all
+    score through here, so the same sub-scores and weights always give the
+    same score.
+    """
+    return np.round(np.clip(features @ dimension_weights(weights), 0.0, 1.0), 4)
+
+def score_details(details: Dict, weights: Dict[str, float] = None) -> float:
+    """Final score of one result from the sub-scores in its details (see combine_scores)."""
+    return float(combine_scores(detail_features([details]), weights)[0])
+
+def rescore_details(details_list: List[Dict], *, weights: Dict[str, float] = None, skill_weights: Dict[str, float] = None,
+    rejection_rules: Dict[str, float] = None) -> Tuple[np.ndarray, List[str], List[Dict]]:
+    """
+    Re-apply dimension weights, skill category weights and status thresholds to stored results.
+
+    The per-dimension sub-scores and skill presence ratios kept in each result's
+    details are treated as a feature matrix, so the whole batch is rescored in a
+    few array operations without embeddings or LLM calls. `weights` overrides the
+    MATCHING_*_WEIGHT of each dimension (keys of RESCORE_DIMENSIONS),
+    `skill_weights` and `rejection_rules` take the keys of /match's skillWeights
+    and rejectionRules. Returns the new scores (0-1), match levels and updated
+    details (copies), in input order.
+    """
+    skill_weights = skill_weights or {}
+    rejection_rules = rejection_rules or {}
+    category_weights = np.array([
+        float(skill_weights.get("critical", CRITICAL_SKILLS_WEIGHT)),
+        float(skill_weights.get("important", IMPORTANT_SKILLS_WEIGHT)),
+        float(skill_weights.get("desired", DESIRED_SKILLS_WEIGHT)),
+    ])
+    base = float(skill_weights.get("base", BASE_SKILL_SCORE))
+
+    n = len(details_list)
+    features = detail_features(details_list)
+    # Presence ratios of the skill categories; results without categorized skills keep their stored skills_match
+    ratios = np.zeros((n, len(_SKILL_CATEGORIES)))
+    other_categories = np.zeros(n)
+    has_critical = np.zeros(n, dtype=bool)
+    weighted = np.zeros(n, dtype=bool)
+    for i, d in enumerate(details_list):
+        skills_details = d.get("skills_details") or {}
+        if d.get("skills_match_type") != "weighted" or not skills_details:
+            continue
+        weighted[i] = True
+        for category, category_details in skills_details.items():
+            ratio = float(category_details.get("presence_ratio", 0.0))
+            if category in _SKILL_CATEGORIES:
+                ratios[i, _SKILL_CATEGORIES.index(category)] = ratio
+            else:
+                other_categories[i] += ratio * 0.1
+        # As in calculate_match_status, an empty critical category still counts as present
+        has_critical[i] = bool(skills_details.get("critical"))
+
+    skills_index = [name for name, _ in RESCORE_DIMENSIONS].index("skills")
+    skills = features[:, skills_index].copy()
+    skills[weighted] = np.clip(ratios[weighted] @ category_weights + other_categories[weighted] + base, 0.0, 1.0)
+    # Scored from skills_match as stored in the details, as /match does
+    features[:, skills_index] = [round(float(skill), 4) for skill in skills]
+    scores = combine_scores(features, weights)
+
+    # Vectorized calculate_match_status
+    critical_failed = weighted & has_critical & (ratios[:, 0] * 100 < float(rejection_rules.get("criticalMinPercent", 70.0)))
+    statuses = np.select(
+        [critical_failed, skills >= float(rejection_rules.get("passMin", 0.7)), skills < float(rejection_rules.get("rejectBelow", 0.4))],
+        ["Rejected", "Pass", "Rejected"], default="Pending")
+    category_scores = ratios * category_weights
 
+    updated = []
+    for i, d in enumerate(details_list):
+        new_details = dict(d, skills_match=round(float(skills[i]), 4), status=str(statuses[i]))
+        if weighted[i]:
+            new_details["skills_details"] = {
+                category: dict(category_details, score=float(category_scores[i, _SKILL_CATEGORIES.index(category)]))
+                if category in _SKILL_CATEGORIES else category_details
+                for category, category_details in d["skills_details"].items()
+            }
+        updated.append(new_details)
+    return scores, [get_match_level(float(score)) for score in scores], updated
+
+def _cv_descriptions(cv_experiences: List[Experience]) -> List[str]:
     cv_descriptions = []
-    for exp in cv_experiences:
+    for exp in cv_experiences or []:
         if exp.description:
             cv_descriptions.extend(exp.description)
+    return cv_descriptions
+
+def calculate_enhanced_sim_resp(jd_responsibilities: List[str], cv_experiences: List[Experience]) -> float:
+    if not jd_responsibilities or not cv_experiences:
+        return 0.0
+
+    cv_descriptions = _cv_descriptions(cv_experiences)
 
     if not cv_descriptions:
         return 0.0
 
     jd_embeddings = get_embeddings(jd_responsibilities)
     cv_embeddings = get_embeddings(cv_descriptions)
+    return _responsibilities_score(jd_embeddings, cv_embeddings)
 
-    similarity_matrix = cosine_similarity(jd_embeddings, cv_embeddings)
+def _responsibilities_score(jd_embeddings: np.ndarray, cv_embeddings: np.ndarray) -> float:
+    similarity_matrix = cosine_matrix(jd_embeddings, cv_embeddings, normalized=True)
 
     best_matches = []
     for i in range(similarity_matrix.shape[0]):
@@ -629,70 +869,352 @@ def generate_match_summary(details: Dict) -> str:
     
     return summary or "No significant strengths or concerns identified"
 
-def compute_similarity(jd: JDModel, cv: CVModel, skill_categories: Dict[str, List[str]] = None, skill_presence: Dict[str, bool] = None) -> Tuple[float, Dict]:
+def _uses_weighted_skills(skill_categories: Dict[str, List[str]], skill_presence: Dict[str, bool]) -> bool:
+    if skill_categories is None or skill_presence is None:
+        return False
+    return any(skills for skills in skill_categories.values() if skills)
+
+def _cv_title_text(cv: CVModel) -> str:
+    suggested_role = cv.Analytics.suggested_role
+    return suggested_role if suggested_role else " ".join([exp.jobTitle for exp in cv.experiences_list if exp.jobTitle])
+
+@dataclass
+class JDProfile:
+    """
+    Everything the scorer needs from a job description, prepared once per JD.
+
+    Scoring N CVs against a JD then costs one JD preparation (required years,
+    title/responsibility/education/skills embeddings, parsed education
+    requirements, normalized location) plus N CV-side passes. Embeddings are
+    float32 unit vectors; fields the JD does not have are None.
+    """
+    title: str
+    title_embedding: np.ndarray
+    title_lower_embedding: np.ndarray
+    required_years: float
+    responsibility_embeddings: Optional[np.ndarray]
+    education_requirements: List[dict]
+    education_embeddings: Optional[np.ndarray]
+    education_fields: List[str]
+    education_field_embeddings: Optional[np.ndarray]
+    location: Tuple[str, str, str]
+    remote: bool
+    skills_embedding: Optional[np.ndarray]
+    model_name: str
+    content_hash: Optional[str] = None
+
+def jd_profile_texts(jd: JDModel) -> List[str]:
+    """List every text build_jd_profile will embed."""
+    texts = [jd.jobTitle, jd.jobTitle.lower()]
+    if jd.qualifications and jd.qualifications.required:
+        texts.extend(jd.qualifications.required)
+        texts.append(EXPERIENCE_QUERY)
+    texts.extend(jd.keyResponsibilities or [])
+    jd_requirements = _parse_education_requirements(jd.educationRequired or [])
+    texts.extend(req["text"] for req in jd_requirements)
+    texts.extend(_unique_fields(jd_requirements))
+    texts.append(_skills_texts(jd.requiredSkills, [])[0])
+    return [t for t in texts if t and t.strip()]
+
+def cv_profile_texts(cv: CVModel) -> List[str]:
+    """List every text build_cv_profile will embed."""
+    texts = [_role_relevance_cv_text(cv.Analytics.suggested_role, cv.experiences_list), _cv_title_text(cv)]
+    texts.extend(_cv_descriptions(cv.experiences_list))
+    cv_entries = _parse_education_entries(cv.education_list or [])
+    texts.extend(entry["text"] for entry in cv_entries)
+    texts.extend(_unique_fields(cv_entries))
+    texts.append(_skills_texts([], cv.skills_list)[1])
+    return [t for t in texts if t and t.strip()]
+
+def embedding_texts(jd: JDModel, cv: CVModel) -> List[str]:
+    """
+    List every text compute_similarity will embed for this JD/CV pair.
+    
+    Used to fill an EmbeddingPlan before scoring; the order is irrelevant and
+    duplicates are removed by the plan.
+    """
+    return jd_profile_texts(jd) + cv_profile_texts(cv)
+
+def build_jd_profile(jd: JDModel, content_hash: Optional[str] = None) -> JDProfile:
+    """Prepare the JD side of scoring; all JD embeddings are resolved in one batched lookup."""
+    plan = EmbeddingPlan()
+    plan.add(jd_profile_texts(jd))
+    with plan.resolved():
+        title_embedding, title_lower_embedding = get_embeddings([jd.jobTitle, jd.jobTitle.lower()])
+        education_requirements = _parse_education_requirements(jd.educationRequired or [])
+        education_fields = _unique_fields(education_requirements)
+        skills_text = _skills_texts(jd.requiredSkills, [])[0]
+        return JDProfile(
+            title=jd.jobTitle,
+            title_embedding=title_embedding,
+            title_lower_embedding=title_lower_embedding,
+            required_years=extract_required_experience(jd.qualifications),
+            responsibility_embeddings=get_embeddings(jd.keyResponsibilities) if jd.keyResponsibilities else None,
+            education_requirements=education_requirements,
+            education_embeddings=get_embeddings([req["text"] for req in education_requirements]) if education_requirements else None,
+            education_fields=education_fields,
+            education_field_embeddings=get_embeddings(education_fields) if education_fields else None,
+            location=_normalize_location(jd.location),
+            remote=_is_remote(jd.location),
+            skills_embedding=get_embeddings([skills_text])[0] if skills_text.strip() else None,
+            model_name=get_embedding_client().model_name,
+            content_hash=content_hash
+        )
+
+def _jd_profile_key(content_hash: str) -> Tuple[str, str]:
+    return content_hash, get_embedding_client().model_name
+
+def get_jd_profile(jd: JDModel, content_hash: Optional[str] = None) -> JDProfile:
+    """
+    Return the JDProfile for `jd`, reusing a cached one when `content_hash` is given.
+    
+    Args:
+        jd: Job Description model
+        content_hash: The JD's content hash (see crud._create_jd_content_hash); without it the profile is always rebuilt
+    """
+    if content_hash is None:
+        return build_jd_profile(jd)
+    key = _jd_profile_key(content_hash)
+    profile = jd_profile_cache.get(key)
+    if profile is None:
+        profile = build_jd_profile(jd, content_hash)
+        jd_profile_cache.set(key, profile)
+    return profile
+
+async def aget_jd_profile(jd: JDModel, content_hash: Optional[str] = None) -> JDProfile:
+    """Async variant of `get_jd_profile`; embeddings for a new profile are fetched without blocking the event loop."""
+    if content_hash is not None:
+        profile = jd_profile_cache.get(_jd_profile_key(content_hash))
+        if profile is not None:
+            return profile
+    plan = EmbeddingPlan()
+    plan.add(jd_profile_texts(jd))
+    async with plan.aresolved():
+        return get_jd_profile(jd, content_hash)
+
+# Bump when the CVProfile layout or the way it is derived changes; older stored profiles are then rebuilt
+CV_PROFILE_VERSION = 1
+# Storage dtype for persisted CV profile embeddings: float16 halves the size at ~1e-3 precision
+CV_PROFILE_DTYPE = os.getenv('CV_PROFILE_DTYPE', 'float16')
+
+def _encode_array(array: Optional[np.ndarray], dtype: str = CV_PROFILE_DTYPE) -> Optional[dict]:
+    if array is None:
+        return None
+    array = np.asarray(array, dtype=dtype)
+    return {"dtype": array.dtype.name, "shape": list(array.shape), "data": base64.b64encode(array.tobytes()).decode("ascii")}
+
+def _decode_array(blob: Optional[dict]) -> Optional[np.ndarray]:
+    if blob is None:
+        return None
+    array = np.frombuffer(base64.b64decode(blob["data"]), dtype=blob["dtype"]).reshape(blob["shape"])
+    # Re-normalize: reduced-precision storage leaves vectors only approximately unit length
+    return normalize(array)
+
+@dataclass
+class CVProfile:
+    """
+    Everything the scorer needs from a CV, detached from the raw CVModel.
+
+    Holds the CV-side embeddings (role, title, experience descriptions,
+    education entries and fields, skills) plus derived scalars. `to_dict()`
+    serializes it to JSON with embeddings as compact base64 blobs so it can be
+    stored with the candidate; `from_dict()` restores it, letting a stored
+    candidate be scored against any JDProfile via `score_profiles` without
+    re-parsing or re-embedding.
+    """
+    suggested_role: Optional[str]
+    experience_periods: List[Tuple[Optional[str], Optional[str]]]
+    role_embedding: Optional[np.ndarray]
+    title_embedding: Optional[np.ndarray]
+    description_embeddings: Optional[np.ndarray]
+    education_entries: List[dict]
+    education_embeddings: Optional[np.ndarray]
+    education_fields: List[str]
+    education_field_embeddings: Optional[np.ndarray]
+    location: Tuple[str, str, str]
+    skills_embedding: Optional[np.ndarray]
+    model_name: str
+
+    _ARRAYS = ("role_embedding", "title_embedding", "description_embeddings", "education_embeddings",
+               "education_field_embeddings", "skills_embedding")
+
+    @property
+    def experience_years(self) -> float:
+        return _experience_years(self.experience_periods)
+
+    def to_dict(self, dtype: str = CV_PROFILE_DTYPE) -> dict:
+        data = {
+            "version": CV_PROFILE_VERSION,
+            "model_name": self.model_name,
+            "suggested_role": self.suggested_role,
+            "experience_periods": [list(period) for period in self.experience_periods],
+            "experience_years": self.experience_years,
+            "education_entries": self.education_entries,
+            "education_fields": self.education_fields,
+            "location": list(self.location)
+        }
+        for name in self._ARRAYS:
+            data[name] = _encode_array(getattr(self, name), dtype)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CVProfile":
+        if data.get("version") != CV_PROFILE_VERSION:
+            raise ValueError(f"Unsupported CV profile version: {data.get('version')}")
+        return cls(
+            suggested_role=data["suggested_role"],
+            experience_periods=[tuple(period) for period in data["experience_periods"]],
+            education_entries=data["education_entries"],
+            education_fields=data["education_fields"],
+            location=tuple(data["location"]),
+            model_name=data["model_name"],
+            **{name: _decode_array(data.get(name)) for name in cls._ARRAYS}
+        )
+
+def load_cv_profile(data: Optional[dict]) -> Optional[CVProfile]:
+    """Restore a stored CV profile, or return None when it is missing, outdated or from another embedding model."""
+    if not data:
+        return None
+    try:
+        profile = CVProfile.from_dict(data)
+    except (ValueError, KeyError, TypeError):
+        return None
+    if profile.model_name != get_embedding_client().model_name:
+        return None
+    return profile
+
+def build_cv_profile(cv: CVModel) -> CVProfile:
+    """Prepare the CV side of scoring; all CV embeddings are resolved in one batched lookup."""
+    plan = EmbeddingPlan()
+    plan.add(cv_profile_texts(cv))
+    with plan.resolved():
+        role_text = _role_relevance_cv_text(cv.Analytics.suggested_role, cv.experiences_list)
+        title_text = _cv_title_text(cv)
+        cv_descriptions = _cv_descriptions(cv.experiences_list)
+        education_entries = _parse_education_entries(cv.education_list or [])
+        education_fields = _unique_fields(education_entries)
+        skills_text = _skills_texts([], cv.skills_list)[1]
+        return CVProfile(
+            suggested_role=cv.Analytics.suggested_role,
+            experience_periods=[(exp.startDate, exp.endDate) for exp in cv.experiences_list or []],
+            role_embedding=get_embeddings([role_text])[0] if role_text else None,
+            title_embedding=get_embeddings([title_text])[0] if title_text else None,
+            description_embeddings=get_embeddings(cv_descriptions) if cv_descriptions else None,
+            education_entries=education_entries,
+            education_embeddings=get_embeddings([entry["text"] for entry in education_entries]) if education_entries else None,
+            education_fields=education_fields,
+            education_field_embeddings=get_embeddings(education_fields) if education_fields else None,
+            location=_normalize_location(cv.Personal_Data.location),
+            skills_embedding=get_embeddings([skills_text])[0] if skills_text.strip() else None,
+            model_name=get_embedding_client().model_name
+        )
+
+def compute_similarity(jd: JDModel, cv: CVModel, skill_categories: Dict[str, List[str]] = None, skill_presence: Dict[str, bool] = None,
+    jd_profile: Optional[JDProfile] = None) -> Tuple[float, Dict]:
     """
     Compute similarity between JD and CV with optional weighted skill matching.
     
+    All embeddings needed for the pair are resolved in one batched lookup before
+    scoring. When called inside an active EmbeddingPlan that already covers the
+    pair, no embedding requests are made at all.
+    
     Args:
         jd: Job Description model
         cv: CV model
         skill_categories: Optional dict with skill categories (critical, important, extra)
         skill_presence: Optional dict with skill presence boolean values
+        jd_profile: Optional prepared profile of `jd` (see get_jd_profile); only the CV side is computed when given
     
     Returns:
         Tuple of (final_score, details_dict)
     """
-    suggested_role = cv.Analytics.suggested_role
-    
-    role_relevance = calculate_role_relevance(jd.jobTitle, suggested_role, cv.experiences_list)
-    
-    jd_title_emb = get_embeddings([jd.jobTitle])[0]
+    plan = EmbeddingPlan()
+    if jd_profile is None:
+        plan.add(jd_profile_texts(jd))
+    plan.add(cv_profile_texts(cv))
+    with plan.resolved():
+        return score_profiles(jd_profile or build_jd_profile(jd), build_cv_profile(cv), skill_categories, skill_presence)
+
+def _search_vector(title: Optional[np.ndarray], responsibilities: Optional[np.ndarray], skills: Optional[np.ndarray]) -> Optional[np.ndarray]:
+    parts = [(TITLE_WEIGHT, title), (RESPONSIBILITIES_WEIGHT, responsibilities), (SKILLS_WEIGHT, skills)]
+    parts = [(weight, normalize(vector)) for weight, vector in parts if vector is not None]
+    if not parts:
+        return None
+    vector = normalize(sum(weight * vector for weight, vector in parts))
+    return vector if vector.any() else None
+
+def cv_search_vector(profile: CVProfile) -> Optional[np.ndarray]:
+    """
+    One unit vector summarizing a CV for nearest-neighbour retrieval.
+
+    The weighted sum (TITLE/RESPONSIBILITIES/SKILLS weights) of the title, the
+    mean experience description and the skills embeddings; its inner product
+    with `jd_search_vector` approximates the semantic part of score_profiles.
+    None when the profile has none of them.
+    """
+    descriptions = profile.description_embeddings.mean(axis=0) if profile.description_embeddings is not None else None
+    return _search_vector(profile.title_embedding, descriptions, profile.skills_embedding)
+
+def jd_search_vector(profile: JDProfile) -> Optional[np.ndarray]:
+    """The JD counterpart of cv_search_vector: title, mean responsibility and skills embeddings."""
+    responsibilities = profile.responsibility_embeddings.mean(axis=0) if profile.responsibility_embeddings is not None else None
+    return _search_vector(profile.title_embedding, responsibilities, profile.skills_embedding)
+
+def _education_match(jd_profile: JDProfile, cv_profile: CVProfile) -> float:
+    if not jd_profile.education_requirements:
+        return 1.0
+    if not cv_profile.education_entries:
+        return 0.0
+    return _education_score(jd_profile.education_requirements, jd_profile.education_embeddings, jd_profile.education_fields,
+                            jd_profile.education_field_embeddings, cv_profile.education_entries, cv_profile.education_embeddings,
+                            cv_profile.education_field_embeddings)
+
+def _semantic_skills_match(jd_profile: JDProfile, cv_profile: CVProfile) -> float:
+    if jd_profile.skills_embedding is None:
+        return 0.7
+    if cv_profile.skills_embedding is None:
+        return 0.3
+    return _semantic_skills_score(jd_profile.skills_embedding, cv_profile.skills_embedding)
+
+def score_profiles(jd_profile: JDProfile, cv_profile: CVProfile, skill_categories: Dict[str, List[str]] = None, skill_presence: Dict[str, bool] = None) -> Tuple[float, Dict]:
+    """
+    Score a prepared CV profile against a prepared JD profile.
     
-    cv_experience_years = calculate_experience_years(cv.experiences_list)
-    jd_required_years = extract_required_experience(jd.qualifications)
+    Pure arithmetic over the two profiles: no parsing and no embedding lookups.
+    Returns the same (final_score, details_dict) as compute_similarity.
+    """
+    suggested_role = cv_profile.suggested_role
     
-    cv_title_text = suggested_role if suggested_role else " ".join([exp.jobTitle for exp in cv.experiences_list if exp.jobTitle])
+    role_relevance = 0.5
+    if cv_profile.role_embedding is not None:
+        role_relevance = _role_relevance_score(jd_profile.title_lower_embedding, cv_profile.role_embedding)
     
-    cv_title_emb = get_embeddings([cv_title_text])[0] if cv_title_text else np.zeros_like(jd_title_emb)
+    cv_experience_years = cv_profile.experience_years
+    jd_required_years = jd_profile.required_years
     
-    sim_title = cosine_sim(jd_title_emb, cv_title_emb) if cv_title_text else 0.0
-    sim_resp = calculate_combined_sim_resp(jd.keyResponsibilities, cv.experiences_list)
+    sim_title = 0.0
+    if cv_profile.title_embedding is not None:
+        sim_title = cosine(jd_profile.title_embedding, cv_profile.title_embedding, normalized=True)
+
+    sim_resp = 0.0
+    if jd_profile.responsibility_embeddings is not None and cv_profile.description_embeddings is not None:
+        semantic_score = _responsibilities_score(jd_profile.responsibility_embeddings, cv_profile.description_embeddings)
+        sim_resp = min(1.0, semantic_score)
     
     experience_match = calculate_experience_match(cv_experience_years, jd_required_years, role_relevance)
-    education_match = calculate_education_match(cv.education_list, jd.educationRequired)
-    location_match = calculate_location_match(cv.Personal_Data.location, jd.location)
+    education_match = _education_match(jd_profile, cv_profile)
+    location_match = _location_score(cv_profile.location, jd_profile.location, jd_profile.remote)
     
     # Calculate skills match - use weighted if categories provided, otherwise legacy
-    if skill_categories is not None and skill_presence is not None:
-        # Check if skill_categories has any actual skills
-        has_skills = any(skills for skills in skill_categories.values() if skills)
-        
-        if has_skills:
-            skills_match, skills_details = calculate_weighted_skills_match(skill_categories, skill_presence)
-            skills_match_type = "weighted"
-        else:
-            # No skills in categories, fall back to semantic
-            skills_match = calculate_skills_match(jd.requiredSkills, cv.skills_list)
-            skills_details = {}
-            skills_match_type = "semantic"
+    if _uses_weighted_skills(skill_categories, skill_presence):
+        skills_match, skills_details = calculate_weighted_skills_match(skill_categories, skill_presence)
+        skills_match_type = "weighted"
     else:
-        # No categories or presence data, fall back to semantic
-        skills_match = calculate_skills_match(jd.requiredSkills, cv.skills_list)
+        # No categories, presence data or actual skills, fall back to semantic
+        skills_match = _semantic_skills_match(jd_profile, cv_profile)
         skills_details = {}
         skills_match_type = "semantic"
     
-    final_score = (
-        TITLE_WEIGHT * sim_title +
-        RESPONSIBILITIES_WEIGHT * sim_resp +
-        EXPERIENCE_WEIGHT * experience_match +
-        EDUCATION_WEIGHT * education_match +
-        SKILLS_WEIGHT * skills_match +
-        LOCATION_WEIGHT * location_match
-    )
-    
-    # Ensure final score never exceeds 1.0 (100%)
-    final_score = min(1.0, max(0.0, final_score))
-    
     # Calculate match status based on skills
     status = calculate_match_status(skills_match, skills_details, skills_match_type)
     
@@ -721,4 +1243,77 @@ def compute_similarity(jd: JDModel, cv: CVModel, skill_categories: Dict[str, Lis
         })
     }
     
-    return round(float(final_score), 4), details
\ No newline at end of file
+    # Scored from the rounded sub-scores kept in details, so a stored result rescores to the same value
+    return score_details(details), details
+
+
+def jd_summary_text(jd: JDModel) -> str:
+    """The one JD text compared by the prefilter: title plus required skills."""
+    return " ".join([jd.jobTitle] + list(jd.requiredSkills or [])).strip()
+
+def cv_summary_text(cv: CVModel) -> str:
+    """The one CV text compared by the prefilter: role or job titles plus listed skills."""
+    return " ".join([_cv_title_text(cv), _skills_texts([], cv.skills_list)[1]]).strip()
+
+def prefilter_score(jd_profile: JDProfile, cv: CVModel, similarity: float, skill_categories: Dict[str, List[str]] = None,
+    skill_presence: Dict[str, bool] = None) -> Tuple[float, Dict]:
+    """
+    Cheap first-stage score of a CV, used to pick the candidates worth full scoring.
+
+    Combines weighted skill presence, experience years against the JD's
+    requirement, location and `similarity`, the cosine between the JD and CV
+    summary texts (see jd_summary_text/cv_summary_text). Without categorized
+    skills the skills term falls back to that similarity. No embeddings are
+    looked up here.
+    """
+    if _uses_weighted_skills(skill_categories, skill_presence):
+        skills_match, _ = calculate_weighted_skills_match(skill_categories, skill_presence)
+        skills_match_type = "weighted"
+    else:
+        skills_match = max(0.0, similarity)
+        skills_match_type = "semantic"
+
+    cv_experience_years = calculate_experience_years(cv.experiences_list or [])
+    # Role relevance is left to the similarity term
+    experience_match = calculate_experience_match(cv_experience_years, jd_profile.required_years, 1.0)
+    location_match = _location_score(_normalize_location(cv.Personal_Data.location), jd_profile.location, jd_profile.remote)
+
+    total_weight = PREFILTER_SKILLS_WEIGHT + PREFILTER_EXPERIENCE_WEIGHT + PREFILTER_LOCATION_WEIGHT + PREFILTER_SIMILARITY_WEIGHT
+    score = (
+        PREFILTER_SKILLS_WEIGHT * skills_match +
+        PREFILTER_EXPERIENCE_WEIGHT * experience_match +
+        PREFILTER_LOCATION_WEIGHT * location_match +
+        PREFILTER_SIMILARITY_WEIGHT * max(0.0, similarity)
+    ) / (total_weight or 1.0)
+    score = min(1.0, max(0.0, score))
+
+    details = {
+        "skills_match": round(float(skills_match), 4),
+        "skills_match_type": skills_match_type,
+        "experience_suitability": round(float(experience_match), 4),
+        "location_compatibility": round(float(location_match), 4),
+        "summary_similarity": round(float(similarity), 4),
+        "candidate_exp_years": cv_experience_years,
+        "required_exp_years": jd_profile.required_years
+    }
+    return round(float(score), 4), details
+
+async def aprefilter_scores(jd: JDModel, jd_profile: JDProfile, cvs: List[Tuple[CVModel, Dict[str, bool]]],
+    skill_categories: Dict[str, List[str]] = None) -> List[Tuple[float, Dict]]:
+    """
+    Prefilter scores of (CV, skill_presence) pairs, in order.
+
+    The JD summary and every CV summary are embedded in one batched lookup;
+    CVs without a summary text get a similarity of 0.
+    """
+    summaries = [cv_summary_text(cv) for cv, _ in cvs]
+    jd_summary = jd_summary_text(jd)
+    embedded = [summary for summary in summaries if summary]
+    similarities = {}
+    if jd_summary and embedded:
+        vectors = await aget_embeddings([jd_summary] + embedded)
+        similarities = dict(zip(embedded, cosine_matrix(vectors[0], vectors[1:], normalized=True)[0].tolist()))
+    return [
+        prefilter_score(jd_profile, cv, similarities.get(summary, 0.0), skill_categories, skill_presence)
+        for (cv, skill_presence), summary in zip(cvs, summaries)
+    ]
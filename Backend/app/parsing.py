@@ -1,14 +1,24 @@
 import os
 import re
 import json
+import asyncio
 import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import Any
+from typing import Any, List, Optional
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Worker processes used for text extraction; 0 uses one per CPU
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", 0))
+
+_extraction_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
 def to_bool(value: Any) -> bool:
     if isinstance(value, bool):
         return value
@@ -78,6 +88,45 @@ def extract_text_from_file(file_path):
         logger.error(f"Error extracting text from {file_path}: {e}")
         return None
 
+def get_extraction_pool() -> ProcessPoolExecutor:
+    """Return the shared process pool for CPU-bound text extraction, creating it on first use."""
+    global _extraction_pool
+    if _extraction_pool is not None:
+        return _extraction_pool
+
+    with _pool_lock:
+        if _extraction_pool is None:
+            _extraction_pool = ProcessPoolExecutor(max_workers=EXTRACTION_WORKERS or None)
+    return _extraction_pool
+
+def shutdown_extraction_pool() -> None:
+    global _extraction_pool
+    with _pool_lock:
+        pool, _extraction_pool = _extraction_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+async def extract_texts_from_files(file_paths: List[str]) -> List[Optional[str]]:
+    """
+    Run extract_text_from_file for every path in the shared process pool.
+
+    Results keep the order of `file_paths`. A file whose extraction fails yields
+    None, like extract_text_from_file itself, without affecting the others.
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_extraction_pool()
+
+    async def extract(file_path):
+        try:
+            return await loop.run_in_executor(pool, extract_text_from_file, file_path)
+        except BrokenProcessPool as e:
+            # A worker died (e.g. a parser crashed hard); drop the pool so the next call gets a fresh one
+            logger.error(f"Extraction worker crashed on {file_path}: {e}")
+            shutdown_extraction_pool()
+            return None
+
+    return await asyncio.gather(*(extract(path) for path in file_paths))
+
 def preprocess_resume_text(text: str) -> str:
     text = re.sub(r'\s+', ' ', text)
     text = re.sub(r'[^\w\s\-\.\,\:\;\@\(\)\[\]\{\}\+\=\&\|\/\?\!]', '', text)
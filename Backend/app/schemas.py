@@ -40,6 +40,8 @@ class CandidateCreate(CandidateBase):
 
 class Candidate(CandidateBase):
     id: Optional[int] = None
+    # Candidates from CVs without an email address are stored too
+    email: Optional[EmailStr] = None
     recruiter_id: Optional[str] = None  # Supabase uses UUIDs
     uploaded_at: Optional[datetime] = None
 
@@ -56,6 +58,9 @@ class AnalysisResultCreate(AnalysisResultBase):
 
 class AnalysisResult(AnalysisResultBase):
     id: Optional[int] = None
+    # Left out by listings in summary mode
+    details: Optional[Dict[str, Any]] = None
+    created_at: Optional[datetime] = None
     candidate: Optional[Candidate] = None
 
     class Config:
@@ -295,13 +300,99 @@ class MatchResult(BaseModel):
     interview_questions: List[str]
     skill_presence: Dict[str, bool]
     filter_status: Dict[str, Any]
+    # "full", or "prefilter" for candidates ranked by the cheap first stage of two-stage ranking
+    scoring_stage: str = "full"
 
 class MatchingMetadata(BaseModel):
     job_title: str
     candidates_evaluated: int
+    # Of candidates_evaluated, CVs ranked by the two-stage prefilter only; top and average scores leave them out
+    candidates_prefiltered: int = 0
     top_match_score: float
     average_match_score: float
+    # Results scored but not saved to the database (see the server log for why)
+    results_not_saved: int = 0
 
 class MatchResponse(BaseModel):
     results: List[MatchResult]
-    matching_metadata: MatchingMetadata
\ No newline at end of file
+    matching_metadata: MatchingMetadata
+
+class InterviewQuestionsResponse(BaseModel):
+    interview_questions: List[str]
+
+# Candidate Search Schemas
+
+class CandidateSearchResult(BaseModel):
+    candidate_id: int
+    candidate_name: Optional[str] = None
+    email: Optional[str] = None
+    match_score: float
+    match_level: str
+    # Inner product of the JD and candidate search vectors that put the candidate on the shortlist
+    retrieval_score: float
+    match_details: Dict[str, Any]
+
+class CandidateSearchResponse(BaseModel):
+    results: List[CandidateSearchResult]
+    shortlisted: int
+    indexed: int
+
+class IndexStatus(BaseModel):
+    indexed: int
+
+class JDSearchResult(BaseModel):
+    jd_id: int
+    job_title: str
+    company_name: Optional[str] = None
+    location: Optional[str] = None
+    match_score: float
+    match_level: str
+    # Inner product of the candidate and JD search vectors that put the JD on the shortlist
+    retrieval_score: float
+    match_details: Dict[str, Any]
+
+class JDSearchResponse(BaseModel):
+    results: List[JDSearchResult]
+    shortlisted: int
+    indexed: int
+
+# Re-scoring Schemas
+
+class RescoreRequest(BaseModel):
+    # Per-dimension weights: title, responsibilities, experience, education, skills, location
+    weights: Dict[str, float] = Field(default_factory=dict)
+    # Same keys as /match: critical, important, desired, base
+    skillWeights: Dict[str, float] = Field(default_factory=dict)
+    # Same keys as /match: passMin, rejectBelow, criticalMinPercent
+    rejectionRules: Dict[str, float] = Field(default_factory=dict)
+
+class RescoreResponse(BaseModel):
+    jd_id: int
+    rescored: int
+    status_counts: Dict[str, int]
+
+# Background Job Schemas
+
+class JobSubmitted(BaseModel):
+    job_id: str
+    status: str
+    total: int
+
+class JobItemResult(BaseModel):
+    position: int
+    status: str
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+class JobStatus(BaseModel):
+    id: str
+    kind: str
+    status: str
+    total: int
+    completed: int
+    failed: int
+    created_at: datetime
+    updated_at: datetime
+    error: Optional[str] = None
+    results: List[JobItemResult] = Field(default_factory=list)
+    output: Optional[Any] = None
@@ -0,0 +1,34 @@
+import numpy as np
+
+def normalize(embeddings: np.ndarray) -> np.ndarray:
+    """
+    Return `embeddings` as float32 unit vectors (rows for 2D input).
+
+    Zero vectors stay zero, so their similarity to anything is 0.0, matching
+    sklearn's cosine_similarity.
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+    return np.divide(embeddings, norms, out=np.zeros_like(embeddings), where=norms > 0)
+
+def cosine_matrix(a: np.ndarray, b: np.ndarray, normalized: bool = False) -> np.ndarray:
+    """
+    Cosine similarity between every row of `a` and every row of `b` as one matrix product.
+
+    Args:
+        a: (n, d) or (d,) embeddings
+        b: (m, d) or (d,) embeddings
+        normalized: Skip normalization when both inputs are already unit vectors
+
+    Returns:
+        (n, m) similarity matrix
+    """
+    a = np.atleast_2d(a)
+    b = np.atleast_2d(b)
+    if not normalized:
+        a, b = normalize(a), normalize(b)
+    return a @ b.T
+
+def cosine(a: np.ndarray, b: np.ndarray, normalized: bool = False) -> float:
+    """Cosine similarity between two single embeddings."""
+    return float(cosine_matrix(a, b, normalized)[0, 0])
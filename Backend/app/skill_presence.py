@@ -0,0 +1,170 @@
+import os
+import re
+import logging
+from typing import Dict, List, Optional
+
+from . import llm, matching
+from .schemas import CVModel
+from .similarity import cosine_matrix
+from .parsing import to_bool
+
+logger = logging.getLogger(__name__)
+
+# A JD skill whose closest CV skill term is at least this similar counts as present,
+# below SKILL_ABSENT_THRESHOLD as absent; anything in between is sent to the LLM
+SKILL_MATCH_THRESHOLD = float(os.getenv("SKILL_MATCH_THRESHOLD", 0.85))
+SKILL_ABSENT_THRESHOLD = float(os.getenv("SKILL_ABSENT_THRESHOLD", 0.70))
+# Set to false to decide ambiguous skills from the embedding similarity alone
+SKILL_LLM_CHECK = to_bool(os.getenv("SKILL_LLM_CHECK", "true"))
+# Resume excerpt length sent with the ambiguous-skill LLM check
+SKILL_LLM_RESUME_CHARS = int(os.getenv("SKILL_LLM_RESUME_CHARS", 4000))
+
+# Names treated as the same skill; the first entry is the canonical one
+SKILL_ALIASES = [
+    ["javascript", "js", "ecmascript"],
+    ["typescript", "ts"],
+    ["node.js", "node", "nodejs"],
+    ["react", "react.js", "reactjs"],
+    ["vue", "vue.js", "vuejs"],
+    ["angular", "angularjs", "angular.js"],
+    ["golang", "go"],
+    ["c#", "csharp"],
+    ["postgresql", "postgres", "psql"],
+    ["sql server", "mssql", "microsoft sql server"],
+    ["mongodb", "mongo"],
+    ["kubernetes", "k8s"],
+    ["amazon web services", "aws"],
+    ["google cloud platform", "gcp", "google cloud"],
+    ["microsoft azure", "azure"],
+    ["ci/cd", "cicd", "continuous integration"],
+    ["machine learning", "ml"],
+    ["artificial intelligence", "ai"],
+    ["natural language processing", "nlp"],
+    ["scikit-learn", "sklearn"],
+    ["user experience", "ux"],
+    ["user interface", "ui"],
+    ["human resources", "hr"],
+    ["microsoft excel", "excel", "ms excel"],
+]
+
+# How often each stage decided a skill, reported on /metrics
+stage_counts = {"known": 0, "lexical": 0, "embedding": 0, "llm": 0, "fallback": 0}
+
+def skill_presence_stats() -> Dict[str, int]:
+    return dict(stage_counts)
+
+def _compact(name: str) -> str:
+    return re.sub(r"[^a-z0-9+#]", "", name.lower())
+
+_ALIAS_GROUPS: Dict[str, List[str]] = {_compact(name): group for group in SKILL_ALIASES for name in group}
+
+def canonical_skill(name: str) -> str:
+    """Case-, punctuation- and alias-insensitive form of a skill name ("Node.js" and "nodejs" -> "nodejs")."""
+    compact = _compact(name)
+    group = _ALIAS_GROUPS.get(compact)
+    return _compact(group[0]) if group else compact
+
+def _text_variants(skill: str) -> List[str]:
+    # Very short aliases ("go", "ai", "ts") are only trusted in skill lists, not in free text
+    variants = [skill] + [name for name in _ALIAS_GROUPS.get(_compact(skill), []) if len(_compact(name)) > 2]
+    return list(dict.fromkeys(v.lower() for v in variants if v.strip()))
+
+def _mentions(text: str, phrase: str) -> bool:
+    return re.search(rf"(?<![a-z0-9+#]){re.escape(phrase)}(?![a-z0-9+#])", text) is not None
+
+def cv_skill_terms(cv: CVModel) -> List[str]:
+    """Skill-like terms listed in a CV: skills, technologies used and extracted keywords."""
+    terms = [s.skillName for s in cv.skills_list]
+    for exp in cv.experiences_list:
+        terms.extend(exp.technologiesUsed)
+    for project in cv.projects_list:
+        terms.extend(project.technologiesUsed)
+    terms.extend(cv.Analytics.keyword_analysis.extracted_keywords)
+    return list(dict.fromkeys(t.strip() for t in terms if t and t.strip()))
+
+def cv_skill_text(cv: CVModel) -> str:
+    """Lowercased free text of a CV searched for skill mentions."""
+    parts = cv_skill_terms(cv)
+    for exp in cv.experiences_list:
+        parts.append(exp.jobTitle or "")
+        parts.extend(exp.description)
+    for project in cv.projects_list:
+        parts.extend([project.projectName or "", project.description or ""])
+    parts.extend(cv.achievements_list)
+    parts.append(cv.Analytics.suggested_role or "")
+    return " ".join(p for p in parts if p).lower()
+
+async def _best_term_similarity(skills: List[str], terms: List[str]) -> Optional[Dict[str, float]]:
+    """Similarity of each skill to its closest CV term, or None when embeddings are unavailable."""
+    if not terms:
+        return {skill: 0.0 for skill in skills}
+    try:
+        vectors = await matching.aget_embeddings(skills + terms)
+    except Exception as e:
+        logger.warning(f"Skill presence: embeddings unavailable, skipping similarity stage: {e}")
+        return None
+    similarities = cosine_matrix(vectors[:len(skills)], vectors[len(skills):], normalized=True)
+    return dict(zip(skills, similarities.max(axis=1).tolist()))
+
+async def _llm_presence(skills: List[str], text: str, similarity: Optional[Dict[str, float]]) -> Dict[str, bool]:
+    if SKILL_LLM_CHECK:
+        try:
+            verdicts = await llm.acheck_skill_presence(skills, text[:SKILL_LLM_RESUME_CHARS])
+            stage_counts["llm"] += len(skills)
+            return verdicts
+        except Exception as e:
+            logger.warning(f"Skill presence: LLM check failed, using similarity instead: {e}")
+    # No LLM verdict: split the ambiguous band in the middle
+    stage_counts["fallback"] += len(skills)
+    midpoint = (SKILL_MATCH_THRESHOLD + SKILL_ABSENT_THRESHOLD) / 2
+    return {skill: similarity is not None and similarity[skill] >= midpoint for skill in skills}
+
+async def adetect_skill_presence(cv: CVModel, skill_categories: Dict[str, List[str]], known: Optional[Dict[str, bool]] = None) -> Dict[str, bool]:
+    """
+    Decide which of a JD's categorized skills a stored CV has, without re-extracting the resume.
+
+    Skills already in `known` (e.g. a skill_presence map sent by the client) are
+    kept. The rest go through increasingly expensive stages, each handling only
+    what the previous one left open:
+
+    1. exact/alias lookup against the CV's skill terms and free text
+    2. embedding similarity to the closest CV skill term
+    3. one small LLM call for the skills whose similarity is ambiguous
+
+    Returns a complete skill -> bool map over every skill in `skill_categories`.
+    """
+    skills = list(dict.fromkeys(skill for category in skill_categories.values() for skill in category if skill))
+    presence = {skill: to_bool(known[skill]) for skill in skills if known and skill in known}
+    stage_counts["known"] += len(presence)
+
+    terms = cv_skill_terms(cv)
+    text = cv_skill_text(cv)
+    term_keys = {canonical_skill(term) for term in terms}
+    unresolved = []
+    for skill in skills:
+        if skill in presence:
+            continue
+        if canonical_skill(skill) in term_keys or any(_mentions(text, variant) for variant in _text_variants(skill)):
+            presence[skill] = True
+            stage_counts["lexical"] += 1
+        else:
+            unresolved.append(skill)
+
+    if unresolved:
+        similarity = await _best_term_similarity(unresolved, terms)
+        ambiguous = []
+        for skill in unresolved:
+            score = similarity[skill] if similarity is not None else None
+            if score is not None and score >= SKILL_MATCH_THRESHOLD:
+                presence[skill] = True
+            elif score is not None and score < SKILL_ABSENT_THRESHOLD:
+                presence[skill] = False
+            else:
+                ambiguous.append(skill)
+        stage_counts["embedding"] += len(unresolved) - len(ambiguous)
+        if ambiguous and text:
+            presence.update(await _llm_presence(ambiguous, text, similarity))
+        for skill in ambiguous:
+            presence.setdefault(skill, False)
+
+    return {skill: presence[skill] for skill in skills}
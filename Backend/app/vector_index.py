@@ -0,0 +1,384 @@
+import os
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from . import matching
+from .embeddings import get_embedding_client
+from .similarity import normalize
+
+logger = logging.getLogger(__name__)
+
+# Local files holding the candidate and JD indexes between restarts
+CANDIDATE_INDEX_PATH = os.getenv("CANDIDATE_INDEX_PATH", ".cache/candidate_index.npz")
+JD_INDEX_PATH = os.getenv("JD_INDEX_PATH", ".cache/jd_index.npz")
+# Below this many vectors an index is scanned exhaustively; from it on, through its IVF lists
+IVF_MIN_TRAIN_SIZE = int(os.getenv("IVF_MIN_TRAIN_SIZE", 2048))
+# Inverted lists scanned per query; more lists recall more neighbours but scan more vectors
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", 8))
+# Seconds after a change before an index is written to disk, so an unclean shutdown loses at most this much
+INDEX_SAVE_DELAY = float(os.getenv("INDEX_SAVE_DELAY", 30))
+
+# Vectors sampled per centroid when training the quantizer
+_TRAIN_SAMPLES_PER_LIST = 64
+_KMEANS_ITERATIONS = 10
+
+def _kmeans(vectors: np.ndarray, k: int, iterations: int = _KMEANS_ITERATIONS, seed: int = 0) -> np.ndarray:
+    """Spherical k-means: `k` unit centroids maximizing the inner product with their members."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        # A centroid that lost all its members keeps its previous position
+        empty = ~sums.any(axis=1)
+        sums[empty] = centroids[empty]
+        centroids = normalize(sums)
+    return centroids
+
+class IVFIndex:
+    """
+    Approximate nearest-neighbour index of unit vectors keyed by integer id, ranked by inner product.
+
+    Vectors live in one growable float32 matrix. Once the index holds
+    `min_train_size` vectors a spherical k-means quantizer with ~sqrt(n)
+    centroids is trained and every vector is filed under its closest centroid;
+    a query then only scans the `nprobe` lists whose centroids are closest to
+    it. Smaller indexes are scanned exhaustively, which is exact and still one
+    matrix product. The quantizer is retrained whenever the index has doubled
+    since it was last trained.
+
+    `metadata` is saved with the vectors (e.g. the embedding model they come
+    from) so a stale file can be detected on load. All methods are thread-safe.
+    """
+
+    def __init__(self, dim: Optional[int] = None, metadata: Optional[Dict[str, Any]] = None,
+                 min_train_size: int = IVF_MIN_TRAIN_SIZE, nprobe: int = IVF_NPROBE):
+        self.dim = dim
+        self.metadata = dict(metadata or {})
+        self.min_train_size = max(1, min_train_size)
+        self.nprobe = max(1, nprobe)
+        # True when the index changed since it was loaded or saved
+        self.dirty = False
+        self._vectors = np.zeros((0, dim or 0), dtype=np.float32)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._lists = np.zeros(0, dtype=np.int32)
+        # Rows in use, including removed ones (id -1) until the next compaction
+        self._size = 0
+        self._rows: Dict[int, int] = {}
+        self._centroids: Optional[np.ndarray] = None
+        self._trained_size = 0
+        # Live rows grouped by list and the start of each list in it, rebuilt after changes
+        self._order: Optional[np.ndarray] = None
+        self._offsets: Optional[np.ndarray] = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self._rows
+
+    def ids(self) -> Set[int]:
+        with self._lock:
+            return set(self._rows)
+
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None
+
+    def _reserve(self, rows: int) -> None:
+        capacity = len(self._ids)
+        if self._size + rows <= capacity:
+            return
+        capacity = max(self._size + rows, 2 * capacity, 64)
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        ids = np.full(capacity, -1, dtype=np.int64)
+        ids[:self._size] = self._ids[:self._size]
+        lists = np.full(capacity, -1, dtype=np.int32)
+        lists[:self._size] = self._lists[:self._size]
+        self._vectors, self._ids, self._lists = vectors, ids, lists
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        if self._centroids is None:
+            return np.zeros(len(vectors), dtype=np.int32)
+        return np.argmax(vectors @ self._centroids.T, axis=1).astype(np.int32)
+
+    def upsert(self, ids: Iterable[int], vectors: np.ndarray) -> None:
+        """Add vectors under `ids`, replacing the vectors already stored for any of them."""
+        ids = [int(item_id) for item_id in ids]
+        if not ids:
+            return
+        vectors = normalize(np.atleast_2d(vectors))
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self._vectors = np.zeros((0, self.dim), dtype=np.float32)
+            if vectors.shape != (len(ids), self.dim):
+                raise ValueError(f"Expected {len(ids)} vectors of dimension {self.dim}, got shape {vectors.shape}")
+            lists = self._assign(vectors)
+            self._reserve(sum(1 for item_id in set(ids) if item_id not in self._rows))
+            for item_id, vector, list_id in zip(ids, vectors, lists):
+                row = self._rows.get(item_id)
+                if row is None:
+                    row = self._size
+                    self._size += 1
+                    self._rows[item_id] = row
+                    self._ids[row] = item_id
+                self._vectors[row] = vector
+                self._lists[row] = list_id
+            self._order = None
+            self.dirty = True
+            if len(self._rows) >= self.min_train_size and len(self._rows) >= 2 * self._trained_size:
+                self._train()
+
+    def remove(self, ids: Iterable[int]) -> None:
+        with self._lock:
+            for item_id in ids:
+                row = self._rows.pop(int(item_id), None)
+                if row is not None:
+                    self._ids[row] = -1
+                    self._lists[row] = -1
+                    self._order = None
+                    self.dirty = True
+
+    def _compact(self) -> None:
+        live = np.flatnonzero(self._ids[:self._size] >= 0)
+        self._vectors = self._vectors[live]
+        self._ids = self._ids[live]
+        self._lists = self._lists[live]
+        self._size = len(live)
+        self._rows = {int(item_id): row for row, item_id in enumerate(self._ids)}
+        self._order = None
+
+    def _train(self) -> None:
+        self._compact()
+        n_lists = max(1, int(np.sqrt(self._size)))
+        vectors = self._vectors[:self._size]
+        sample_size = min(self._size, n_lists * _TRAIN_SAMPLES_PER_LIST)
+        sample = vectors[np.random.default_rng(0).choice(self._size, sample_size, replace=False)]
+        self._centroids = _kmeans(sample, n_lists)
+        self._lists[:self._size] = self._assign(vectors)
+        self._trained_size = self._size
+        logger.info(f"Trained IVF quantizer: {n_lists} lists over {self._size} vectors")
+
+    def _grouped_rows(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self._order is None:
+            live = np.flatnonzero(self._ids[:self._size] >= 0)
+            order = live[np.argsort(self._lists[live], kind="stable")]
+            n_lists = len(self._centroids) if self._centroids is not None else 1
+            self._order = order
+            self._offsets = np.searchsorted(self._lists[order], np.arange(n_lists + 1))
+        return self._order, self._offsets
+
+    def search(self, query: np.ndarray, k: int, nprobe: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Up to `k` (id, inner product) pairs closest to `query`, best first."""
+        with self._lock:
+            if not self._rows or k <= 0:
+                return []
+            query = normalize(query)
+            order, offsets = self._grouped_rows()
+            if self._centroids is None:
+                candidates = order
+            else:
+                probe = np.argsort(-(self._centroids @ query))[:nprobe or self.nprobe]
+                candidates = np.concatenate([order[offsets[l]:offsets[l + 1]] for l in probe])
+            scores = self._vectors[candidates] @ query
+            if len(candidates) > k:
+                top = np.argpartition(-scores, k - 1)[:k]
+            else:
+                top = np.arange(len(candidates))
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [(int(self._ids[candidates[i]]), float(scores[i])) for i in top]
+
+    def save(self, path: str) -> None:
+        """Write the index to `path` (.npz); vectors are stored as float16 to halve the file."""
+        with self._lock:
+            self._compact()
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{path}.tmp.npz"
+            np.savez(
+                tmp_path,
+                ids=self._ids,
+                vectors=self._vectors.astype(np.float16),
+                centroids=self._centroids if self._centroids is not None else np.zeros((0, self.dim or 0), dtype=np.float32),
+                trained_size=np.int64(self._trained_size),
+                dim=np.int64(self.dim or 0),
+                metadata=np.array(list(self.metadata.items()), dtype=str).reshape(-1, 2)
+            )
+            os.replace(tmp_path, path)
+            self.dirty = False
+
+    @classmethod
+    def load(cls, path: str, min_train_size: int = IVF_MIN_TRAIN_SIZE, nprobe: int = IVF_NPROBE) -> "IVFIndex":
+        with np.load(path) as data:
+            dim = int(data["dim"]) or None
+            index = cls(dim, dict(data["metadata"].tolist()), min_train_size, nprobe)
+            ids = data["ids"]
+            if len(ids):
+                index._vectors = normalize(data["vectors"])
+                index._ids = ids.astype(np.int64)
+                index._size = len(ids)
+                index._rows = {int(item_id): row for row, item_id in enumerate(index._ids)}
+                if len(data["centroids"]):
+                    index._centroids = data["centroids"].astype(np.float32)
+                    index._trained_size = int(data["trained_size"])
+                index._lists = index._assign(index._vectors)
+        return index
+
+def _model_metadata() -> Dict[str, str]:
+    return {"model_name": get_embedding_client().model_name}
+
+class IndexStore:
+    """
+    An IVFIndex persisted at `path`, loaded on first use.
+
+    A file built with another embedding model than the current one is
+    ignored and the index starts empty. Changes are written back at most
+    `save_delay` seconds after they are made (0 saves only on rebuild and
+    shutdown).
+    """
+
+    def __init__(self, path: str, save_delay: float = INDEX_SAVE_DELAY):
+        self.path = path
+        self.save_delay = save_delay
+        self._index: Optional[IVFIndex] = None
+        self._lock = threading.RLock()
+        self._rebuild_lock = threading.Lock()
+        # Changes made while a rebuild runs, replayed onto the rebuilt index
+        self._pending: Optional[List[Tuple[int, Optional[np.ndarray]]]] = None
+        self._save_timer: Optional[threading.Timer] = None
+
+    def get(self) -> IVFIndex:
+        if self._index is not None:
+            return self._index
+
+        with self._lock:
+            if self._index is None:
+                index = None
+                if os.path.exists(self.path):
+                    try:
+                        index = IVFIndex.load(self.path)
+                    except Exception as e:
+                        logger.warning(f"Could not load the vector index at {self.path}, starting empty: {e}")
+                if index is None or index.metadata != _model_metadata():
+                    index = IVFIndex(metadata=_model_metadata())
+                self._index = index
+        return self._index
+
+    def upsert(self, item_id: int, vector: Optional[np.ndarray]) -> None:
+        """Add or refresh one entry; a missing vector removes it."""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((item_id, vector))
+            self._apply(self.get(), item_id, vector)
+        self._schedule_save()
+
+    def remove(self, item_id: int) -> None:
+        self.upsert(item_id, None)
+
+    @staticmethod
+    def _apply(index: IVFIndex, item_id: int, vector: Optional[np.ndarray]) -> None:
+        if vector is None:
+            index.remove([item_id])
+        else:
+            index.upsert([item_id], vector[None, :])
+
+    def rebuild(self, entries: Iterable[Tuple[int, Optional[np.ndarray]]]) -> IVFIndex:
+        """
+        Replace the index with one built from (id, vector) pairs, skipping missing vectors, and save it.
+
+        Entries upserted or removed while the rebuild runs are applied to the
+        rebuilt index too.
+        """
+        with self._rebuild_lock:
+            with self._lock:
+                self._pending = []
+            try:
+                index = IVFIndex(metadata=_model_metadata())
+                ids, vectors = [], []
+                for item_id, vector in entries:
+                    if vector is not None:
+                        ids.append(item_id)
+                        vectors.append(vector)
+                if ids:
+                    index.upsert(ids, np.stack(vectors))
+                with self._lock:
+                    for item_id, vector in self._pending:
+                        self._apply(index, item_id, vector)
+                    self._index = index
+            finally:
+                with self._lock:
+                    self._pending = None
+            index.save(self.path)
+        logger.info(f"Rebuilt the vector index at {self.path} with {len(index)} entries")
+        return index
+
+    def _schedule_save(self) -> None:
+        if self.save_delay <= 0:
+            return
+        with self._lock:
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(self.save_delay, self._save_later)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def _save_later(self) -> None:
+        with self._lock:
+            self._save_timer = None
+        try:
+            self.save()
+        except Exception:
+            logger.exception(f"Could not save the vector index at {self.path}")
+
+    def save(self) -> None:
+        """Persist the index if it changed since it was loaded or last saved."""
+        index = self._index
+        if index is not None and index.dirty:
+            index.save(self.path)
+
+# Every stored candidate's search vector (see matching.cv_search_vector), keyed by candidate id
+candidate_index = IndexStore(CANDIDATE_INDEX_PATH)
+# Every active JD's search vector (see matching.jd_search_vector), keyed by JD id
+jd_index = IndexStore(JD_INDEX_PATH)
+
+def get_candidate_index() -> IVFIndex:
+    return candidate_index.get()
+
+def index_candidate(candidate_id: int, profile: "matching.CVProfile") -> None:
+    """Add or refresh one candidate in the candidate index."""
+    candidate_index.upsert(candidate_id, matching.cv_search_vector(profile))
+
+def rebuild_candidate_index(profiles: Iterable[Tuple[int, Optional[dict]]]) -> IVFIndex:
+    """
+    Replace the candidate index with one built from (candidate id, stored profile) pairs and save it.
+
+    Candidates without a usable profile (missing, outdated or from another
+    embedding model) are left out.
+    """
+    def vectors():
+        for candidate_id, data in profiles:
+            profile = matching.load_cv_profile(data)
+            yield candidate_id, matching.cv_search_vector(profile) if profile is not None else None
+
+    return candidate_index.rebuild(vectors())
+
+def get_jd_index() -> IVFIndex:
+    return jd_index.get()
+
+def index_jd(jd_id: int, profile: Optional["matching.JDProfile"]) -> None:
+    """Add or refresh one JD in the JD index; pass None to drop a JD that is no longer active."""
+    jd_index.upsert(jd_id, matching.jd_search_vector(profile) if profile is not None else None)
+
+def rebuild_jd_index(profiles: Iterable[Tuple[int, "matching.JDProfile"]]) -> IVFIndex:
+    """Replace the JD index with one built from (JD id, JD profile) pairs of the active JDs and save it."""
+    return jd_index.rebuild((jd_id, matching.jd_search_vector(profile)) for jd_id, profile in profiles)
+
+def save_indexes() -> None:
+    candidate_index.save()
+    jd_index.save()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Cosine Similarity Microbenchmark
+
+Compares the old per-pair scikit-learn path used by the matching scorers with the
+vectorized NumPy kernel in app/similarity.py, on matrix shapes typical of a
+JD x CV comparison (responsibilities x experience bullets, education entries,
+required-qualification sentences).
+
+Usage:
+    python scripts/benchmark_similarity.py [--dim 384] [--repeat 200]
+"""
+
+import os
+import sys
+import argparse
+import timeit
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+# Make the app package importable when run from the Backend directory
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.similarity import normalize, cosine_matrix
+
+def sklearn_per_pair(a, b):
+    """The previous approach: one cosine_similarity call per matrix cell."""
+    matrix = np.zeros((len(a), len(b)))
+    for i in range(len(a)):
+        for j in range(len(b)):
+            matrix[i][j] = cosine_similarity(a[i].reshape(1, -1), b[j].reshape(1, -1))[0][0]
+    return matrix
+
+def numpy_kernel(a, b):
+    """Pre-normalized float32 vectors and a single matrix product."""
+    return cosine_matrix(a, b, normalized=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dim", type=int, default=384, help="embedding dimension (bge-small is 384)")
+    parser.add_argument("--repeat", type=int, default=200, help="timed iterations per shape")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    shapes = [(1, 8), (3, 4), (8, 24), (12, 60)]
+
+    print(f"{'shape':>10} {'sklearn/pair (ms)':>18} {'numpy (ms)':>12} {'speedup':>9}")
+    for n, m in shapes:
+        a = rng.normal(size=(n, args.dim))
+        b = rng.normal(size=(m, args.dim))
+        a_unit, b_unit = normalize(a), normalize(b)
+
+        assert np.allclose(sklearn_per_pair(a, b), numpy_kernel(a_unit, b_unit), atol=1e-5)
+
+        # sklearn is much slower; time fewer iterations so the script stays quick
+        slow_runs = max(1, args.repeat // 10)
+        slow = timeit.timeit(lambda: sklearn_per_pair(a, b), number=slow_runs) / slow_runs
+        fast = timeit.timeit(lambda: numpy_kernel(a_unit, b_unit), number=args.repeat) / args.repeat
+        print(f"{f'{n}x{m}':>10} {slow * 1000:>18.3f} {fast * 1000:>12.4f} {slow / fast:>8.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,18 @@
 import pytest
 from unittest.mock import Mock, patch
+from app import llm
+from app.llm_gateway import LLMGateway
 from app.main import app
 from fastapi.testclient import TestClient
 
+@pytest.fixture(autouse=True)
+def unthrottled_llm_gateway(monkeypatch):
+    """Give every test a fresh LLM gateway without quota pacing so mocked calls never wait."""
+    gateway = LLMGateway(lambda: llm.get_groq_client(), lambda: llm.get_async_groq_client(),
+                         requests_per_minute=0, tokens_per_minute=0, backoff=0.0)
+    monkeypatch.setattr(llm, "gateway", gateway)
+    return gateway
+
 # Mock Supabase client for testing
 @pytest.fixture
 def mock_supabase():
@@ -4,6 +4,15 @@ Script to test admin user authentication in Supabase
 """
 
 import os
+import time
+import pytest
+from unittest.mock import Mock
+from fastapi import HTTPException
+from jose import jwt, jwk
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from app import auth
+from app.cache import TTLCache
 from app.database import get_supabase
 
 def test_admin_auth():
@@ -35,9 +44,103 @@ def test_admin_auth():
         print(f"Error during authentication: {e}")
         return False
 
+JWT_SECRET = "test-jwt-secret"
+
+def _claims(**overrides):
+    claims = {
+        "sub": "4f1c-uuid", "email": "rec@example.com", "aud": "authenticated", "role": "authenticated",
+        "exp": int(time.time()) + 3600, "user_metadata": {"username": "rec", "role": "admin"}
+    }
+    claims.update(overrides)
+    return claims
+
+def _request(token):
+    request = Mock()
+    request.headers = {"Authorization": f"Bearer {token}"}
+    return request
+
+@pytest.fixture
+def local_auth(monkeypatch):
+    """Verify HS256 tokens with a known secret and start from an empty token cache."""
+    monkeypatch.setattr(auth, "SUPABASE_JWT_SECRET", JWT_SECRET)
+    monkeypatch.setattr(auth, "AUTH_REVOCATION_CHECK", False)
+    monkeypatch.setattr(auth, "token_cache", TTLCache(maxsize=10, ttl=60))
+    return Mock()
+
+def test_get_current_user_verifies_hs256_tokens_locally(local_auth):
+    """Test that a Supabase token is verified and mapped to a user without calling Supabase Auth"""
+    token = jwt.encode(_claims(), JWT_SECRET, algorithm="HS256")
+
+    user = auth.get_current_user(_request(token), local_auth)
+    again = auth.get_current_user(_request(token), local_auth)
+
+    assert user.id == "4f1c-uuid" and user.username == "rec" and user.role == "admin"
+    assert again is user
+    local_auth.auth.get_user.assert_not_called()
+
+@pytest.mark.parametrize("claims, secret", [
+    (_claims(exp=int(time.time()) - 10), JWT_SECRET),
+    (_claims(aud="anon"), JWT_SECRET),
+    (_claims(), "another-secret"),
+])
+def test_get_current_user_rejects_invalid_tokens(local_auth, claims, secret):
+    """Test that expired, wrong-audience and forged tokens are rejected with 401"""
+    token = jwt.encode(claims, secret, algorithm="HS256")
+    with pytest.raises(HTTPException) as error:
+        auth.get_current_user(_request(token), local_auth)
+    assert error.value.status_code == 401
+
+def test_get_current_user_verifies_rs256_tokens_with_cached_jwks(local_auth, monkeypatch):
+    """Test that asymmetric tokens are verified with the JWKS, fetched once and refreshed for unknown key ids"""
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = private_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    public_pem = private_key.public_key().public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo)
+    public_jwk = {**jwk.construct(public_pem, "RS256").to_dict(), "kid": "key-1"}
+    cache = auth.JWKSCache("https://project.supabase.co/auth/v1/.well-known/jwks.json", min_refresh_interval=0)
+    fetches = []
+    def fake_fetch():
+        fetches.append(1)
+        cache._keys = {"key-1": public_jwk}
+        cache._fetched_at = cache._timer()
+    monkeypatch.setattr(cache, "_fetch", fake_fetch)
+    monkeypatch.setattr(auth, "jwks", cache)
+
+    for i in range(2):
+        token = jwt.encode(_claims(sub=f"user-{i}"), private_pem, algorithm="RS256", headers={"kid": "key-1"})
+        assert auth.get_current_user(_request(token), local_auth).id == f"user-{i}"
+    assert len(fetches) == 1
+
+    rotated = jwt.encode(_claims(), private_pem, algorithm="RS256", headers={"kid": "key-2"})
+    with pytest.raises(HTTPException):
+        auth.get_current_user(_request(rotated), local_auth)
+    assert len(fetches) == 2
+    local_auth.auth.get_user.assert_not_called()
+
+def test_get_current_user_falls_back_to_supabase_auth_without_a_secret(local_auth, monkeypatch):
+    """Test that tokens which cannot be verified locally are checked with Supabase Auth"""
+    monkeypatch.setattr(auth, "SUPABASE_JWT_SECRET", None)
+    local_auth.auth.get_user.return_value.user = Mock(id="4f1c-uuid", email="rec@example.com", user_metadata={"role": "recruiter"})
+    token = jwt.encode(_claims(), JWT_SECRET, algorithm="HS256")
+
+    user = auth.get_current_user(_request(token), local_auth)
+    auth.get_current_user(_request(token), local_auth)
+
+    assert user.id == "4f1c-uuid" and user.username == "rec@example.com"
+    local_auth.auth.get_user.assert_called_once_with(token)
+
+def test_get_current_user_revocation_check_confirms_with_supabase_auth(local_auth, monkeypatch):
+    """Test that the revocation check mode rejects valid-looking tokens Supabase Auth no longer accepts"""
+    monkeypatch.setattr(auth, "AUTH_REVOCATION_CHECK", True)
+    local_auth.auth.get_user.side_effect = Exception("Session not found")
+    token = jwt.encode(_claims(), JWT_SECRET, algorithm="HS256")
+
+    with pytest.raises(HTTPException) as error:
+        auth.get_current_user(_request(token), local_auth)
+    assert error.value.status_code == 401
+
 if __name__ == "__main__":
     success = test_admin_auth()
     if success:
         print("Authentication test completed successfully!")
     else:
-        print("Authentication test failed!")
\ No newline at end of file
+        print("Authentication test failed!")
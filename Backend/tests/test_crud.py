@@ -67,4 +67,275 @@ def test_ensure_complete_skill_presence():
     
     # Verify that missing skills are set to False
     assert result["JavaScript"] == False
-    assert result["C++"] == False
\ No newline at end of file
+    assert result["C++"] == False
+
+def _candidate_cv(email, first_name="Jane"):
+    return schemas.CVModel(
+        Personal_Data={"firstName": first_name, "email": email, "location": {}},
+        Analytics={"job_stability": {}, "education_gap": {}, "keyword_analysis": {}, "suggested_role": "Engineer"}
+    )
+
+def test_upsert_candidates_writes_a_batch_in_one_request():
+    """Test that candidates are upserted on email in one call and returned aligned with the input"""
+    supabase = Mock()
+    table = supabase.table.return_value
+    table.upsert.return_value.execute.return_value.data = [
+        {"id": 1, "name": "Ann", "email": "a@example.com"},
+        {"id": 2, "name": "Jane", "email": "b@example.com"},
+    ]
+    entries = [
+        {"cv": _candidate_cv("a@example.com", "Jane"), "recruiter_id": "user-1", "profile": {"v": 1}},
+        {"cv": _candidate_cv("b@example.com"), "recruiter_id": "user-1"},
+        {"cv": _candidate_cv("a@example.com", "Ann"), "recruiter_id": "user-1", "profile": {"v": 2}},
+    ]
+
+    stored = crud.upsert_candidates(supabase, entries)
+
+    rows = table.upsert.call_args.args[0]
+    assert table.upsert.call_count == 1
+    assert table.upsert.call_args.kwargs == {"on_conflict": "email"}
+    assert [row["email"] for row in rows] == ["a@example.com", "b@example.com"]
+    assert rows[0]["name"] == "Ann" and rows[0]["profile"] == {"v": 2}
+    assert [candidate.id for candidate in stored] == [1, 2, 1]
+
+def test_create_analysis_results_inserts_a_batch_in_one_request():
+    """Test that analysis results are inserted in a single call"""
+    supabase = Mock()
+    table = supabase.table.return_value
+    table.insert.return_value.execute.return_value.data = []
+    result = {"match_score": 80.0, "match_level": "Excellent", "match_details": {}}
+
+    crud.create_analysis_results(supabase, [
+        {"jd_db_id": 7, "candidate_db_id": candidate_id, "user_id": "user-1", "result": result} for candidate_id in (1, 2)
+    ])
+
+    rows = table.insert.call_args.args[0]
+    assert table.insert.call_count == 1
+    assert [(row["job_description_id"], row["candidate_id"], row["score"]) for row in rows] == [(7, 1, 80.0), (7, 2, 80.0)]
+    assert crud.create_analysis_results(supabase, []) == []
+
+def test_upsert_candidates_saves_rows_one_by_one_when_the_batch_fails(monkeypatch):
+    """Test that a failing bulk upsert falls back to per-candidate saves so one bad row only loses itself"""
+    supabase = Mock()
+    supabase.table.return_value.upsert.return_value.execute.side_effect = Exception("violates row-level security policy")
+    saved = []
+    def fake_get_or_create(supabase, cv, recruiter_id, assessment_result=None, profile=None):
+        saved.append(cv.Personal_Data.email)
+        return None if cv.Personal_Data.email == "bad@example.com" else schemas.Candidate(id=len(saved), name="x", email=cv.Personal_Data.email)
+    monkeypatch.setattr(crud, "get_or_create_candidate", fake_get_or_create)
+
+    stored = crud.upsert_candidates(supabase, [
+        {"cv": _candidate_cv(email), "recruiter_id": "user-1"} for email in ("a@example.com", "bad@example.com", "c@example.com")
+    ])
+
+    assert saved == ["a@example.com", "bad@example.com", "c@example.com"]
+    assert [candidate and candidate.email for candidate in stored] == ["a@example.com", None, "c@example.com"]
+
+def test_upsert_candidates_matches_email_less_rows_by_position():
+    """Test that when rows come back incomplete, candidates without an email are not all mapped to the same stored row"""
+    supabase = Mock()
+    supabase.table.return_value.upsert.return_value.execute.return_value.data = [
+        {"id": 1, "name": "Jane", "email": "a@example.com"},
+        {"id": 2, "name": "No Email 1", "email": None},
+        {"id": 3, "name": "No Email 2", "email": None},
+    ]
+    emails = (None, "a@example.com", None, "b@example.com", "a@example.com")
+    entries = [{"cv": _candidate_cv(email), "recruiter_id": "user-1"} for email in emails]
+
+    stored = crud.upsert_candidates(supabase, entries)
+
+    assert [candidate and candidate.id for candidate in stored] == [2, 1, 3, None, 1]
+
+def test_create_analysis_results_inserts_rows_one_by_one_when_the_batch_fails(monkeypatch):
+    """Test that a failing bulk insert falls back to per-result inserts and reports which ones failed"""
+    supabase = Mock()
+    supabase.table.return_value.insert.return_value.execute.side_effect = Exception("insert failed")
+    monkeypatch.setattr(crud, "create_analysis_result", lambda supabase, jd_db_id, candidate_db_id, user_id, result:
+                        None if candidate_db_id == 2 else schemas.AnalysisResult(id=candidate_db_id, **{"score": 80.0, "match_level": "Good", "details": {}}))
+    result = {"match_score": 80.0, "match_level": "Good", "match_details": {}}
+
+    stored = crud.create_analysis_results(supabase, [
+        {"jd_db_id": 7, "candidate_db_id": candidate_id, "user_id": "user-1", "result": result} for candidate_id in (1, 2, 3)
+    ])
+
+    assert [r and r.id for r in stored] == [1, None, 3]
+
+def _jd_model(job_id="JD-1"):
+    return schemas.JDModel(
+        jobId=job_id, jobTitle="Engineer", companyProfile={"companyName": "Acme"}, location={"city": "Pune", "state": "MH"},
+        jobSummary="", keyResponsibilities=[], qualifications={}, requiredSkills=["Python"], educationRequired=[],
+        compensationAndBenefits={}, applicationInfo={}, extractedKeywords=[]
+    )
+
+def _jd_row(jd_id=7, content_hash="hash"):
+    return {"id": jd_id, "content_hash": content_hash, "job_title": "Engineer", "status": "Active", "details": {}}
+
+def test_get_or_create_job_description_uses_one_rpc_and_caches_by_content_hash(monkeypatch):
+    """Test that a JD is resolved by a single RPC call and repeated lookups skip the database"""
+    from app.cache import TTLCache
+    monkeypatch.setattr(crud, "jd_row_cache", TTLCache(maxsize=10))
+    monkeypatch.setattr(crud, "_jd_row_hashes", {})
+    supabase = Mock()
+    supabase.rpc.return_value.execute.return_value.data = [_jd_row()]
+    jd = _jd_model()
+
+    first = crud.get_or_create_job_description(supabase, jd)
+    again = crud.get_or_create_job_description(supabase, jd)
+
+    assert first.id == 7 and again is first
+    assert supabase.rpc.call_count == 1
+    name, params = supabase.rpc.call_args.args
+    assert name == "get_or_create_job_description"
+    assert params["p_job_id_str"] == "JD-1" and params["p_content_hash"] == crud._create_jd_content_hash(jd)
+    supabase.table.assert_not_called()
+
+    supabase.table.return_value.update.return_value.eq.return_value.execute.return_value.data = [_jd_row()]
+    crud.update_jd(supabase, 7, schemas.JobDescriptionUpdate(status="Closed"))
+    crud.get_or_create_job_description(supabase, jd)
+    assert supabase.rpc.call_count == 2
+
+def test_get_or_create_job_description_falls_back_without_the_database_function(monkeypatch):
+    """Test that databases without the RPC function still resolve JDs with plain queries"""
+    from postgrest.exceptions import APIError
+    from app.cache import TTLCache
+    monkeypatch.setattr(crud, "jd_row_cache", TTLCache(maxsize=10))
+    monkeypatch.setattr(crud, "_jd_row_hashes", {})
+    supabase = Mock()
+    supabase.rpc.return_value.execute.side_effect = APIError({"code": "PGRST202", "message": "function not found"})
+    table = supabase.table.return_value
+    table.select.return_value.eq.return_value.execute.return_value.data = []
+    table.insert.return_value.execute.return_value.data = [_jd_row(8)]
+
+    assert crud.get_or_create_job_description(supabase, _jd_model()).id == 8
+    assert table.insert.call_args.args[0]["job_id_str"] == "JD-1"
+
+def _auth_user(i, username=None):
+    return Mock(id=f"user-{i}", email=f"user{i}@example.com", created_at=None,
+                user_metadata={"username": username or f"user{i}", "role": "recruiter"})
+
+@pytest.fixture
+def user_directory(monkeypatch):
+    """A fresh user directory reading from a mock admin client with 5 auth users, and its clock."""
+    supabase = Mock()
+    auth_users = [_auth_user(i, "shared" if i in (1, 3) else None) for i in range(5)]
+    supabase.auth.admin.list_users.side_effect = lambda page, per_page: auth_users[(page - 1) * per_page : page * per_page]
+    now = [0.0]
+    directory = crud.UserDirectory(ttl=60, page_size=2, timer=lambda: now[0])
+    monkeypatch.setattr(crud, "user_directory", directory)
+    monkeypatch.setattr(crud, "get_admin_client", lambda client: client)
+    return supabase, now
+
+def test_get_users_pages_the_auth_api_once_and_serves_from_the_directory(user_directory):
+    """Test that users are loaded page by page once and filtered/paginated in memory"""
+    supabase, now = user_directory
+
+    assert [u.id for u in crud.get_users(supabase, skip=1, limit=2)] == ["user-1", "user-2"]
+    assert [u.id for u in crud.get_users(supabase, username="shared")] == ["user-1", "user-3"]
+    assert crud.get_user(supabase, "user-4").email == "user4@example.com"
+
+    assert supabase.auth.admin.list_users.call_count == 3
+    supabase.auth.admin.get_user_by_id.assert_not_called()
+
+    now[0] = 61
+    crud.get_users(supabase)
+    assert supabase.auth.admin.list_users.call_count == 6
+
+def test_user_directory_is_updated_on_create_and_delete(user_directory, monkeypatch):
+    """Test that created users appear and deleted users disappear without reloading the directory"""
+    supabase, _ = user_directory
+    crud.get_users(supabase)
+    supabase.auth.admin.create_user.return_value.user = _auth_user(9, "newbie")
+    monkeypatch.setattr(crud.httpx, "delete", Mock(return_value=Mock(status_code=204)))
+
+    crud.create_user(supabase, schemas.UserCreate(username="newbie", email="user9@example.com", role="recruiter", password="pw"))
+    assert [u.id for u in crud.get_users(supabase, username="newbie")] == ["user-9"]
+
+    assert crud.delete_user(supabase, "user-1").id == "user-1"
+    assert [u.id for u in crud.get_users(supabase, username="shared")] == ["user-3"]
+    assert supabase.auth.admin.list_users.call_count == 3
+
+class _RecordingQuery:
+    """Stand-in for a postgrest query builder that records the calls made on it."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def __getattr__(self, name):
+        def record(*args, **kwargs):
+            self.calls.append((name, args))
+            return self
+        return record
+
+    def execute(self):
+        return Mock(data=self.rows)
+
+def _result_row(i):
+    return {"id": 100 - i, "score": 90 - i, "match_level": "Good Match", "created_at": f"2026-01-01T00:00:{59 - i:02d}+00:00",
+            "candidate": {"id": i, "name": f"Cand {i}", "email": f"c{i}@example.com"}}
+
+def test_get_jd_results_pages_by_keyset_with_a_projection():
+    """Test that result pages select only the listed columns and continue after the cursor's (created_at, id)"""
+    query = _RecordingQuery([_result_row(i) for i in range(3)])
+    supabase = Mock()
+    supabase.table.return_value = query
+
+    results, cursor = crud.get_jd_results(supabase, 7, limit=2, summary=True)
+
+    assert [r.id for r in results] == [100, 99] and results[0].details is None
+    columns = query.calls[0][1][0]
+    assert "details" not in columns and "job_descriptions" not in columns and "profile" not in columns
+    assert ("limit", (3,)) in query.calls
+    assert crud.decode_cursor(cursor) == ("2026-01-01T00:00:58+00:00", 99)
+
+    query.rows, query.calls = [_result_row(2)], []
+    results, cursor = crud.get_jd_results(supabase, 7, limit=2, cursor=crud.encode_cursor("2026-01-01T00:00:58+00:00", 99))
+    assert cursor is None and len(results) == 1
+    assert "details" in query.calls[0][1][0]
+    assert ("or_", ('created_at.lt."2026-01-01T00:00:58+00:00",and(created_at.eq."2026-01-01T00:00:58+00:00",id.lt.99)',)) in query.calls
+
+def test_get_jd_results_rejects_malformed_cursors():
+    """Test that a cursor that does not decode raises ValueError instead of returning an empty page"""
+    with pytest.raises(ValueError):
+        crud.get_jd_results(Mock(), 7, cursor="not-a-cursor")
+
+def test_get_jd_results_pushes_top_k_filters_into_the_query():
+    """Test that score ordering and the score/level/status filters become database filters, with a score cursor"""
+    query = _RecordingQuery([_result_row(i) for i in range(3)])
+    supabase = Mock()
+    supabase.table.return_value = query
+
+    results, cursor = crud.get_jd_results(supabase, 7, limit=2, order_by="score", min_score=60, match_level="Good Match",
+                                          status="Pass", latest=True)
+
+    supabase.table.assert_called_once_with("latest_analysis_results")
+    assert [r.score for r in results] == [90, 89]
+    for call in [("eq", ("job_description_id", 7)), ("gte", ("score", 60)), ("eq", ("match_level", "Good Match")),
+                 ("eq", ("details->>status", "Pass")), ("order", ("score",)), ("limit", (3,))]:
+        assert call in query.calls
+    assert crud.decode_cursor(cursor, "score") == (89.0, 99)
+
+    query.calls = []
+    crud.get_jd_results(supabase, 7, limit=2, order_by="score", cursor=cursor)
+    assert ("or_", ('score.lt."89.0",and(score.eq."89.0",id.lt.99)',)) in query.calls
+    with pytest.raises(ValueError):
+        crud.get_jd_results(supabase, 7, order_by="score", cursor=crud.encode_cursor("2026-01-01T00:00:00+00:00", 5))
+
+def test_update_analysis_results_updates_existing_rows_in_one_rpc():
+    """Test that rescored results are written by one UPDATE function call and never upserted"""
+    from postgrest.exceptions import APIError
+    supabase = Mock()
+    supabase.rpc.return_value.execute.return_value.data = 1
+    rows = [{"id": 1, "score": 90.0, "match_level": "Excellent", "details": {}}, {"id": 2, "score": 10.0, "match_level": "Poor", "details": {}}]
+
+    assert crud.update_analysis_results(supabase, rows) == 1
+    assert supabase.rpc.call_args.args == ("update_analysis_results", {"p_rows": rows})
+    supabase.table.assert_not_called()
+
+    supabase.rpc.return_value.execute.side_effect = APIError({"code": "PGRST202", "message": "function not found"})
+    update = supabase.table.return_value.update
+    update.return_value.eq.return_value.execute.side_effect = [Mock(data=[{"id": 1}]), Mock(data=[])]
+    assert crud.update_analysis_results(supabase, rows) == 1
+    assert update.call_args_list[0].args[0] == {"score": 90.0, "match_level": "Excellent", "details": {}}
+    supabase.table.return_value.upsert.assert_not_called()
+    assert crud.update_analysis_results(supabase, []) == 0
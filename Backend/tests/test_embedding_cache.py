@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+from app import matching
+from app.cache import TTLCache, SQLiteCache
+from app.embedding_cache import EmbeddingCache, embedding_key
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_ttl_cache_evicts_least_recently_used():
+    """Test that the LRU tier evicts the least recently used entry first."""
+    cache = TTLCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" is now most recently used
+    cache.set("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats.evictions == 1
+
+def test_ttl_cache_expires_entries():
+    """Test that entries older than the TTL are treated as misses."""
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=5, timer=clock)
+    cache.set("a", 1)
+    clock.now = 4
+    assert cache.get("a") == 1
+    clock.now = 6
+    assert cache.get("a") is None
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 1
+
+def test_sqlite_cache_persists_across_instances(tmp_path):
+    """Test that the disk tier survives reopening the database file."""
+    path = str(tmp_path / "cache.db")
+    cache = SQLiteCache(path)
+    cache.set("key", b"value")
+    cache.close()
+
+    reopened = SQLiteCache(path)
+    assert reopened.get("key") == b"value"
+    assert reopened.get("other") is None
+
+def test_sqlite_cache_enforces_max_entries(tmp_path):
+    """Test that the disk tier trims itself to max_entries."""
+    cache = SQLiteCache(str(tmp_path / "cache.db"), max_entries=2)
+    cache.set_many({"a": b"1", "b": b"2", "c": b"3"})
+    assert len(cache) == 2
+
+def test_embedding_key_normalizes_whitespace():
+    """Test that whitespace differences map to the same cache key."""
+    assert embedding_key("m", "Software  Engineer\n") == embedding_key("m", "Software Engineer")
+    assert embedding_key("m", "Software Engineer") != embedding_key("other", "Software Engineer")
+
+def test_embedding_cache_promotes_disk_hits(tmp_path):
+    """Test that a vector written to disk is served after the memory tier is cleared."""
+    disk = SQLiteCache(str(tmp_path / "emb.db"), table="embeddings")
+    cache = EmbeddingCache(TTLCache(maxsize=10), disk)
+    cache.set_many("m", ["hello"], np.array([[1.0, 2.0, 3.0]]))
+    cache.memory.clear()
+
+    found = cache.get_many("m", ["hello", "missing"])
+    assert list(found) == ["hello"]
+    assert found["hello"].dtype == np.float32
+    assert np.allclose(found["hello"], [1.0, 2.0, 3.0])
+    assert "memory" in cache.stats() and "disk" in cache.stats()
+
+def test_get_embeddings_only_requests_missing_texts(monkeypatch):
+    """Test that get_embeddings sends each uncached text to the API exactly once."""
+    requests = []
+
+    def fake_request(texts):
+        requests.append(list(texts))
+        return np.array([[float(len(t)), 1.0] for t in texts])
+
+    monkeypatch.setattr(matching, "embedding_cache", EmbeddingCache(TTLCache(maxsize=100)))
+    monkeypatch.setattr(matching, "_request_embeddings", fake_request)
+
+    first = matching.get_embeddings(["alpha", "beta", "alpha"])
+    second = matching.get_embeddings(["beta", "gamma"])
+
+    assert requests == [["alpha", "beta"], ["gamma"]]
+    assert first.shape == (3, 2)
+    assert np.allclose(first[0], first[2])
+    assert np.allclose(second[0], first[1])
+
+def test_get_embeddings_rejects_empty_text():
+    """Test that empty inputs are rejected before touching the cache."""
+    with pytest.raises(ValueError):
+        matching.get_embeddings(["valid", "  "])
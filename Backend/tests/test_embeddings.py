@@ -0,0 +1,142 @@
+import asyncio
+import json
+import httpx
+import numpy as np
+import pytest
+from app import embeddings, matching
+from app.cache import TTLCache
+from app.embedding_cache import EmbeddingCache
+
+def _handler(request):
+    texts = json.loads(request.content)["inputs"]
+    return httpx.Response(200, json=[[float(len(t)), 0.5] for t in texts])
+
+def _client_with_transport(calls):
+    def handler(request):
+        calls.append(request)
+        return _handler(request)
+
+    client = embeddings.HFEmbeddingClient(api_url="https://hf.test/model", api_key="test-key")
+    client._client = httpx.Client(transport=httpx.MockTransport(handler), headers={"Authorization": "Bearer test-key"})
+    client._async_client = httpx.AsyncClient(transport=httpx.MockTransport(handler), headers={"Authorization": "Bearer test-key"})
+    return client
+
+def test_embed_reuses_the_pooled_client():
+    """Test that consecutive calls go through the same long-lived httpx client."""
+    calls = []
+    client = _client_with_transport(calls)
+    pooled = client.client
+
+    first = client.embed(["a", "bbb"])
+    second = client.embed(["cc"])
+
+    assert client.client is pooled
+    assert len(calls) == 2
+    assert first.shape == (2, 2) and second.shape == (1, 2)
+    assert calls[0].headers["Authorization"] == "Bearer test-key"
+    client.close()
+
+def test_embed_wraps_http_errors():
+    """Test that HTTP failures surface as RuntimeError like the previous per-call client."""
+    client = embeddings.HFEmbeddingClient(api_url="https://hf.test/model", api_key="test-key")
+    client._client = httpx.Client(transport=httpx.MockTransport(lambda r: httpx.Response(503, json={"error": "loading"})))
+
+    with pytest.raises(RuntimeError):
+        client.embed(["a"])
+
+def test_missing_api_key_raises_value_error():
+    """Test that the client refuses to start without an API key."""
+    client = embeddings.HFEmbeddingClient(api_url="https://hf.test/model", api_key=None)
+    with pytest.raises(ValueError):
+        client.embed(["a"])
+
+def test_aget_embeddings_uses_async_client_and_cache(monkeypatch):
+    """Test the async embedding API end to end against a mocked transport."""
+    calls = []
+    client = _client_with_transport(calls)
+    monkeypatch.setattr(matching, "get_embedding_client", lambda: client)
+    monkeypatch.setattr(matching, "embedding_cache", EmbeddingCache(TTLCache(maxsize=100)))
+
+    async def run():
+        first = await matching.aget_embeddings(["x", "yy"])
+        second = await matching.aget_embeddings(["yy"])
+        await client.aclose()
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert np.allclose(first[1], second[0])
+
+def test_shutdown_closes_the_shared_client(monkeypatch):
+    """Test that the FastAPI shutdown hook drops the shared client."""
+    client = _client_with_transport([])
+    monkeypatch.setattr(embeddings, "embedding_client", client)
+
+    asyncio.run(embeddings.shutdown())
+
+    assert embeddings.embedding_client is None
+    assert client._client is None and client._async_client is None
+
+class _FakeEncoding:
+    def __init__(self, length, max_length):
+        self.ids = list(range(1, length + 1)) + [0] * (max_length - length)
+        self.attention_mask = [1] * length + [0] * (max_length - length)
+        self.type_ids = [0] * max_length
+
+class _FakeTokenizer:
+    def encode_batch(self, texts):
+        max_length = max(len(t) for t in texts)
+        return [_FakeEncoding(len(t), max_length) for t in texts]
+
+class _FakeInput:
+    def __init__(self, name):
+        self.name = name
+
+class _FakeSession:
+    def __init__(self):
+        self.batch_sizes = []
+
+    def get_inputs(self):
+        return [_FakeInput("input_ids"), _FakeInput("attention_mask"), _FakeInput("token_type_ids")]
+
+    def run(self, outputs, feeds):
+        ids = feeds["input_ids"]
+        self.batch_sizes.append(ids.shape[0])
+        # Hidden state whose CLS row encodes the sequence length
+        hidden = np.zeros(ids.shape + (3,), dtype=np.float32)
+        hidden[:, 0, 0] = feeds["attention_mask"].sum(axis=1)
+        hidden[:, 0, 1] = 1.0
+        return [hidden]
+
+def test_local_backend_batches_and_normalizes():
+    """Test that the local backend splits inputs into batches and returns unit CLS vectors."""
+    backend = embeddings.LocalEmbeddingBackend(model_dir="/unused", batch_size=2, pooling="cls")
+    backend._tokenizer = _FakeTokenizer()
+    backend._session = _FakeSession()
+
+    vectors = backend.embed(["a", "bb", "ccc"])
+
+    assert backend._session.batch_sizes == [2, 1]
+    assert vectors.shape == (3, 3)
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+    assert vectors[2, 0] > vectors[0, 0]
+
+def test_local_backend_async_matches_sync():
+    """Test that the async path runs the same inference off the event loop."""
+    backend = embeddings.LocalEmbeddingBackend(model_dir="/unused", batch_size=8)
+    backend._tokenizer = _FakeTokenizer()
+    backend._session = _FakeSession()
+
+    assert np.allclose(asyncio.run(backend.aembed(["hello"])), backend.embed(["hello"]))
+
+def test_backend_selection(monkeypatch):
+    """Test that EMBEDDING_BACKEND picks the backend behind get_embeddings."""
+    monkeypatch.setattr(embeddings, "embedding_client", None)
+    monkeypatch.setattr(embeddings, "EMBEDDING_BACKEND", "local")
+    assert isinstance(embeddings.get_embedding_client(), embeddings.LocalEmbeddingBackend)
+
+    monkeypatch.setattr(embeddings, "embedding_client", None)
+    monkeypatch.setattr(embeddings, "EMBEDDING_BACKEND", "bogus")
+    with pytest.raises(ValueError):
+        embeddings.get_embedding_client()
@@ -0,0 +1,90 @@
+import asyncio
+import json
+from app.jobs import JobStore, JobRunner
+
+def test_job_store_tracks_items_and_progress(tmp_path):
+    """Test queueing, claiming and recording item outcomes."""
+    store = JobStore(str(tmp_path / "jobs.db"))
+    job_id = store.create("match", "user-1", {"jd_json": {}}, [b"a", b"b", b"c"])
+
+    job = store.claim_next()
+    assert job["id"] == job_id and job["status"] == "running"
+    assert store.claim_next() is None
+
+    store.complete_item(job_id, 0, {"score": 1})
+    store.complete_item(job_id, 2, error="boom")
+
+    job = store.get(job_id)
+    assert (job["total"], job["completed"], job["failed"]) == (3, 1, 1)
+    assert store.pending_items(job_id) == [(1, b"b")]
+    assert [item["status"] for item in store.item_results(job_id)] == ["done", "failed"]
+
+def test_interrupted_job_resumes_from_pending_items(tmp_path):
+    """Test that a job left running by a restart is requeued and only its unfinished items are processed again."""
+    path = str(tmp_path / "jobs.db")
+    store = JobStore(path)
+    job_id = store.create("double", "user-1", {}, [b"1", b"2", b"3"])
+    store.claim_next()
+    store.complete_item(job_id, 0, 2)
+    store.close()
+
+    # New process: reopen the store, requeue and run
+    store = JobStore(path)
+    processed = []
+
+    async def double(job, store):
+        for position, data in store.pending_items(job["id"]):
+            processed.append(position)
+            store.complete_item(job["id"], position, int(data) * 2)
+        return [item["result"] for item in store.item_results(job["id"])]
+
+    runner = JobRunner(workers=1)
+    runner.register("double", double)
+
+    async def run():
+        assert store.requeue_running() == 1
+        await runner.run_job(store.claim_next(), store)
+
+    asyncio.run(run())
+
+    job = store.get(job_id)
+    assert processed == [1, 2]
+    assert job["status"] == "completed"
+    assert job["output"] == [2, 4, 6]
+
+def test_failing_handler_marks_job_failed(tmp_path):
+    """Test that a handler error fails the job and records the error."""
+    store = JobStore(str(tmp_path / "jobs.db"))
+    job_id = store.create("broken", None, {}, [b"x"])
+
+    async def broken(job, store):
+        raise RuntimeError("no supabase")
+
+    runner = JobRunner(workers=1)
+    runner.register("broken", broken)
+    asyncio.run(runner.run_job(store.claim_next(), store))
+
+    job = store.get(job_id)
+    assert job["status"] == "failed" and job["error"] == "no supabase"
+
+def test_workers_pick_up_submitted_jobs(tmp_path):
+    """Test that started workers claim and complete queued jobs."""
+    store = JobStore(str(tmp_path / "jobs.db"))
+    job_id = store.create("echo", None, {"value": 42}, [])
+
+    async def echo(job, store):
+        return job["payload"]["value"]
+
+    async def run():
+        runner = JobRunner(workers=2, poll_interval=0.01)
+        runner.register("echo", echo)
+        await runner.start(store)
+        runner.notify()
+        for _ in range(200):
+            if store.get(job_id)["status"] == "completed":
+                break
+            await asyncio.sleep(0.01)
+        await runner.stop()
+
+    asyncio.run(run())
+    assert store.get(job_id)["output"] == 42
@@ -1,9 +1,19 @@
+import asyncio
+import groq
+import httpx
 import pytest
 from unittest.mock import patch, MagicMock
 from app import llm
 from app.schemas import JDModel, CVModel, LocationModel, CompanyProfile, Qualifications, CompensationBenefits, ApplicationInfo, Experience, Education, Skill, JobStability, EducationGap, KeywordAnalysis, Analytics
 import json
 
+@pytest.fixture(autouse=True)
+def empty_llm_cache():
+    """Each test starts without cached extraction results."""
+    llm.llm_cache.clear()
+    yield
+    llm.llm_cache.clear()
+
 # Mock data for testing
 MOCK_JD_TEXT = """
 Job Title: Senior Python Developer
@@ -480,4 +490,123 @@ def test_generate_interview_questions_api_error(mock_get_client):
     
     # Test the function
     with pytest.raises(llm.LLMJsonError):
-        llm.generate_interview_questions(jd, cv)
\ No newline at end of file
+        llm.generate_interview_questions(jd, cv)
+
+def _rate_limit_error():
+    response = httpx.Response(429, headers={"retry-after": "0"}, request=httpx.Request("POST", "https://api.groq.test"))
+    return groq.RateLimitError("Rate limit reached", response=response, body=None)
+
+def _async_client(*outcomes):
+    """Async Groq client mock whose successive create() calls raise or return `outcomes`."""
+    calls = []
+
+    async def create(**request):
+        calls.append(request)
+        outcome = outcomes[len(calls) - 1]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    client = MagicMock()
+    client.chat.completions.create = create
+    return client, calls
+
+def _response(content):
+    response = MagicMock()
+    response.choices = [MagicMock(message=MagicMock(content=content))]
+    return response
+
+def test_aconvert_resume_to_json_retries_rate_limits(monkeypatch, unthrottled_llm_gateway):
+    """Test that rate-limited resume extraction is retried and then succeeds."""
+    client, calls = _async_client(_rate_limit_error(), _rate_limit_error(), _response(json.dumps({"Personal Data": {}})))
+    monkeypatch.setattr(llm, "get_async_groq_client", lambda: client)
+
+    result = asyncio.run(llm.aconvert_resume_to_json("resume"))
+
+    assert result["Personal Data"] == {}
+    assert len(calls) == 3
+    assert unthrottled_llm_gateway.stats["rate_limited"] == 2
+
+def test_aconvert_resume_to_json_does_not_retry_other_errors(monkeypatch):
+    """Test that non rate-limit failures surface immediately as LLMJsonError."""
+    client, calls = _async_client(_response("Invalid JSON"))
+    monkeypatch.setattr(llm, "get_async_groq_client", lambda: client)
+
+    with pytest.raises(llm.LLMJsonError):
+        asyncio.run(llm.aconvert_resume_to_json("resume"))
+    assert len(calls) == 1
+
+def test_concurrent_interview_question_requests_share_one_call(monkeypatch, unthrottled_llm_gateway):
+    """Test that a second request for a pair still being generated waits for that call instead of repeating it."""
+    from tests.test_matching import _sample_jd, _sample_cv
+    client, calls = _async_client(_response('["Why this role?"]'))
+    monkeypatch.setattr(llm, "get_async_groq_client", lambda: client)
+    jd, cv = _sample_jd(), _sample_cv()
+
+    async def run():
+        return await asyncio.gather(llm.agenerate_interview_questions(jd, cv), llm.agenerate_interview_questions(jd, cv))
+
+    assert asyncio.run(run()) == [["Why this role?"], ["Why this role?"]]
+    assert len(calls) == 1
+    assert not llm._questions_in_flight
+
+def _mock_client(payload, total_tokens=1200):
+    mock_client = MagicMock()
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock(message=MagicMock(content=json.dumps(payload)))]
+    mock_response.usage.total_tokens = total_tokens
+    mock_client.chat.completions.create.return_value = mock_response
+    return mock_client
+
+@patch('app.llm.get_groq_client')
+def test_convert_resume_to_json_reuses_cached_result(mock_get_client):
+    """Test that re-uploading the same resume skips the Groq call and counts the saved tokens."""
+    mock_client = _mock_client(MOCK_RESUME_JSON)
+    mock_get_client.return_value = mock_client
+    skill_categories = {"critical": ["Python"], "important": [], "extra": []}
+
+    first = llm.convert_resume_to_json(MOCK_RESUME_TEXT, skill_categories)
+    first["Personal Data"]["firstName"] = "Changed"
+    # Whitespace differences and key order do not change the cache key
+    second = llm.convert_resume_to_json("  " + MOCK_RESUME_TEXT.replace("\n", "\n\n"), dict(reversed(skill_categories.items())))
+
+    assert mock_client.chat.completions.create.call_count == 1
+    assert second["Personal Data"]["firstName"] == "John"
+    stats = llm.llm_cache.stats()
+    assert stats["memory"]["hits"] == 1
+    assert stats["saved_tokens"] == 1200
+
+@patch('app.llm.get_groq_client')
+def test_convert_resume_to_json_cache_is_keyed_by_skill_categories(mock_get_client):
+    """Test that the same resume screened against different skill categories is extracted again."""
+    mock_client = _mock_client(MOCK_RESUME_JSON)
+    mock_get_client.return_value = mock_client
+
+    llm.convert_resume_to_json(MOCK_RESUME_TEXT, {"critical": ["Python"]})
+    llm.convert_resume_to_json(MOCK_RESUME_TEXT, {"critical": ["Java"]})
+    llm.convert_resume_to_json(MOCK_RESUME_TEXT)
+
+    assert mock_client.chat.completions.create.call_count == 3
+
+@patch('app.llm.get_groq_client')
+def test_convert_jd_to_json_reuses_cached_result(mock_get_client):
+    """Test that the same JD text is only sent to Groq once."""
+    mock_client = _mock_client(MOCK_JD_JSON)
+    mock_get_client.return_value = mock_client
+
+    assert llm.convert_jd_to_json(MOCK_JD_TEXT) == llm.convert_jd_to_json(MOCK_JD_TEXT)
+    assert mock_client.chat.completions.create.call_count == 1
+
+@patch('app.llm.get_groq_client')
+def test_failed_extraction_is_not_cached(mock_get_client):
+    """Test that an unparseable response is retried on the next call."""
+    mock_client = MagicMock()
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock(message=MagicMock(content="Invalid JSON"))]
+    mock_client.chat.completions.create.return_value = mock_response
+    mock_get_client.return_value = mock_client
+
+    with pytest.raises(llm.LLMJsonError):
+        llm.convert_jd_to_json(MOCK_JD_TEXT)
+    mock_get_client.return_value = _mock_client(MOCK_JD_JSON)
+    assert llm.convert_jd_to_json(MOCK_JD_TEXT)["jobTitle"] == "Senior Python Developer"
@@ -0,0 +1,26 @@
+from app.cache import TTLCache, SQLiteCache
+from app.llm_cache import LLMResultCache, extraction_key
+
+def test_extraction_key_separates_model_prompt_version_and_kind():
+    """Test that every component of the key produces a distinct entry."""
+    base = extraction_key("resume", "model-a", 1, "text", {"critical": ["Python"]})
+    assert base == extraction_key("resume", "model-a", 1, " text ", {"critical": ["Python"]})
+    assert base != extraction_key("jd", "model-a", 1, "text", {"critical": ["Python"]})
+    assert base != extraction_key("resume", "model-b", 1, "text", {"critical": ["Python"]})
+    assert base != extraction_key("resume", "model-a", 2, "text", {"critical": ["Python"]})
+    assert base != extraction_key("resume", "model-a", 1, "text")
+
+def test_llm_cache_disk_tier_survives_restart(tmp_path):
+    """Test that results persisted to SQLite are served and promoted after a restart."""
+    path = str(tmp_path / "llm.db")
+    cache = LLMResultCache(TTLCache(maxsize=10), SQLiteCache(path, table="llm_results"))
+    cache.set("key", {"jobTitle": "Engineer"}, tokens=800)
+
+    restarted = LLMResultCache(TTLCache(maxsize=10), SQLiteCache(path, table="llm_results"))
+    assert restarted.get("key") == {"jobTitle": "Engineer"}
+    assert "key" in restarted.memory
+    assert restarted.get("missing") is None
+
+    stats = restarted.stats()
+    assert stats["disk"]["hits"] == 1
+    assert stats["saved_tokens"] == 800
@@ -0,0 +1,216 @@
+import asyncio
+import time
+from types import SimpleNamespace
+import groq
+import httpx
+import pytest
+from unittest.mock import MagicMock
+from app import llm_gateway
+from app.llm_gateway import LLMGateway, TokenBucket
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+def _error(cls, status, retry_after=None):
+    headers = {"retry-after": retry_after} if retry_after is not None else {}
+    response = httpx.Response(status, headers=headers, request=httpx.Request("POST", "https://api.groq.test"))
+    return cls("failed", response=response, body=None)
+
+def _sync_client(*outcomes):
+    calls = []
+
+    def create(**request):
+        calls.append(request)
+        outcome = outcomes[len(calls) - 1]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    client = MagicMock()
+    client.chat.completions.create = create
+    return client, calls
+
+def _request(max_tokens=100):
+    return {"model": "m", "messages": [{"role": "user", "content": "x" * 400}], "max_tokens": max_tokens}
+
+def test_token_bucket_paces_reservations():
+    """Test that reservations beyond the burst capacity wait for the refill, in order."""
+    clock = FakeClock()
+    bucket = TokenBucket(60, capacity=2, timer=clock)  # one token per second
+
+    assert [bucket.reserve(1) for _ in range(4)] == [0.0, 0.0, 1.0, 2.0]
+    clock.now = 2.0
+    assert bucket.reserve(1) == 1.0
+    bucket.refund(1)
+    assert bucket.reserve(1) == 1.0
+
+def test_disabled_bucket_never_waits():
+    """Test that a zero rate turns the limit off."""
+    bucket = TokenBucket(0)
+    assert bucket.reserve(10 ** 6) == 0.0
+
+def test_gateway_paces_calls_to_the_token_quota(monkeypatch):
+    """Test that the estimated tokens of each call are drawn from the per-minute token quota."""
+    clock = FakeClock()
+    monkeypatch.setattr(llm_gateway, "time", SimpleNamespace(monotonic=clock, sleep=clock.sleep))
+    client, calls = _sync_client(*[SimpleNamespace(usage=None)] * 3)
+    gateway = LLMGateway(lambda: client, None, requests_per_minute=0, tokens_per_minute=0)
+    gateway.tokens = TokenBucket(600, timer=clock)  # 10 tokens per second, 600 burst
+
+    for _ in range(3):
+        gateway.complete_sync(**_request(max_tokens=200))  # ~300 estimated tokens each
+
+    assert len(calls) == 3
+    assert clock.sleeps == [pytest.approx(30.0)]
+
+def test_gateway_refunds_unused_tokens(monkeypatch):
+    """Test that the actual usage reported by Groq replaces the up-front estimate."""
+    client, _ = _sync_client(SimpleNamespace(usage=SimpleNamespace(total_tokens=50)))
+    gateway = LLMGateway(lambda: client, None, requests_per_minute=0, tokens_per_minute=600)
+
+    gateway.complete_sync(**_request(max_tokens=200))
+
+    assert gateway.tokens.reserve(550) == 0.0
+
+def test_gateway_retries_server_errors_and_honors_retry_after(monkeypatch):
+    """Test that 5xx and 429 responses are retried, waiting as long as retry-after asks."""
+    clock = FakeClock()
+    monkeypatch.setattr(llm_gateway, "time", SimpleNamespace(monotonic=clock, sleep=clock.sleep))
+    ok = SimpleNamespace(usage=None)
+    client, calls = _sync_client(_error(groq.InternalServerError, 503), _error(groq.RateLimitError, 429, "7"), ok)
+    gateway = LLMGateway(lambda: client, None, requests_per_minute=0, tokens_per_minute=0, backoff=1.0)
+
+    assert gateway.complete_sync(**_request()) is ok
+    assert len(calls) == 3
+    assert 0.5 <= clock.sleeps[0] <= 1.5  # jittered backoff, no retry-after
+    assert clock.sleeps[1] == 7.0
+    assert gateway.stats == {"calls": 3, "retries": 2, "rate_limited": 1, "failures": 0}
+
+def test_gateway_does_not_retry_client_errors():
+    """Test that a 400 is raised on the first attempt."""
+    client, calls = _sync_client(_error(groq.BadRequestError, 400))
+    gateway = LLMGateway(lambda: client, None, requests_per_minute=0, tokens_per_minute=0)
+
+    with pytest.raises(groq.BadRequestError):
+        gateway.complete_sync(**_request())
+    assert len(calls) == 1
+    assert gateway.stats["failures"] == 1
+
+def test_rate_limit_pauses_other_callers(monkeypatch):
+    """Test that a 429 seen by one caller delays the next call of every caller."""
+    client, _ = _sync_client(_error(groq.RateLimitError, 429, "5"))
+    gateway = LLMGateway(lambda: client, None, requests_per_minute=0, tokens_per_minute=0, max_retries=0)
+
+    with pytest.raises(groq.RateLimitError):
+        gateway.complete_sync(**_request())
+    # max_retries=0 raises without pausing; a retried 429 sets the shared pause
+    assert gateway.paused_until == 0.0
+    gateway.max_retries = 1
+    clock = FakeClock()
+    monkeypatch.setattr(llm_gateway, "time", SimpleNamespace(monotonic=clock, sleep=clock.sleep))
+    client.chat.completions.create = MagicMock(side_effect=[_error(groq.RateLimitError, 429, "5"), SimpleNamespace(usage=None)])
+    gateway.complete_sync(**_request())
+    assert gateway.paused_until == 5.0 and clock.sleeps == [5.0]
+    # A caller starting one second into the pause waits out the rest of it
+    clock.now = 1.0
+    _, delay = gateway._reserve(_request())
+    assert delay == 4.0
+
+def test_callers_already_waiting_honor_a_pause_set_while_they_sleep(monkeypatch):
+    """Test that a 429 arriving while a caller sleeps off its reservation delays that caller too."""
+    clock = FakeClock()
+
+    def sleep(seconds):
+        clock.sleep(seconds)
+        if len(clock.sleeps) == 1:
+            # Another caller hits a 429 during the first sleep
+            gateway.paused_until = clock.now + 3.0
+
+    monkeypatch.setattr(llm_gateway, "time", SimpleNamespace(monotonic=clock, sleep=sleep))
+    client, calls = _sync_client(SimpleNamespace(usage=None), SimpleNamespace(usage=None))
+    gateway = LLMGateway(lambda: client, None, requests_per_minute=0, tokens_per_minute=0)
+    gateway.requests = TokenBucket(60, capacity=1, timer=clock)
+    gateway.complete_sync(**_request())
+
+    gateway.complete_sync(**_request())
+
+    assert clock.sleeps == [1.0, 3.0] and len(calls) == 2
+
+def test_async_calls_share_a_global_concurrency_cap():
+    """Test that concurrent async calls never exceed the gateway's in-flight limit."""
+    in_flight = {"now": 0, "peak": 0}
+
+    async def create(**request):
+        in_flight["now"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        await asyncio.sleep(0.02)
+        in_flight["now"] -= 1
+        return SimpleNamespace(usage=None)
+
+    client = MagicMock()
+    client.chat.completions.create = create
+    gateway = LLMGateway(None, lambda: client, requests_per_minute=0, tokens_per_minute=0, max_concurrency=2)
+
+    async def run():
+        await asyncio.gather(*(gateway.complete(**_request()) for _ in range(6)))
+
+    asyncio.run(run())
+    assert in_flight["peak"] == 2
+    assert gateway.metrics()["in_flight"] == 0
+
+def test_slots_are_handed_to_waiters_in_arrival_order():
+    """Test that a released slot goes to the longest waiting caller, thread or coroutine, without polling."""
+    limit = llm_gateway.ConcurrencyLimit(1)
+    order = []
+
+    async def run():
+        limit.acquire()
+        waiting = [asyncio.create_task(limit.aacquire())]
+        await asyncio.sleep(0)
+        thread = asyncio.create_task(asyncio.to_thread(limit.acquire))
+        while len(limit._waiters) < 2:
+            await asyncio.sleep(0.001)
+        waiting.append(asyncio.create_task(limit.aacquire()))
+        await asyncio.sleep(0)
+        assert not limit.try_acquire()
+
+        limit.release()
+        await waiting[0]
+        order.append("first coroutine")
+        limit.release()
+        await thread
+        order.append("thread")
+        limit.release()
+        await waiting[1]
+        order.append("second coroutine")
+        limit.release()
+
+    asyncio.run(run())
+    assert order == ["first coroutine", "thread", "second coroutine"]
+    assert limit.in_flight == 0
+
+def test_a_cancelled_waiter_passes_its_slot_on():
+    """Test that cancelling a coroutine waiting for a slot neither leaks the slot nor blocks the queue."""
+    limit = llm_gateway.ConcurrencyLimit(1)
+
+    async def run():
+        limit.acquire()
+        cancelled = asyncio.create_task(limit.aacquire())
+        waiting = asyncio.create_task(limit.aacquire())
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        limit.release()
+        await asyncio.wait_for(waiting, 1)
+        limit.release()
+
+    asyncio.run(run())
+    assert limit.in_flight == 0 and not limit._waiters
@@ -1,6 +1,13 @@
+import json
+import asyncio
+import time
+import threading
+from types import SimpleNamespace
+import numpy as np
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
+from app.llm import agenerate_interview_questions
 
 client = TestClient(app)
 
@@ -12,4 +19,476 @@ def test_read_main():
 def test_token_endpoint():
     """Test that the token endpoint returns a 401 for invalid credentials"""
     response = client.post("/token", data={"username": "test", "password": "test"})
-    assert response.status_code == 401
\ No newline at end of file
+    assert response.status_code == 401
+
+MATCH_TITLES = ["Backend Developer", "Data Engineer", "Software Engineer", "Designer", "QA Engineer", "Accountant"]
+
+@pytest.fixture
+def match_env(monkeypatch, tmp_path):
+    """Run /match offline: fake embeddings, Groq and Supabase, and record how many CVs are in flight."""
+    from app import main, matching, auth, schemas, llm, vector_index
+    from app.cache import TTLCache
+    from app.database import get_supabase
+    from app.embedding_cache import EmbeddingCache
+    from tests.test_matching import _fake_vector, _sample_jd, _sample_cv
+
+    lock = threading.Lock()
+    in_flight = {"now": 0, "peak": 0}
+    questions_for = []
+
+    writes = {"candidates": [], "analysis_results": []}
+    evaluate_cv = main._evaluate_cv
+
+    def tracked_evaluate(*args, **kwargs):
+        with lock:
+            in_flight["now"] += 1
+            in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        time.sleep(0.05)
+        try:
+            return evaluate_cv(*args, **kwargs)
+        finally:
+            with lock:
+                in_flight["now"] -= 1
+
+    def fake_upsert_candidates(supabase, candidates):
+        writes["candidates"].append(candidates)
+        return [SimpleNamespace(id=i + 1) for i in range(len(candidates))]
+
+    def fake_analysis_results(supabase, results):
+        writes["analysis_results"].append(results)
+        return [SimpleNamespace(id=i + 1) for i in range(len(results))]
+
+    async def fake_questions(jd, cv):
+        questions_for.append(cv.Analytics.suggested_role)
+        return ["Tell us about your last project."]
+
+    async def fake_arequest(texts):
+        return np.array([_fake_vector(t) for t in texts])
+
+    monkeypatch.setattr(main, "MATCH_CONCURRENCY", 3)
+    monkeypatch.setattr(llm, "agenerate_interview_questions", fake_questions)
+    monkeypatch.setattr(main.crud, "get_or_create_job_description", lambda supabase, jd: SimpleNamespace(id=7))
+    monkeypatch.setattr(main, "_evaluate_cv", tracked_evaluate)
+    monkeypatch.setattr(main.crud, "upsert_candidates", fake_upsert_candidates)
+    monkeypatch.setattr(main.crud, "create_analysis_results", fake_analysis_results)
+    monkeypatch.setattr(matching, "embedding_cache", EmbeddingCache(TTLCache(maxsize=0)))
+    monkeypatch.setattr(matching, "jd_profile_cache", TTLCache(maxsize=0))
+    monkeypatch.setattr(matching, "_request_embeddings", lambda texts: np.array([_fake_vector(t) for t in texts]))
+    monkeypatch.setattr(matching, "_arequest_embeddings", fake_arequest)
+    monkeypatch.setattr(vector_index, "candidate_index", vector_index.IndexStore(str(tmp_path / "candidate_index.npz"), save_delay=0))
+    monkeypatch.setattr(vector_index, "jd_index", vector_index.IndexStore(str(tmp_path / "jd_index.npz"), save_delay=0))
+    app.dependency_overrides[get_supabase] = lambda: None
+    app.dependency_overrides[auth.get_current_user] = lambda: schemas.User(id="user-1", username="rec", email="rec@example.com", role="recruiter")
+
+    cvs = [{"cv_json": json.loads(_sample_cv(t, f"c{i}@example.com").json(by_alias=True)), "skill_presence": {}} for i, t in enumerate(MATCH_TITLES)]
+    yield SimpleNamespace(in_flight=in_flight, questions_for=questions_for, writes=writes, payload={"jd_json": json.loads(_sample_jd().json()), "cvs": cvs})
+    app.dependency_overrides.clear()
+
+def test_match_scores_cvs_concurrently_with_a_bounded_pool(match_env):
+    """Test that /match scores CVs in parallel, never above MATCH_CONCURRENCY, and returns them sorted."""
+    response = client.post("/match", json=match_env.payload)
+
+    assert response.status_code == 200
+    scores = [r["match_score"] for r in response.json()["results"]]
+    assert len(scores) == len(MATCH_TITLES)
+    assert scores == sorted(scores, reverse=True)
+    assert 1 < match_env.in_flight["peak"] <= 3
+
+def test_match_saves_the_batch_in_two_requests(match_env):
+    """Test that /match upserts all candidates in one call and inserts all analysis results in another."""
+    response = client.post("/match", json=match_env.payload)
+
+    assert response.status_code == 200
+    assert [len(batch) for batch in match_env.writes["candidates"]] == [len(MATCH_TITLES)]
+    (results,) = match_env.writes["analysis_results"]
+    assert sorted(r["candidate_db_id"] for r in results) == list(range(1, len(MATCH_TITLES) + 1))
+    assert all(r["jd_db_id"] == 7 and r["user_id"] == "user-1" for r in results)
+    assert response.json()["matching_metadata"]["results_not_saved"] == 0
+
+def test_match_reports_results_that_could_not_be_saved(match_env, monkeypatch):
+    """Test that /match still answers but reports results whose candidate or analysis row was not saved."""
+    from app import main
+
+    monkeypatch.setattr(main.crud, "upsert_candidates", lambda supabase, candidates: [None] + [SimpleNamespace(id=i) for i in range(1, len(candidates))])
+    monkeypatch.setattr(main.crud, "create_analysis_results", lambda supabase, results: [None] + [SimpleNamespace(id=1)] * (len(results) - 1))
+
+    response = client.post("/match", json=match_env.payload)
+
+    assert response.status_code == 200
+    assert len(response.json()["results"]) == len(MATCH_TITLES)
+    assert response.json()["matching_metadata"]["results_not_saved"] == 2
+
+def test_match_stream_emits_results_then_metadata(match_env, monkeypatch):
+    """Test that /match/stream sends one NDJSON frame per CV, an error frame for a failing CV, and metadata last."""
+    from app import main
+
+    evaluate_cv = main._evaluate_cv
+
+    def failing_evaluate(cv_obj, *args, **kwargs):
+        if cv_obj.Analytics.suggested_role == "Designer":
+            raise RuntimeError("Scoring failed")
+        return evaluate_cv(cv_obj, *args, **kwargs)
+
+    monkeypatch.setattr(main, "_evaluate_cv", failing_evaluate)
+    response = client.post("/match/stream", json=match_env.payload)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    frames = [json.loads(line) for line in response.text.splitlines()]
+    types = [frame["type"] for frame in frames]
+    assert types.count("result") == len(MATCH_TITLES) - 1
+    assert types.count("error") == 1
+    assert types[-1] == "metadata"
+    assert frames[-1]["data"]["candidates_evaluated"] == len(MATCH_TITLES) - 1
+
+def test_match_stream_supports_server_sent_events(match_env):
+    """Test the SSE framing of /match/stream."""
+    response = client.post("/match/stream?format=sse", json=match_env.payload)
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block for block in response.text.split("\n\n") if block]
+    assert [e.splitlines()[0] for e in events] == ["event: result"] * len(MATCH_TITLES) + ["event: metadata"]
+
+def test_extract_resumes_isolates_per_file_failures(monkeypatch):
+    """Test that /extract_resumes processes uploads in parallel, keeps their order and skips failed ones."""
+    from app import auth, llm, schemas
+
+    async def fake_convert(resume_text, jd_skill_categories=None):
+        if "broken" in resume_text:
+            raise llm.LLMJsonError("Could not parse the response from the AI service as JSON.")
+        return {
+            "Personal Data": {"firstName": resume_text.split()[0], "location": {}},
+            "Analytics": {"job_stability": {}, "education_gap": {}, "keyword_analysis": {}, "suggested_role": "Engineer"},
+            "skill_presence": {"Python": True}
+        }
+
+    monkeypatch.setattr(llm, "aconvert_resume_to_json", fake_convert)
+    app.dependency_overrides[auth.get_current_user] = lambda: schemas.User(id="user-1", username="rec", email="rec@example.com", role="recruiter")
+    files = [
+        ("resume_files", ("cv.txt", b"Alice resume", "text/plain")),
+        ("resume_files", ("cv.txt", b"broken resume", "text/plain")),
+        ("resume_files", ("other.txt", b"Bob resume", "text/plain")),
+    ]
+    jd_json = json.dumps({"requiredSkills": {"critical": ["Python", "SQL"]}})
+    try:
+        response = client.post("/extract_resumes", files=files, data={"jd_json": jd_json})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    results = response.json()
+    assert [r["cv_json"]["Personal Data"]["firstName"] for r in results] == ["Alice", "Bob"]
+    assert results[0]["skill_presence"] == {"Python": True, "SQL": False}
+
+def test_match_job_runs_in_background_and_is_pollable(match_env, monkeypatch, tmp_path):
+    """Test submitting a match job, running it on a worker and polling its final output."""
+    from app import jobs, main
+
+    store = jobs.JobStore(str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(jobs, "_job_store", store)
+    monkeypatch.setattr(main, "get_supabase", lambda: None)
+
+    submitted = client.post("/jobs/match", json=match_env.payload)
+    assert submitted.status_code == 202
+    job_id = submitted.json()["job_id"]
+    assert client.get(f"/jobs/{job_id}").json()["status"] == "queued"
+
+    asyncio.run(jobs.job_runner.run_job(store.claim_next(), store))
+
+    job = client.get(f"/jobs/{job_id}").json()
+    assert job["status"] == "completed"
+    assert job["completed"] == len(MATCH_TITLES) and len(job["results"]) == len(MATCH_TITLES)
+    scores = [r["match_score"] for r in job["output"]["results"]]
+    assert scores == sorted(scores, reverse=True)
+    assert job["output"]["matching_metadata"]["candidates_evaluated"] == len(MATCH_TITLES)
+    assert client.get("/jobs/unknown").status_code == 404
+
+def test_match_fills_in_skill_presence_for_categorized_jd(match_env):
+    """Test that CVs sent without skill_presence are checked against the JD's categorized skills."""
+    payload = match_env.payload
+    payload["jd_json"]["requiredSkills"] = {"critical": ["Python"], "important": ["docker"], "extra": []}
+    payload["cvs"][0]["skill_presence"] = {"Python": False}
+
+    response = client.post("/match", json=payload)
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert sorted(r["skill_presence"]["Python"] for r in results) == [False] + [True] * (len(MATCH_TITLES) - 1)
+    assert all(r["skill_presence"]["docker"] for r in results)
+    assert sorted(r["critical_skill_status"] for r in results) == ["All Absent"] + ["All Present"] * (len(MATCH_TITLES) - 1)
+
+def test_match_defers_interview_questions_to_top_candidates(match_env, monkeypatch):
+    """Test that scoring makes no question calls or cache lookups and only the top-K candidates get questions pre-generated."""
+    from app import main, llm
+
+    lookups = []
+    monkeypatch.setattr(llm, "cached_interview_questions", lambda jd, cv: lookups.append(cv.Analytics.suggested_role))
+    monkeypatch.setattr(main, "INTERVIEW_QUESTIONS_TOP_K", 2)
+    response = client.post("/match", json=match_env.payload)
+
+    results = response.json()["results"]
+    assert all(r["interview_questions"] == [] for r in results)
+    assert lookups == [r["suggested_role"] for r in results[:2]]
+    assert sorted(match_env.questions_for) == sorted(r["suggested_role"] for r in results[:2])
+
+def test_match_two_stage_fully_scores_only_finalists(match_env, monkeypatch):
+    """Test that two-stage ranking saves and fully scores only the prefilter top-K, returning the rest after them."""
+    response = client.post("/match?ranking=two_stage&top_k=2", json=match_env.payload)
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert len(results) == len(MATCH_TITLES)
+    assert [r["scoring_stage"] for r in results] == ["full"] * 2 + ["prefilter"] * (len(MATCH_TITLES) - 2)
+    assert [len(batch) for batch in match_env.writes["analysis_results"]] == [2]
+    prefiltered = [r["match_score"] for r in results[2:]]
+    assert prefiltered == sorted(prefiltered, reverse=True)
+    metadata = response.json()["matching_metadata"]
+    full = [r["match_score"] for r in results[:2]]
+    assert (metadata["candidates_evaluated"], metadata["candidates_prefiltered"]) == (len(MATCH_TITLES), len(MATCH_TITLES) - 2)
+    assert metadata["top_match_score"] == max(full) and metadata["average_match_score"] == round(sum(full) / 2, 2)
+    assert sorted(match_env.questions_for) == sorted(r["suggested_role"] for r in results[:2])
+
+def test_interview_questions_are_generated_on_demand_and_cached_per_pair(match_env, monkeypatch):
+    """Test that /interview_questions calls the LLM once per (JD, candidate) pair and /match reuses the result for its top candidates."""
+    from app import main, llm
+    from app.cache import TTLCache
+    from app.llm_cache import LLMResultCache
+
+    calls = []
+
+    async def create(**request):
+        calls.append(request)
+        return SimpleNamespace(usage=None, choices=[SimpleNamespace(message=SimpleNamespace(content='["Why this role?"]'))])
+
+    groq_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(llm, "get_async_groq_client", lambda: groq_client)
+    monkeypatch.setattr(llm, "llm_cache", LLMResultCache(TTLCache(maxsize=100)))
+    monkeypatch.setattr(llm, "agenerate_interview_questions", agenerate_interview_questions)
+    body = {"jd_json": match_env.payload["jd_json"], "cv_json": match_env.payload["cvs"][0]["cv_json"]}
+
+    first = client.post("/interview_questions", json=body)
+    second = client.post("/interview_questions", json=body)
+
+    assert first.status_code == 200
+    assert first.json() == second.json() == {"interview_questions": ["Why this role?"]}
+    assert len(calls) == 1
+
+    monkeypatch.setattr(main, "INTERVIEW_QUESTIONS_TOP_K", len(MATCH_TITLES))
+    results = client.post("/match", json=match_env.payload).json()["results"]
+    opened = next(r for r in results if r["suggested_role"] == MATCH_TITLES[0])
+    assert opened["interview_questions"] == ["Why this role?"]
+
+def test_jd_candidate_search_scores_only_the_shortlist(match_env, monkeypatch):
+    """Test that the startup build indexes the stored profiles and /jds/{id}/candidates/search fully scores only the shortlist."""
+    from app import main, matching, vector_index, schemas, auth
+    from tests.test_matching import _sample_jd, _sample_cv
+
+    jd = _sample_jd()
+    profiles = {i + 1: matching.build_cv_profile(_sample_cv(title, f"c{i}@example.com")).to_dict() for i, title in enumerate(MATCH_TITLES)}
+    db_jd = schemas.JobDescription(id=7, content_hash="hash-7", job_title=jd.jobTitle, details=jd.dict())
+    requested = []
+
+    def fake_candidates(supabase, candidate_ids):
+        requested.extend(candidate_ids)
+        return {i: {"id": i, "name": f"Candidate {i}", "email": f"c{i}@example.com", "profile": profiles[i]} for i in candidate_ids}
+
+    monkeypatch.setattr(main.crud, "get_jd", lambda supabase, jd_id: db_jd if jd_id == 7 else None)
+    monkeypatch.setattr(main.crud, "iter_candidate_profiles", lambda supabase: iter(profiles.items()))
+    monkeypatch.setattr(main.crud, "get_candidates_by_ids", fake_candidates)
+    monkeypatch.setattr(main.crud, "iter_active_jds", lambda supabase: iter([]))
+
+    assert client.get("/jds/7/candidates/search").status_code == 403
+    app.dependency_overrides[auth.get_current_user] = lambda: schemas.User(id="admin-1", username="admin", email="admin@example.com", role="admin")
+
+    main._index_build.set()
+    assert client.get("/jds/7/candidates/search").status_code == 503
+    main._sync_indexes(None)
+    assert not main._index_build.is_set()
+
+    response = client.get("/jds/7/candidates/search?limit=2&shortlist=3")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["indexed"], body["shortlisted"]) == (len(MATCH_TITLES), 3)
+    assert len(requested) == 3
+    scores = [r["match_score"] for r in body["results"]]
+    assert len(scores) == 2 and scores == sorted(scores, reverse=True)
+    assert len(vector_index.get_candidate_index()) == len(MATCH_TITLES)
+    assert client.get("/jds/8/candidates/search").status_code == 404
+
+def test_startup_sync_catches_a_stale_candidate_index_file_up(match_env, monkeypatch):
+    """Test that an index file missing recent candidates (unclean shutdown) is completed from the database at startup."""
+    from app import main, matching, vector_index
+    from tests.test_matching import _sample_cv
+
+    profiles = {i + 1: matching.build_cv_profile(_sample_cv(title, f"c{i}@example.com")).to_dict() for i, title in enumerate(MATCH_TITLES)}
+    path = vector_index.candidate_index.path
+    vector_index.rebuild_candidate_index((i, profiles[i]) for i in (1, 2, 3, 4))
+    # Restart: the file is loaded again, while the database gained candidates 5 and 6 and lost candidate 1
+    monkeypatch.setattr(vector_index, "candidate_index", vector_index.IndexStore(path, save_delay=0))
+    fetched = []
+    def fake_candidates(supabase, candidate_ids):
+        fetched.extend(candidate_ids)
+        return {i: {"id": i, "profile": profiles[i]} for i in candidate_ids}
+    monkeypatch.setattr(main.crud, "iter_candidate_ids", lambda supabase: iter([2, 3, 4, 5, 6]))
+    monkeypatch.setattr(main.crud, "get_candidates_by_ids", fake_candidates)
+    monkeypatch.setattr(main.crud, "iter_active_jds", lambda supabase: iter([]))
+
+    main._sync_indexes(None)
+
+    assert fetched == [5, 6]
+    assert vector_index.get_candidate_index().ids() == {2, 3, 4, 5, 6}
+    assert vector_index.IVFIndex.load(path).ids() == {2, 3, 4, 5, 6}
+
+def test_candidate_jd_search_returns_active_jds_and_tracks_status_changes(match_env, monkeypatch):
+    """Test that /candidates/{id}/jds ranks indexed active JDs and that closing a JD drops it from the index."""
+    from app import main, matching, vector_index, schemas
+    from tests.test_matching import _sample_jd, _sample_cv
+
+    db_jds = {
+        i + 1: schemas.JobDescription(id=i + 1, content_hash=f"hash-{i + 1}", job_title=title, status="Active",
+                                      details=_sample_jd(jobTitle=title).dict())
+        for i, title in enumerate(MATCH_TITLES)
+    }
+    profile = matching.build_cv_profile(_sample_cv("Backend Developer")).to_dict()
+
+    monkeypatch.setattr(main.crud, "iter_active_jds", lambda supabase: iter(db_jds.values()))
+    monkeypatch.setattr(main.crud, "get_jds_by_ids", lambda supabase, ids: {i: db_jds[i] for i in ids})
+    monkeypatch.setattr(main.crud, "get_candidates_by_ids", lambda supabase, ids: {i: {"id": i, "profile": profile} for i in ids if i == 1})
+    monkeypatch.setattr(main.crud, "iter_candidate_profiles", lambda supabase: iter([]))
+    main._sync_indexes(None)
+
+    response = client.get("/candidates/1/jds?limit=3&shortlist=4")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["indexed"], body["shortlisted"], len(body["results"])) == (len(MATCH_TITLES), 4, 3)
+    scores = [r["match_score"] for r in body["results"]]
+    assert scores == sorted(scores, reverse=True)
+    assert client.get("/candidates/2/jds").status_code == 404
+
+    closed = db_jds[1].copy(update={"status": "Closed"})
+    monkeypatch.setattr(main.crud, "update_jd", lambda supabase, jd_id, jd_update: closed)
+    assert client.patch("/jds/1", json={"status": "Closed"}).status_code == 200
+    assert 1 not in vector_index.get_jd_index() and len(vector_index.get_jd_index()) == len(MATCH_TITLES) - 1
+
+def test_startup_sync_catches_a_stale_jd_index_file_up(match_env, monkeypatch):
+    """Test that JDs saved or closed after the JD index file was last written are caught up at startup."""
+    from app import main, vector_index, schemas
+    from tests.test_matching import _sample_jd
+
+    db_jds = {
+        i + 1: schemas.JobDescription(id=i + 1, content_hash=f"hash-{i + 1}", job_title=title, status="Active",
+                                      details=_sample_jd(jobTitle=title).dict())
+        for i, title in enumerate(MATCH_TITLES)
+    }
+    path = vector_index.jd_index.path
+    vector_index.rebuild_jd_index(main._jd_profiles([db_jds[i] for i in (1, 2, 3)]))
+    # Restart: JD 1 was closed and JDs 4-6 were saved after the file was written
+    monkeypatch.setattr(vector_index, "jd_index", vector_index.IndexStore(path, save_delay=0))
+    monkeypatch.setattr(main.crud, "iter_active_jds", lambda supabase: (db_jds[i] for i in (2, 3, 4, 5, 6)))
+    monkeypatch.setattr(main.crud, "iter_candidate_profiles", lambda supabase: iter([]))
+
+    main._sync_indexes(None)
+
+    assert vector_index.get_jd_index().ids() == {2, 3, 4, 5, 6}
+    assert vector_index.IVFIndex.load(path).ids() == {2, 3, 4, 5, 6}
+
+def test_results_are_paged_with_the_next_cursor_header(match_env, monkeypatch):
+    """Test that /analyses passes paging options through and returns the next cursor in X-Next-Cursor"""
+    from app import main, crud
+
+    calls = []
+    def fake_user_analyses(supabase, user_id, limit, cursor, summary):
+        calls.append((user_id, limit, cursor, summary))
+        return [], crud.encode_cursor("2026-01-01T00:00:00+00:00", 5)
+    monkeypatch.setattr(main.crud, "get_user_analyses", fake_user_analyses)
+
+    response = client.get("/analyses", params={"limit": 20, "summary": True})
+    assert response.status_code == 200
+    assert crud.decode_cursor(response.headers["X-Next-Cursor"]) == ("2026-01-01T00:00:00+00:00", 5)
+    assert calls == [("user-1", 20, None, True)]
+
+    assert client.get("/jds/7/results", params={"cursor": "garbage"}).status_code == 400
+    assert client.get("/analyses", params={"limit": 0}).status_code == 422
+
+def test_jd_results_accept_top_k_filters(match_env, monkeypatch):
+    """Test that /jds/{jd_id}/results passes ordering and filters to the database query and validates them"""
+    from app import main
+
+    calls = []
+    def fake_jd_results(supabase, jd_id, **options):
+        calls.append((jd_id, options))
+        return [], None
+    monkeypatch.setattr(main.crud, "get_jd_results", fake_jd_results)
+
+    response = client.get("/jds/7/results", params={"order_by": "score", "status": "Pass", "min_score": 60, "limit": 20, "latest": True})
+    assert response.status_code == 200 and "X-Next-Cursor" not in response.headers
+    assert calls == [(7, {"limit": 20, "cursor": None, "summary": False, "order_by": "score", "min_score": 60.0,
+                          "match_level": None, "status": "Pass", "latest": True})]
+    assert client.get("/jds/7/results", params={"order_by": "name"}).status_code == 422
+
+def test_rescore_rewrites_stored_results_in_bulk(match_env, monkeypatch):
+    """Test that /jds/{jd_id}/rescore rescores stored details batch by batch and writes each batch in one request"""
+    from app import main, auth, schemas
+
+    stored = [
+        {"id": i, "details": {"job_title_similarity": 0.5, "responsibilities_similarity": 0.5, "experience_suitability": 1.0,
+                              "education_relevance": 0.5, "skills_match": 0.9, "skills_match_type": "semantic",
+                              "location_compatibility": 1.0, "status": "Pass"}}
+        for i in range(1, 6)
+    ]
+    writes = []
+    monkeypatch.setattr(main, "RESCORE_BATCH_SIZE", 2)
+    monkeypatch.setattr(main.crud, "get_jd", lambda supabase, jd_id: SimpleNamespace(id=jd_id))
+    monkeypatch.setattr(main.crud, "iter_jd_result_details", lambda supabase, jd_id, batch_size: (stored[i:i + batch_size] for i in range(0, len(stored), batch_size)))
+    monkeypatch.setattr(main.crud, "update_analysis_results", lambda supabase, rows: writes.append(rows) or len(rows))
+
+    body = {"weights": {"skills": 1.0, "title": 0, "responsibilities": 0, "experience": 0, "education": 0}, "rejectionRules": {"passMin": 0.95}}
+    assert client.post("/jds/7/rescore", json=body).status_code == 403
+
+    app.dependency_overrides[auth.get_current_user] = lambda: schemas.User(id="user-1", username="lead", email="lead@example.com", role="admin")
+    response = client.post("/jds/7/rescore", json=body)
+    assert response.status_code == 200
+    assert response.json() == {"jd_id": 7, "rescored": 5, "status_counts": {"Pending": 5}}
+    assert [len(rows) for rows in writes] == [2, 2, 1]
+    assert writes[0][0]["score"] == 90.0 and writes[0][0]["match_level"] == "Excellent" and writes[0][0]["details"]["status"] == "Pending"
+
+    assert client.post("/jds/7/rescore", json={"weights": {"salary": 1.0}}).status_code == 422
+
+    def failing_update(supabase, rows):
+        if len(writes) == 4:
+            raise RuntimeError("connection reset")
+        writes.append(rows)
+        return len(rows)
+    monkeypatch.setattr(main.crud, "update_analysis_results", failing_update)
+    response = client.post("/jds/7/rescore", json=body)
+    assert response.status_code == 500
+    assert response.json()["detail"]["rescored"] == 2
+
+def test_rescoring_a_match_with_the_same_weights_keeps_its_scores(match_env, monkeypatch):
+    """Test that /jds/{jd_id}/rescore with a /match's own skill weights and rules reproduces its score, level and status"""
+    from app import main, auth, schemas
+
+    skill_weights = {"critical": 0.9, "important": 0.05, "desired": 0.05, "base": 0}
+    rejection_rules = {"passMin": 0.6, "rejectBelow": 0.3, "criticalMinPercent": 50}
+    payload = dict(match_env.payload)
+    payload["jd_json"] = {**payload["jd_json"], "requiredSkills": {"critical": ["Python"], "important": ["SQL"], "extra": ["Docker"]},
+                          "skillWeights": skill_weights, "rejectionRules": rejection_rules}
+    payload["cvs"] = [{**cv, "skill_presence": {"Python": i % 2 == 0, "SQL": i % 3 == 0, "Docker": True}} for i, cv in enumerate(payload["cvs"])]
+
+    response = client.post("/match", json=payload)
+    assert response.status_code == 200
+    (saved,) = match_env.writes["analysis_results"]
+    stored = [{"id": i, "details": row["result"]["match_details"]} for i, row in enumerate(saved, start=1)]
+    writes = []
+    monkeypatch.setattr(main.crud, "get_jd", lambda supabase, jd_id: SimpleNamespace(id=jd_id))
+    monkeypatch.setattr(main.crud, "iter_jd_result_details", lambda supabase, jd_id, batch_size: iter([stored]))
+    monkeypatch.setattr(main.crud, "update_analysis_results", lambda supabase, rows: writes.extend(rows) or len(rows))
+    app.dependency_overrides[auth.get_current_user] = lambda: schemas.User(id="user-1", username="lead", email="lead@example.com", role="admin")
+
+    response = client.post("/jds/7/rescore", json={"skillWeights": skill_weights, "rejectionRules": rejection_rules})
+    assert response.status_code == 200
+    matched = [(row["result"]["match_score"], row["result"]["match_level"], row["result"]["match_details"]["status"]) for row in saved]
+    assert [(row["score"], row["match_level"], row["details"]["status"]) for row in writes] == matched
+    assert len({status for _, _, status in matched}) > 1
@@ -1,5 +1,10 @@
+import json
+import asyncio
+import numpy as np
 import pytest
 from app import matching
+from app.cache import TTLCache
+from app.embedding_cache import EmbeddingCache
 from app.schemas import JDModel, CVModel, LocationModel, CompanyProfile, Qualifications, CompensationBenefits, ApplicationInfo, Experience, Education, Skill, JobStability, EducationGap, KeywordAnalysis, Analytics
 
 def test_calculate_experience_years():
@@ -417,4 +422,204 @@ def test_compute_similarity():
     assert "responsibilities_similarity" in details
     assert "experience_suitability" in details
     assert "education_relevance" in details
-    assert "location_compatibility" in details
\ No newline at end of file
+    assert "location_compatibility" in details
+
+def _fake_vector(text):
+    """Deterministic pseudo-embedding so tests never touch the network."""
+    rng = np.random.default_rng(abs(hash(text)) % (2 ** 32))
+    return rng.normal(size=8)
+
+def _sample_jd(**overrides):
+    data = dict(
+        jobId="JD001",
+        jobTitle="Software Engineer",
+        companyProfile=CompanyProfile(companyName="Test Company"),
+        location=LocationModel(city="San Francisco", state="CA", country="USA"),
+        jobSummary="Test job",
+        keyResponsibilities=["Develop software", "Review code"],
+        qualifications=Qualifications(required=["3+ years experience in Python"]),
+        requiredSkills=["Python", "SQL"],
+        educationRequired=["Bachelor's in Computer Science"],
+        compensationAndBenefits=CompensationBenefits(),
+        applicationInfo=ApplicationInfo(),
+        extractedKeywords=["Python"]
+    )
+    data.update(overrides)
+    return JDModel(**data)
+
+def _sample_cv(title="Backend Developer", email="jane@example.com"):
+    return CVModel(
+        Personal_Data={"firstName": "Jane", "email": email, "location": LocationModel(city="Bangalore")},
+        education_list=[Education(degree="B.Tech", fieldOfStudy="Electronics")],
+        experiences_list=[Experience(jobTitle=title, startDate="2019-01-01", endDate="2022-01-01",
+                                     description=["Built APIs", "Wrote tests"])],
+        skills_list=[Skill(skillName="Python"), Skill(skillName="Docker")],
+        Analytics=Analytics(job_stability=JobStability(), education_gap=EducationGap(),
+                            keyword_analysis=KeywordAnalysis(), suggested_role=title)
+    )
+
+@pytest.fixture
+def fake_embeddings(monkeypatch):
+    """Route embedding requests to a deterministic fake and record each request."""
+    requests = []
+
+    def fake_request(texts):
+        requests.append(list(texts))
+        return np.array([_fake_vector(t) for t in texts])
+
+    monkeypatch.setattr(matching, "embedding_cache", EmbeddingCache(TTLCache(maxsize=0)))
+    monkeypatch.setattr(matching, "_request_embeddings", fake_request)
+    return requests
+
+def test_compute_similarity_resolves_embeddings_in_one_request(fake_embeddings):
+    """Test that a single JD/CV pair needs exactly one embedding request."""
+    score, details = matching.compute_similarity(_sample_jd(), _sample_cv())
+
+    assert len(fake_embeddings) == 1
+    assert len(fake_embeddings[0]) == len(set(fake_embeddings[0]))
+    assert 0 <= score <= 1
+    assert details["skills_match_type"] == "semantic"
+
+def test_embedding_plan_covers_a_whole_batch(fake_embeddings):
+    """Test that scoring inside a resolved plan issues no further requests."""
+    jd = _sample_jd()
+    cvs = [_sample_cv("Backend Developer"), _sample_cv("Data Engineer", "sam@example.com")]
+
+    plan = matching.EmbeddingPlan()
+    for cv in cvs:
+        plan.add(matching.embedding_texts(jd, cv))
+    with plan.resolved():
+        scores = [matching.compute_similarity(jd, cv)[0] for cv in cvs]
+
+    assert len(fake_embeddings) == 1
+    assert len(scores) == 2
+
+def test_embedding_plan_matches_unplanned_scores(fake_embeddings):
+    """Test that planned and unplanned scoring produce identical results."""
+    jd, cv = _sample_jd(), _sample_cv()
+    unplanned = matching.compute_similarity(jd, cv)
+
+    plan = matching.EmbeddingPlan()
+    plan.add(matching.embedding_texts(jd, cv))
+    with plan.resolved():
+        planned = matching.compute_similarity(jd, cv)
+
+    assert planned == unplanned
+
+def test_jd_profile_is_prepared_once_for_many_cvs(fake_embeddings, monkeypatch):
+    """Test that scoring several CVs against a profile never re-embeds JD-only texts."""
+    jd = _sample_jd()
+    profile = matching.build_jd_profile(jd)
+    assert len(fake_embeddings) == 1
+    assert profile.required_years == 3.0
+    assert profile.location == ("san francisco", "ca", "usa")
+
+    calls = []
+    monkeypatch.setattr(matching, "extract_required_experience", lambda q: calls.append(q) or 0.0)
+    for title, email in [("Backend Developer", "a@example.com"), ("Data Engineer", "b@example.com")]:
+        matching.compute_similarity(jd, _sample_cv(title, email), jd_profile=profile)
+
+    jd_texts = set(matching.jd_profile_texts(jd)) - set(matching.cv_profile_texts(_sample_cv()))
+    requested = {t for batch in fake_embeddings[1:] for t in batch}
+    assert not calls
+    assert not jd_texts & requested
+
+def test_jd_profile_scores_match_unprofiled_scoring(fake_embeddings):
+    """Test that scoring with a prepared profile gives the same result as scoring from the JD."""
+    jd, cv = _sample_jd(), _sample_cv()
+    assert matching.compute_similarity(jd, cv, jd_profile=matching.build_jd_profile(jd)) == matching.compute_similarity(jd, cv)
+
+def test_get_jd_profile_caches_by_content_hash(fake_embeddings, monkeypatch):
+    """Test that profiles are reused for the same content hash and rebuilt for a new one."""
+    monkeypatch.setattr(matching, "jd_profile_cache", TTLCache(maxsize=8))
+    jd = _sample_jd()
+
+    first = matching.get_jd_profile(jd, "hash-1")
+    again = matching.get_jd_profile(jd, "hash-1")
+    other = matching.get_jd_profile(_sample_jd(jobTitle="Data Engineer"), "hash-2")
+
+    assert first is again
+    assert other is not first
+    assert first.content_hash == "hash-1"
+    assert len(fake_embeddings) == 2
+
+def test_cv_profile_round_trips_through_json(fake_embeddings):
+    """Test that a serialized CV profile scores like the live one and needs no embedding requests."""
+    jd, cv = _sample_jd(), _sample_cv()
+    jd_profile = matching.build_jd_profile(jd)
+    cv_profile = matching.build_cv_profile(cv)
+    requests_before = len(fake_embeddings)
+
+    exact = matching.CVProfile.from_dict(json.loads(json.dumps(cv_profile.to_dict(dtype="float32"))))
+    compact = matching.CVProfile.from_dict(json.loads(json.dumps(cv_profile.to_dict())))
+    live_score, live_details = matching.score_profiles(jd_profile, cv_profile)
+
+    assert matching.score_profiles(jd_profile, exact) == (live_score, live_details)
+    assert abs(matching.score_profiles(jd_profile, compact)[0] - live_score) < 1e-2
+    assert compact.experience_years == cv_profile.experience_years == 3.0
+    assert len(fake_embeddings) == requests_before
+    assert live_score == matching.compute_similarity(jd, cv)[0]
+
+def test_load_cv_profile_rejects_stale_profiles(fake_embeddings):
+    """Test that missing, outdated or other-model profiles are ignored so they get rebuilt."""
+    data = matching.build_cv_profile(_sample_cv()).to_dict()
+
+    assert matching.load_cv_profile(data) is not None
+    assert matching.load_cv_profile(None) is None
+    assert matching.load_cv_profile({**data, "version": 0}) is None
+    assert matching.load_cv_profile({**data, "model_name": "other-model"}) is None
+
+def test_prefilter_scores_embed_all_summaries_in_one_request(fake_embeddings, monkeypatch):
+    """Test that the prefilter ranks by skills, experience and location with one batched embedding request."""
+    async def fake_arequest(texts):
+        fake_embeddings.append(list(texts))
+        return np.array([_fake_vector(t) for t in texts])
+
+    monkeypatch.setattr(matching, "_arequest_embeddings", fake_arequest)
+    jd = _sample_jd()
+    jd_profile = matching.build_jd_profile(jd)
+    requests_before = len(fake_embeddings)
+    categories = {"critical": ["Python", "SQL"], "important": [], "extra": []}
+    cvs = [(_sample_cv("Backend Developer"), {"Python": True, "SQL": True}), (_sample_cv("Designer"), {"Python": False, "SQL": False})]
+
+    (strong, strong_details), (weak, weak_details) = asyncio.run(matching.aprefilter_scores(jd, jd_profile, cvs, categories))
+
+    assert len(fake_embeddings) == requests_before + 1
+    assert strong > weak
+    assert strong_details["skills_match_type"] == "weighted"
+    assert strong_details["candidate_exp_years"] == 3.0
+    assert strong_details["required_exp_years"] == 3.0
+
+def test_rescore_details_reproduces_and_reweights_stored_scores(fake_embeddings):
+    """Test that rescoring stored details matches full scoring, then applies new weights and rules like /match would."""
+    jd, cv = _sample_jd(), _sample_cv()
+    jd_profile, cv_profile = matching.build_jd_profile(jd), matching.build_cv_profile(cv)
+    categories = {"critical": ["Python", "SQL"], "important": ["Docker"], "extra": ["Go"]}
+    presences = [
+        {"Python": True, "SQL": True, "Docker": True, "Go": False},
+        {"Python": True, "SQL": False, "Docker": True, "Go": True},
+        {"Python": False, "SQL": False, "Docker": False, "Go": False},
+    ]
+    scored = [matching.score_profiles(jd_profile, cv_profile, categories, presence) for presence in presences]
+    scored.append(matching.score_profiles(jd_profile, cv_profile))
+    fake_embeddings.clear()
+
+    scores, levels, details = matching.rescore_details([d for _, d in scored])
+    assert np.allclose(scores, [score for score, _ in scored], atol=1e-3)
+    assert [d["status"] for d in details] == [d["status"] for _, d in scored]
+    assert levels == [matching.get_match_level(score) for score, _ in scored]
+
+    skill_weights = {"critical": 0.6, "important": 0.2, "desired": 0.0, "base": 0.0}
+    rules = {"passMin": 0.5, "rejectBelow": 0.2, "criticalMinPercent": 40.0}
+    weights = {"title": 0.1, "responsibilities": 0.1, "experience": 0.1, "education": 0.1, "skills": 0.6, "location": 0.0}
+    scores, _, details = matching.rescore_details([d for _, d in scored], weights=weights, skill_weights=skill_weights, rejection_rules=rules)
+    for presence, (_, old), score, new in zip(presences, scored, scores, details):
+        skills, skills_details = matching.calculate_weighted_skills_match(
+            categories, presence, critical_weight=0.6, important_weight=0.2, desired_weight=0.0, base_skill_score=0.0)
+        assert new["skills_match"] == pytest.approx(skills, abs=1e-4)
+        assert new["status"] == matching.calculate_match_status(skills, skills_details, "weighted", pass_min=0.5, reject_below=0.2, critical_min_percent=40.0)
+        expected = sum(weights[name] * (skills if key == "skills_match" else old[key]) for name, key in matching.RESCORE_DIMENSIONS)
+        assert score == pytest.approx(expected, abs=1e-3)
+    # Semantic skill scores are kept as stored
+    assert details[3]["skills_match"] == scored[3][1]["skills_match"]
+    assert fake_embeddings == []
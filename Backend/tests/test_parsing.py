@@ -1,5 +1,6 @@
+import asyncio
 import pytest
-from app.parsing import to_bool, clean_resume_json, clean_json_response, preprocess_resume_text
+from app.parsing import to_bool, clean_resume_json, clean_json_response, preprocess_resume_text, extract_texts_from_files, shutdown_extraction_pool
 
 def test_to_bool_with_boolean():
     """Test to_bool with boolean values."""
@@ -213,4 +214,20 @@ def test_preprocess_resume_text():
     long_text = "A" * 9000
     processed = preprocess_resume_text(long_text)
     assert len(processed) <= 8010  # 8000 + 3 for ellipsis
-    assert processed.endswith("...")
\ No newline at end of file
+    assert processed.endswith("...")
+
+def test_extract_texts_from_files_in_process_pool(tmp_path):
+    """Test that files are parsed in the process pool, in order, with failures isolated per file."""
+    first = tmp_path / "first.txt"
+    first.write_text("First resume", encoding="utf-8")
+    second = tmp_path / "second.txt"
+    second.write_text("Second resume", encoding="utf-8")
+    unsupported = tmp_path / "notes.xyz"
+    unsupported.write_text("ignored", encoding="utf-8")
+
+    try:
+        texts = asyncio.run(extract_texts_from_files([str(first), str(tmp_path / "missing.txt"), str(unsupported), str(second)]))
+    finally:
+        shutdown_extraction_pool()
+
+    assert texts == ["First resume", None, None, "Second resume"]
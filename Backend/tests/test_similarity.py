@@ -0,0 +1,33 @@
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+from app import similarity
+
+def test_normalize_returns_float32_unit_vectors():
+    """Test that rows are scaled to unit length and stored as float32."""
+    vectors = similarity.normalize(np.array([[3.0, 4.0], [0.0, 2.0]]))
+    assert vectors.dtype == np.float32
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+
+def test_normalize_keeps_zero_vectors():
+    """Test that zero vectors do not produce NaNs."""
+    vectors = similarity.normalize(np.zeros((2, 3)))
+    assert not np.isnan(vectors).any()
+    assert similarity.cosine(np.zeros(3), np.ones(3)) == 0.0
+
+def test_cosine_matrix_matches_sklearn():
+    """Test that the matrix kernel agrees with sklearn's cosine_similarity."""
+    rng = np.random.default_rng(42)
+    a = rng.normal(size=(4, 16))
+    b = rng.normal(size=(7, 16))
+
+    expected = cosine_similarity(a, b)
+    assert np.allclose(similarity.cosine_matrix(a, b), expected, atol=1e-6)
+    assert np.allclose(
+        similarity.cosine_matrix(similarity.normalize(a), similarity.normalize(b), normalized=True),
+        expected,
+        atol=1e-6
+    )
+
+def test_cosine_accepts_1d_inputs():
+    """Test that single vectors are treated as one-row matrices."""
+    assert np.isclose(similarity.cosine(np.array([1.0, 0.0]), np.array([1.0, 1.0])), np.sqrt(0.5))
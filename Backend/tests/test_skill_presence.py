@@ -0,0 +1,92 @@
+import asyncio
+import numpy as np
+import pytest
+from app import llm, matching, skill_presence
+from app.schemas import CVModel, Experience, Skill, Analytics, JobStability, EducationGap, KeywordAnalysis
+
+def _cv(skills, descriptions=(), technologies=()):
+    return CVModel(
+        Personal_Data={"firstName": "Jane", "location": {}},
+        experiences_list=[Experience(jobTitle="Backend Developer", description=list(descriptions), technologiesUsed=list(technologies))],
+        skills_list=[Skill(skillName=s) for s in skills],
+        Analytics=Analytics(job_stability=JobStability(), education_gap=EducationGap(),
+                            keyword_analysis=KeywordAnalysis(), suggested_role="Backend Developer")
+    )
+
+def _unit(similarity):
+    """2D unit vector whose cosine similarity to [1, 0] is `similarity`."""
+    return np.array([similarity, np.sqrt(1 - similarity ** 2)])
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    """Record the skills sent to the LLM check, answering True for each."""
+    calls = []
+
+    async def fake_check(skills, resume_text):
+        calls.append(list(skills))
+        return {skill: True for skill in skills}
+
+    monkeypatch.setattr(llm, "acheck_skill_presence", fake_check)
+    return calls
+
+def test_exact_and_alias_matches_need_no_embeddings_or_llm(monkeypatch, llm_calls):
+    """Test that skills named in the CV, under any alias or spelling, are found lexically."""
+    embedded = []
+
+    async def orthogonal(texts):
+        embedded.append(list(texts))
+        return np.eye(len(texts))
+
+    monkeypatch.setattr(matching, "aget_embeddings", orthogonal)
+    cv = _cv(["Python", "Postgres"], descriptions=["Deployed services on Kubernetes"], technologies=["Node.js"])
+    categories = {"critical": ["python", "PostgreSQL", "nodejs"], "important": ["k8s"], "extra": ["Rust"]}
+
+    presence = asyncio.run(skill_presence.adetect_skill_presence(cv, categories))
+
+    assert presence == {"python": True, "PostgreSQL": True, "nodejs": True, "k8s": True, "Rust": False}
+    assert embedded == [["Rust", "Python", "Postgres", "Node.js"]]
+    assert llm_calls == []
+
+def test_short_aliases_are_not_matched_in_free_text(monkeypatch, llm_calls):
+    """Test that "go" in a sentence does not count as the Go language."""
+    monkeypatch.setattr(matching, "aget_embeddings", lambda texts: asyncio.sleep(0, np.eye(len(texts))))
+    cv = _cv(["Excel"], descriptions=["Helped the team go to market"])
+
+    presence = asyncio.run(skill_presence.adetect_skill_presence(cv, {"critical": ["Golang", "Microsoft Excel"]}))
+
+    assert presence == {"Golang": False, "Microsoft Excel": True}
+
+def test_only_ambiguous_skills_reach_the_llm(monkeypatch, llm_calls):
+    """Test that embedding similarity settles clear cases and the LLM is asked about the rest in one call."""
+    vectors = {"Flask": _unit(1.0), "Django": _unit(0.9), "FastAPI": _unit(0.78), "Haskell": _unit(0.1)}
+
+    async def fake_embeddings(texts):
+        return np.array([vectors[t] for t in texts])
+
+    monkeypatch.setattr(matching, "aget_embeddings", fake_embeddings)
+    cv = _cv(["Flask"])
+
+    presence = asyncio.run(skill_presence.adetect_skill_presence(cv, {"critical": ["Django", "FastAPI"], "extra": ["Haskell"]}))
+
+    assert presence == {"Django": True, "FastAPI": True, "Haskell": False}
+    assert llm_calls == [["FastAPI"]]
+
+def test_known_verdicts_are_kept_and_failures_fall_back_to_similarity(monkeypatch):
+    """Test that client-sent verdicts win and an unavailable LLM falls back to the similarity midpoint."""
+    vectors = {"Flask": _unit(1.0), "FastAPI": _unit(0.80), "Pyramid": _unit(0.72)}
+
+    async def fake_embeddings(texts):
+        return np.array([vectors[t] for t in texts])
+
+    async def failing_check(skills, resume_text):
+        raise llm.LLMJsonError("Groq is down")
+
+    monkeypatch.setattr(matching, "aget_embeddings", fake_embeddings)
+    monkeypatch.setattr(llm, "acheck_skill_presence", failing_check)
+    cv = _cv(["Flask"])
+
+    presence = asyncio.run(skill_presence.adetect_skill_presence(
+        cv, {"critical": ["Flask", "FastAPI", "Pyramid"]}, known={"Flask": "false"}
+    ))
+
+    assert presence == {"Flask": False, "FastAPI": True, "Pyramid": False}
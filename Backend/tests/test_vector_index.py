@@ -0,0 +1,105 @@
+import time
+import numpy as np
+from app import matching, vector_index
+from app.cache import TTLCache
+from app.embedding_cache import EmbeddingCache
+from app.vector_index import IVFIndex
+from tests.test_matching import _fake_vector, _sample_cv
+
+def _clustered_vectors(n, dim=16, clusters=8, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    return centers[rng.integers(clusters, size=n)] + 0.1 * rng.normal(size=(n, dim))
+
+def _exact_top(vectors, query, k):
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return list(np.argsort(-(vectors @ (query / np.linalg.norm(query))))[:k])
+
+def test_small_index_is_searched_exactly():
+    """Test that an untrained index returns the exact nearest neighbours and honours upserts and removals."""
+    vectors = _clustered_vectors(50)
+    index = IVFIndex(min_train_size=1000)
+    index.upsert(range(50), vectors)
+
+    assert not index.trained and len(index) == 50
+    assert [item_id for item_id, _ in index.search(vectors[3], 5)] == _exact_top(vectors, vectors[3], 5)
+
+    index.upsert([7], vectors[3:4])
+    assert {item_id for item_id, _ in index.search(vectors[3], 2)} == {3, 7}
+    index.remove([3, 7])
+    assert 3 not in index and len(index) == 48
+    assert {3, 7}.isdisjoint(item_id for item_id, _ in index.search(vectors[3], 10))
+
+def test_trained_index_probes_only_nearby_lists():
+    """Test that a trained IVF index finds the true neighbours while scanning a fraction of the vectors."""
+    vectors = _clustered_vectors(600)
+    index = IVFIndex(min_train_size=200, nprobe=4)
+    index.upsert(range(600), vectors)
+
+    assert index.trained
+    queries = _clustered_vectors(20, seed=1)
+    recall = np.mean([
+        len({item_id for item_id, _ in index.search(query, 10)} & set(_exact_top(vectors, query, 10))) / 10
+        for query in queries
+    ])
+    assert recall >= 0.9
+    order, offsets = index._grouped_rows()
+    assert len(offsets) - 1 > 4
+
+def test_index_round_trips_through_disk(tmp_path):
+    """Test that a saved index loads with the same vectors, quantizer and metadata."""
+    vectors = _clustered_vectors(300)
+    index = IVFIndex(metadata={"model_name": "test-model"}, min_train_size=100)
+    index.upsert(range(300), vectors)
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+
+    loaded = IVFIndex.load(path, min_train_size=100)
+    assert loaded.metadata == {"model_name": "test-model"}
+    assert loaded.trained and len(loaded) == 300 and not index.dirty
+    query = vectors[10]
+    assert [i for i, _ in loaded.search(query, 5)] == [i for i, _ in index.search(query, 5)]
+
+def test_rebuild_candidate_index_skips_unusable_profiles(monkeypatch, tmp_path):
+    """Test that candidates without a current stored profile are left out of a rebuilt candidate index."""
+    monkeypatch.setattr(matching, "embedding_cache", EmbeddingCache(TTLCache(maxsize=0)))
+    monkeypatch.setattr(matching, "_request_embeddings", lambda texts: np.array([_fake_vector(t) for t in texts]))
+    monkeypatch.setattr(vector_index, "candidate_index", vector_index.IndexStore(str(tmp_path / "candidate_index.npz"), save_delay=0))
+    profile = matching.build_cv_profile(_sample_cv()).to_dict()
+
+    index = vector_index.rebuild_candidate_index([(1, profile), (2, None), (3, {**profile, "version": 0})])
+
+    assert len(index) == 1 and 1 in index
+    assert vector_index.get_candidate_index() is index
+    assert not index.dirty
+
+def test_index_store_keeps_changes_made_during_a_rebuild(monkeypatch, tmp_path):
+    """Test that entries upserted or removed while a rebuild runs end up in the rebuilt index."""
+    monkeypatch.setattr(vector_index, "_model_metadata", lambda: {"model_name": "test-model"})
+    store = vector_index.IndexStore(str(tmp_path / "index.npz"), save_delay=0)
+    vectors = _clustered_vectors(10)
+    store.upsert(9, vectors[9])
+
+    def entries():
+        yield 1, vectors[1]
+        # Saved by a /match while the rebuild is still reading the database
+        store.upsert(5, vectors[5])
+        store.remove(1)
+        yield 2, vectors[2]
+
+    index = store.rebuild(entries())
+
+    assert store.get() is index and index.ids() == {2, 5}
+    assert IVFIndex.load(store.path).ids() == {2, 5}
+
+def test_index_store_saves_changes_after_the_save_delay(monkeypatch, tmp_path):
+    """Test that changes reach the index file without waiting for shutdown."""
+    monkeypatch.setattr(vector_index, "_model_metadata", lambda: {"model_name": "test-model"})
+    store = vector_index.IndexStore(str(tmp_path / "index.npz"), save_delay=0.01)
+    store.upsert(1, _clustered_vectors(1)[0])
+
+    deadline = time.monotonic() + 5
+    while store.get().dirty and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert IVFIndex.load(store.path).ids() == {1} and not store.get().dirty
@@ -41,4 +41,17 @@ api.interceptors.response.use(
     }
 );
 
+// Fetch every page of a cursor-paginated list endpoint (e.g. /analyses),
+// following the X-Next-Cursor response header until the last page
+export const getAllPages = async (url, params = {}) => {
+    const items = [];
+    let cursor;
+    do {
+        const response = await api.get(url, { params: cursor ? { ...params, cursor } : params });
+        items.push(...response.data);
+        cursor = response.headers['x-next-cursor'];
+    } while (cursor);
+    return items;
+};
+
 export default api;
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useParams } from 'react-router-dom';
-import api from '../api';
+import { getAllPages } from '../api';
 import ProcessingLoader from '../components/ui/ProcessingLoader';
 
 const JDAnalysesPage = () => {
@@ -13,8 +13,7 @@ const JDAnalysesPage = () => {
         const fetchAnalyses = async () => {
             try {
                 setLoading(true);
-                const analysesResponse = await api.get(`/jds/${jdId}/results`);
-                setAnalyses(analysesResponse.data);
+                setAnalyses(await getAllPages(`/jds/${jdId}/results`));
             } catch (err) {
                 setError('Failed to fetch analyses.');
             } finally {
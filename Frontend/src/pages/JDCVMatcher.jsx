@@ -321,6 +321,8 @@ const JDCVMatcher = ({ isPastAnalysesPage }) => {
                         setExpandedIdx={setExpandedIdx}
                         skillCategories={skillCategories}
                         resetApp={resetApp}
+                        jdJson={{ ...editedJdJson, requiredSkills: skillCategories }}
+                        cvs={cvExtractionResults}
                     />
                 );
             default:
@@ -382,6 +384,8 @@ const JDCVMatcher = ({ isPastAnalysesPage }) => {
             setExpandedIdx={setExpandedIdx}
             skillCategories={skillCategories}
             resetApp={resetApp}
+            jdJson={{ ...editedJdJson, requiredSkills: skillCategories }}
+            cvs={cvExtractionResults}
           />
         );
       default:
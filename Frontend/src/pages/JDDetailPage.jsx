@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useParams } from 'react-router-dom';
-import api from '../api';
+import api, { getAllPages } from '../api';
 import JdFormEditor from '../components/JdFormEditor';
 import ProcessingLoader from '../components/ui/ProcessingLoader';
 
@@ -17,8 +17,7 @@ const JDDetailPage = () => {
                 setLoading(true);
                 const jdResponse = await api.get(`/jds/${jdId}`);
                 setJd(jdResponse.data);
-                const analysesResponse = await api.get(`/jds/${jdId}/results`);
-                setAnalyses(analysesResponse.data);
+                setAnalyses(await getAllPages(`/jds/${jdId}/results`));
             } catch (err) {
                 setError('Failed to fetch job description details.');
             } finally {
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import api from '../../../api';
+import { getAllPages } from '../../../api';
 import useAuth from '../../../hooks/useAuth';
 
 const PastAnalyses = () => {
@@ -14,8 +14,7 @@ const PastAnalyses = () => {
         const fetchAnalyses = async () => {
             setLoading(true);
             try {
-                const res = await api.get(`/analyses`);
-                setAnalyses(res.data);
+                setAnalyses(await getAllPages(`/analyses`));
             } catch (err) {
                 setError('Failed to fetch past analyses.');
                 console.error('Error fetching analyses:', err); // Add error logging
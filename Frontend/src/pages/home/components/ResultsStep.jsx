@@ -1,8 +1,46 @@
-import React from 'react';
+import React, { useState } from 'react';
 import { ChevronDown, ChevronUp } from 'lucide-react';
+import api from '../../../api';
 import SkillBadge from '../../../components/ui/SkillBadge';
 
-const ResultsStep = ({ finalResults, expandedIdx, setExpandedIdx, skillCategories, resetApp }) => (
+// The extracted CV a match result was scored from, by UUID or else by name
+const findCv = (cvs, candidate) => (cvs || []).find(({ cv_json }) => {
+  if (candidate.candidate_id) return cv_json?.UUID === candidate.candidate_id;
+  const { firstName, lastName } = cv_json?.Personal_Data || {};
+  return `${firstName || ''} ${lastName || ''}`.trim() === candidate.candidate_name;
+});
+
+const ResultsStep = ({ finalResults, expandedIdx, setExpandedIdx, skillCategories, resetApp, jdJson, cvs }) => {
+  // Interview questions are generated on demand (POST /interview_questions) when a candidate is expanded
+  const [questions, setQuestions] = useState({});
+  const [loadingQuestions, setLoadingQuestions] = useState({});
+
+  const loadQuestions = async (idx) => {
+    const candidate = finalResults.results[idx];
+    const cv = findCv(cvs, candidate);
+    if (questions[idx] || loadingQuestions[idx] || candidate.interview_questions?.length > 0 || !jdJson || !cv) return;
+    setLoadingQuestions((prev) => ({ ...prev, [idx]: true }));
+    try {
+      const res = await api.post(`/interview_questions`, { jd_json: jdJson, cv_json: cv.cv_json });
+      setQuestions((prev) => ({ ...prev, [idx]: res.data.interview_questions }));
+    } catch (err) {
+      console.error('Error generating interview questions:', err);
+      setQuestions((prev) => ({ ...prev, [idx]: [] }));
+    } finally {
+      setLoadingQuestions((prev) => ({ ...prev, [idx]: false }));
+    }
+  };
+
+  const toggleExpanded = (idx) => {
+    if (expandedIdx === idx) {
+      setExpandedIdx(null);
+    } else {
+      setExpandedIdx(idx);
+      loadQuestions(idx);
+    }
+  };
+
+  return (
   <div className="space-y-8">
     <div className="text-center mb-8">
       <h2 className="text-3xl font-bold text-gray-800 mb-4">Analysis Complete!</h2>
@@ -56,6 +94,7 @@ const ResultsStep = ({ finalResults, expandedIdx, setExpandedIdx, skillCategorie
               const critPct = sd.critical ? (sd.critical.presence_ratio * 100).toFixed(1) + '%' : 'N/A';
               const impPct = sd.important ? (sd.important.presence_ratio * 100).toFixed(1) + '%' : 'N/A';
               const desPct = sd.extra ? (sd.extra.presence_ratio * 100).toFixed(1) + '%' : 'N/A';
+              const candidateQuestions = candidate.interview_questions?.length > 0 ? candidate.interview_questions : (questions[idx] || []);
 
               return (
             <React.Fragment key={idx}>
@@ -80,7 +119,7 @@ const ResultsStep = ({ finalResults, expandedIdx, setExpandedIdx, skillCategorie
                 <td className="px-4 py-2">
                   <button
                     className="flex items-center px-3 py-1 bg-gradient-to-r from-red-500 to-red-600 text-white rounded-lg shadow hover:from-red-600 hover:to-red-700 transition-colors duration-200"
-                    onClick={() => setExpandedIdx(expandedIdx === idx ? null : idx)}
+                    onClick={() => toggleExpanded(idx)}
                   >
                     {expandedIdx === idx ? <ChevronUp className="w-4 h-4 mr-1" /> : <ChevronDown className="w-4 h-4 mr-1" />}
                     {expandedIdx === idx ? 'Hide' : 'Show'}
@@ -149,7 +188,8 @@ const ResultsStep = ({ finalResults, expandedIdx, setExpandedIdx, skillCategorie
                           <div className="bg-white rounded-xl shadow p-6">
                             <h4 className="font-semibold text-gray-800 mb-2">Interview Questions</h4>
                             <ul className="list-disc pl-6 space-y-1">
-                              {candidate.interview_questions?.length > 0 ? candidate.interview_questions.map((q, i) => (
+                              {loadingQuestions[idx] ? <li className="text-gray-400">Generating questions...</li> :
+                                candidateQuestions.length > 0 ? candidateQuestions.map((q, i) => (
                                 <li key={i} className="text-gray-700">{q}</li>
                               )) : <li className="text-gray-400">No questions generated.</li>}
                             </ul>
@@ -234,6 +274,7 @@ const ResultsStep = ({ finalResults, expandedIdx, setExpandedIdx, skillCategorie
       </button>
     </div>
   </div>
-);
+  );
+};
 
 export default ResultsStep;